@@ -1,923 +1,542 @@
+import argparse
+import json
+import os
+import sys
+from functools import partial
+
 import pandas as pd
 import psycopg2
 
-
-df_sales = pd.read_csv('Sales_Master.csv')
-print(df_sales.head())
-df_sales.info()
-
-df_expense = pd.read_csv('Expense_Master.csv')
-print(df_expense.head())
-df_expense.info()
-
-df_delivery = pd.read_csv('Delivery_Master.csv')
-print(df_delivery.head())
-df_delivery.info()
-
-df_shift = pd.read_csv('Shift_Master.csv')
-print(df_shift.head())
-df_shift.info()
+from bulk_load import INSERT_PAGE_ROWS, copy_append, copy_merge, insert_merge
+from checkpoint import Checkpoint
+from db import Database, resolve_dsn
+from fast_load import FastLoad
+from incremental import HighWaterMarks
+from instrumentation import Instrumentation
+from inventory_sync import INVENTORY_TRIGGERS, load_with_inventory_delta, set_trigger_mode
+from matviews import MaterializedViews
+from partitioning import MonthlyPartitions, is_partitioned, partitioned_plan, partitioned_schema
+from pipeline import DEPTH, Pipeline
+from query_runner import bump_data_version
+from rollup import NEW_DAYS_SQL, ROLLUP_DDL, captured_days, outdated, refresh_rollup, start_capture
+from scheduler import EXCLUSIVE_GROUPS, fk_graph, overridden_caps, run_dag
+from schema import INDEX_DDL, SCHEMA_DDL
+from sharding import ShardMap, ShardRouter, run_shards, shard_path
+from staging import StagingCache
+from transform_pool import TransformPool
+from transforms import LOAD_PLAN, DedupState, SourceFrame, read_options
+from validation import Validator
+
+
+parser = argparse.ArgumentParser(description="Load the ABC Foodmart master CSVs into PostgreSQL.")
+parser.add_argument('--dsn', default=None,
+                    help="libpq connection string (default: $ABC_DSN, then the [database] section of "
+                         "--db-config, then the local ABCFoodmart database)")
+parser.add_argument('--db-config', default=None,
+                    help="INI file with a [database] section (default database.ini if present)")
+parser.add_argument('--load-method', choices=['copy', 'binary', 'insert'], default='copy',
+                    help="send rows with CSV COPY (default), binary COPY encoded column-wise from the "
+                         "frames (text columns need pyarrow), or prepared multi-row INSERTs for servers "
+                         "or poolers that do not allow COPY")
+parser.add_argument('--page-size', type=int, default=INSERT_PAGE_ROWS,
+                    help=f"rows per EXECUTE with --load-method insert (default {INSERT_PAGE_ROWS})")
+parser.add_argument('--chunksize', type=int, default=None,
+                    help="stream each master CSV in chunks of this many rows instead of reading it whole")
+parser.add_argument('--pipeline', action='store_true',
+                    help="read, transform and load on separate threads joined by bounded queues, so the "
+                         "next chunk (or file) is parsed and projected while the current one loads")
+parser.add_argument('--pipeline-depth', type=int, default=DEPTH,
+                    help=f"chunks waiting between two pipeline stages (default {DEPTH})")
+parser.add_argument('--workers', type=int, default=1,
+                    help="load independent tables concurrently on this many connections")
+parser.add_argument('--transform-workers', type=int, default=1,
+                    help="project master frames into table frames on this many processes, the large "
+                         "tables partitioned by key (needs pyarrow; see transform_pool.py)")
+parser.add_argument('--table-workers', nargs='*', default=[], metavar='TABLE=N',
+                    help="allow up to N concurrent slices of TABLE (default 1), e.g. Sale=4; SaleItem, "
+                         "ProductReturn and DeliveryItem load one slice at a time unless --bulk-inventory "
+                         "or --fast-load keeps their inventory triggers off")
+parser.add_argument('--bulk-inventory', action='store_true',
+                    help="bypass the per-row inventory triggers and apply each load's net "
+                         "Inventory change in one set-based statement")
+parser.add_argument('--trigger-mode', choices=['row', 'statement'], default='row',
+                    help="inventory triggers to enable: per-row (default) or statement-level "
+                         "with transition tables")
+parser.add_argument('--partitioned', action='store_true',
+                    help="create Sale and SaleItem range-partitioned by month of sale_datetime and add "
+                         "monthly partitions as sales arrive (the database must have been created "
+                         "with this flag)")
+parser.add_argument('--shard-map', default=None,
+                    help="INI file mapping stores to shard databases (see sharding.py): load every "
+                         "shard at once, one process each, store-scoped rows to their store's shard "
+                         "and the other tables to all of them")
+parser.add_argument('--shard', default=None,
+                    help="load only this shard of --shard-map, into its database instead of --dsn")
+parser.add_argument('--fast-load', action='store_true',
+                    help="first load into an empty database: load into UNLOGGED tables without keys, "
+                         "indexes or inventory triggers and build them afterwards (see fast_load.py)")
+parser.add_argument('--incremental', action='store_true',
+                    help="only load rows past the high-water marks recorded in etl_load_state "
+                         "by the previous run")
+parser.add_argument('--checkpoint', action='store_true',
+                    help="commit each table in numbered batches recorded in etl_batch, and resume an "
+                         "interrupted run over the same inputs from its first incomplete batch")
+parser.add_argument('--batch-rows', type=int, default=50_000,
+                    help="rows per checkpointed batch (default 50000)")
+parser.add_argument('--quarantine', default='quarantine.csv',
+                    help="CSV that rows failing pre-load validation are appended to (default quarantine.csv)")
+parser.add_argument('--skip-validation', action='store_true',
+                    help="send frames to the database without the pre-load validation stage")
+parser.add_argument('--skip-matviews', action='store_true',
+                    help="do not create or refresh the dashboard materialized views after loading")
+parser.add_argument('--staging-dir', default=None,
+                    help="keep typed, memory-mapped Arrow copies of the master CSVs in this directory "
+                         "and read those instead, re-parsing a CSV only when its content changes "
+                         "(needs pyarrow)")
+parser.add_argument('--report', default=None,
+                    help="append a JSON line per stage (read, transform, validate, load, commit) "
+                         "with its time, rows, rows/s, peak RSS and bytes sent to this file")
+parser.add_argument('--profile-stage', default=None, metavar='STAGE',
+                    help="profile every occurrence of one stage, by kind or kind:name, "
+                         "e.g. load or transform:SaleItem")
+parser.add_argument('--profiler', choices=['cprofile', 'tracemalloc'], default='cprofile',
+                    help="profiler used for --profile-stage (default cprofile)")
+parser.add_argument('--profile-out', default=None,
+                    help="where --profile-stage output is written "
+                         "(default etl_profile.prof or etl_tracemalloc.txt)")
+args = parser.parse_args()
+
+if args.fast_load and (args.partitioned or args.checkpoint):
+    # Partition keys are created with their tables, and unlogged tables do
+    # not survive the crash a checkpoint is there to resume from
+    parser.error("--fast-load cannot be combined with --partitioned or --checkpoint")
+
+shard_map = None
+if args.shard_map:
+    try:
+        shard_map = ShardMap.read(args.shard_map)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.shard is not None:
+        if args.shard not in shard_map.dsns:
+            parser.error(f"--shard {args.shard} is not in {args.shard_map}")
+        # Shard processes run side by side, so each writes its own files
+        args.quarantine = shard_path(args.quarantine, args.shard)
+        if args.report:
+            args.report = shard_path(args.report, args.shard)
+        if args.profile_stage:
+            default = 'etl_profile.prof' if args.profiler == 'cprofile' else 'etl_tracemalloc.txt'
+            args.profile_out = shard_path(args.profile_out or default, args.shard)
+elif args.shard:
+    parser.error("--shard needs --shard-map")
+
+metrics = Instrumentation(args.report, args.profile_stage, args.profiler, args.profile_out)
+
+staging = None
+if args.staging_dir:
+    try:
+        staging = StagingCache(args.staging_dir)
+    except ImportError as e:
+        parser.error(str(e))
+
+if shard_map and args.shard is None:
+    # One ETL process per shard; the master files are staged first, so the
+    # processes only read the staging cache
+    if staging:
+        for path, _ in LOAD_PLAN:
+            staging.cached_file(path)
+    raise SystemExit(run_shards(shard_map, [sys.executable] + sys.argv))
+
+transform_pool = None
+if args.transform_workers > 1:
+    # Created first, so the forked workers inherit no connection or thread
+    try:
+        transform_pool = TransformPool(args.transform_workers)
+    except ImportError as e:
+        parser.error(str(e))
 
 # Connect to an existing database 
-conn = psycopg2.connect("dbname=ABCFoodmart user=postgres host=localhost password=123")
+dsn = shard_map.dsns[args.shard] if shard_map else resolve_dsn(args.dsn, args.db_config)
+db = Database(dsn, max_connections=args.workers)
+conn = db.connect()
 
 # Open a cursor to perform database operations
 cur = conn.cursor()
 
 # Execute a command: this creates all table in the database 
-cur.execute("""
-                
-    CREATE TABLE IF NOT EXISTS Store (
-        store_id SERIAL PRIMARY KEY,
-        address VARCHAR(255) NOT NULL,
-        city VARCHAR(100) NOT NULL,
-        state VARCHAR(50) NOT NULL,
-        zipcode VARCHAR(10) NOT NULL,
-        operating_hours VARCHAR(100) NOT NULL,
-        manager_id INTEGER UNIQUE
-    );
-
-
-    CREATE TABLE IF NOT EXISTS Department (
-        department_id SERIAL PRIMARY KEY,
-        department_name VARCHAR(100) NOT NULL
-    );
-
-
-    CREATE TABLE IF NOT EXISTS Employee (
-        employee_id SERIAL PRIMARY KEY,
-        first_name VARCHAR(100) NOT NULL,
-        last_name VARCHAR(100) NOT NULL,
-        email VARCHAR(100) NOT NULL UNIQUE,
-        phone VARCHAR(20) NOT NULL,
-        role VARCHAR(50) NOT NULL,
-        store_id INTEGER REFERENCES Store(store_id) ON DELETE CASCADE,
-        department_id INTEGER REFERENCES Department(department_id)
-    );
-
-
-
-    CREATE TABLE IF NOT EXISTS ShiftSchedule (
-        schedule_id SERIAL PRIMARY KEY,
-        employee_id INTEGER REFERENCES Employee(employee_id) ON DELETE CASCADE,
-        shift_date DATE NOT NULL,
-        start_time TIME NOT NULL,
-        end_time TIME NOT NULL
-    );
-
-
-
-    CREATE TABLE IF NOT EXISTS Category (
-        category_id SERIAL PRIMARY KEY,
-        category_name VARCHAR(100) NOT NULL
-    );
-
-
-    CREATE TABLE IF NOT EXISTS Product (
-        sku varchar(20) PRIMARY KEY,
-        product_name VARCHAR(150) NOT NULL,
-        brand VARCHAR(100) NOT NULL,
-        shelf_location VARCHAR(50) NOT NULL,
-        category_id INTEGER REFERENCES Category(category_id)
-    );
-
-
-    CREATE TABLE IF NOT EXISTS ProductPricing (
-        sku varchar(20) REFERENCES Product(sku),
-        price_date DATE NOT NULL,
-        regular_price NUMERIC(10,2) NOT NULL,
-        promo_price NUMERIC(10,2),
-        PRIMARY KEY (sku, price_date)
-    );
-
-
-    CREATE TABLE IF NOT EXISTS Inventory (
-        inventory_id SERIAL PRIMARY KEY,
-        store_id INTEGER REFERENCES Store(store_id),
-        sku varchar(20) REFERENCES Product(sku),
-        quantity_on_hand INTEGER NOT NULL,
-        reorder_threshold INTEGER NOT NULL,
-        restock_status VARCHAR(20) CHECK (restock_status IN ('Restock Needed', 'In Stock')) NOT NULL,
-        UNIQUE (store_id, sku)
-    );
-
-
-    CREATE TABLE IF NOT EXISTS Vendor (
-    vendor_id SERIAL PRIMARY KEY,
-    vendor_name VARCHAR(100) NOT NULL,
-    vendor_tier VARCHAR(10) NOT NULL
-    );
-
-
-    CREATE TABLE IF NOT EXISTS VendorProduct (
-        vendor_id INTEGER REFERENCES Vendor(vendor_id) ON DELETE CASCADE,
-        sku varchar(20) REFERENCES Product(sku),
-        PRIMARY KEY (vendor_id, sku)
-    );
-
-
-    CREATE TABLE IF NOT EXISTS Delivery (
-        delivery_id SERIAL PRIMARY KEY,
-        vendor_id INTEGER REFERENCES Vendor(vendor_id),
-        store_id INTEGER REFERENCES Store(store_id),
-        delivery_date DATE NOT NULL,
-        status VARCHAR(20) CHECK (status IN ('Completed', 'Delayed')) NOT NULL
-    );
-
-
-    CREATE TABLE IF NOT EXISTS DeliveryItem (
-        delivery_id INTEGER REFERENCES Delivery(delivery_id) ON DELETE CASCADE,
-        sku varchar(20) REFERENCES Product(sku),
-        quantity INTEGER NOT NULL,
-        PRIMARY KEY (delivery_id, sku)
-    );
-
-
-
-    CREATE TABLE IF NOT EXISTS Promotion (
-        promo_id SERIAL PRIMARY KEY,
-        sku varchar(20) REFERENCES Product(sku),
-        start_date DATE,
-        end_date DATE,
-        discount_amount NUMERIC
-    );
-
-
-    CREATE TABLE IF NOT EXISTS Sale (
-        sale_id SERIAL PRIMARY KEY,
-        store_id INTEGER REFERENCES Store(store_id),
-        sale_datetime TIMESTAMP,
-        payment_type VARCHAR(20) CHECK (payment_type IN ('Cash', 'Credit Card', 'Mobile'))
-    );
-
-                
-    CREATE TABLE IF NOT EXISTS SaleItem (
-        sale_id INTEGER REFERENCES Sale(sale_id) ON DELETE CASCADE,
-        sku varchar(20) REFERENCES Product(sku),
-        quantity_sold INTEGER NOT NULL,
-        unit_price NUMERIC(10,2) NOT NULL,
-        promo_applied BOOLEAN DEFAULT FALSE,
-        promo_discount NUMERIC(10,2),
-        promo_id INTEGER REFERENCES Promotion(promo_id),
-        PRIMARY KEY (sale_id, sku)
-    );
-
-
-
-    CREATE TABLE IF NOT EXISTS Expense (
-        expense_id SERIAL PRIMARY KEY,
-        store_id INTEGER REFERENCES Store(store_id),
-        expense_date DATE NOT NULL,
-        expense_category VARCHAR(50) CHECK (expense_category IN ('Wages', 'Utilities', 'Spoilage', 'Other')) NOT NULL,
-        amount NUMERIC(12,2) NOT NULL
-    );
-
-
-    CREATE TABLE IF NOT EXISTS ReturnReason (
-        reason_code VARCHAR(10) PRIMARY KEY,
-        description TEXT
-    );
-
-
-    CREATE TABLE IF NOT EXISTS ProductReturn (
-        return_id SERIAL PRIMARY KEY,
-        sale_id INTEGER REFERENCES Sale(sale_id),
-        sku varchar(20) REFERENCES Product(sku),
-        return_date DATE NOT NULL,
-        quantity_returned INTEGER NOT NULL,
-        reason_code VARCHAR(10) REFERENCES ReturnReason(reason_code)
-    );
-
-DROP TRIGGER IF EXISTS trg_update_restock_status ON Inventory;
-DROP FUNCTION IF EXISTS update_restock_status() CASCADE;
-
-    CREATE OR REPLACE FUNCTION update_restock_status()
-    RETURNS TRIGGER AS $$
-    BEGIN
-        IF NEW.quantity_on_hand <= NEW.reorder_threshold THEN
-            NEW.restock_status := 'Restock Needed';
-        ELSE
-            NEW.restock_status := 'In Stock';
-        END IF;
-        RETURN NEW;
-    END;
-    $$ LANGUAGE plpgsql;
-
-            
-
-    CREATE TRIGGER trg_update_restock_status
-    BEFORE INSERT OR UPDATE ON Inventory
-    FOR EACH ROW
-    EXECUTE FUNCTION update_restock_status();
-
-
-DROP TRIGGER IF EXISTS trg_deduct_inventory ON SaleItem;
-DROP FUNCTION IF EXISTS deduct_inventory_after_sale() CASCADE;
-
-    CREATE OR REPLACE FUNCTION deduct_inventory_after_sale()
-    RETURNS TRIGGER AS $$
-    BEGIN
-    UPDATE Inventory
-    SET quantity_on_hand = quantity_on_hand - NEW.quantity_sold
-    WHERE store_id = (SELECT store_id FROM Sale WHERE sale_id = NEW.sale_id)
-        AND sku = NEW.sku;
-    RETURN NEW;
-    END;
-    $$ LANGUAGE plpgsql;
-
-
-    CREATE TRIGGER trg_deduct_inventory
-    AFTER INSERT ON SaleItem
-    FOR EACH ROW
-    EXECUTE FUNCTION deduct_inventory_after_sale();
-
-
-DROP TRIGGER IF EXISTS trg_add_inventory_on_return ON ProductReturn;
-DROP FUNCTION IF EXISTS add_inventory_on_return() CASCADE;
-
-    CREATE OR REPLACE FUNCTION  add_inventory_on_return()
-    RETURNS TRIGGER AS $$
-    BEGIN
-    UPDATE Inventory
-    SET quantity_on_hand = quantity_on_hand + NEW.quantity_returned
-    WHERE store_id = (SELECT store_id FROM Sale WHERE sale_id = NEW.sale_id)
-        AND sku = NEW.sku;
-    RETURN NEW;
-    END;
-    $$ LANGUAGE plpgsql;
-
-
-    CREATE TRIGGER trg_add_inventory_on_return
-    AFTER INSERT ON ProductReturn
-    FOR EACH ROW
-    EXECUTE FUNCTION add_inventory_on_return();
-
-
-DROP TRIGGER IF EXISTS trg_add_inventory_on_delivery ON DeliveryItem;
-DROP FUNCTION IF EXISTS add_inventory_on_delivery() CASCADE;
-            
--- Trigger Function: Add inventory when delivery is received
-CREATE OR REPLACE FUNCTION add_inventory_on_delivery()
-RETURNS TRIGGER AS $$
-BEGIN
-    -- Check if the Inventory record already exists
-    IF EXISTS (
-        SELECT 1 FROM Inventory 
-        WHERE store_id = (SELECT store_id FROM Delivery WHERE delivery_id = NEW.delivery_id)
-          AND sku = NEW.sku
-    ) THEN
-        -- If exists, increase quantity_on_hand
-        UPDATE Inventory
-        SET quantity_on_hand = quantity_on_hand + NEW.quantity
-        WHERE store_id = (SELECT store_id FROM Delivery WHERE delivery_id = NEW.delivery_id)
-          AND sku = NEW.sku;
-    ELSE
-        -- If not exists, insert a new record (default reorder_threshold = 10)
-        INSERT INTO Inventory (store_id, sku, quantity_on_hand, reorder_threshold, restock_status)
-        VALUES (
-            (SELECT store_id FROM Delivery WHERE delivery_id = NEW.delivery_id),
-            NEW.sku,
-            NEW.quantity,
-            10,  -- Default threshold, adjust as needed
-            'In Stock'
-        );
-    END IF;
-
-    RETURN NEW;
-END;
-$$ LANGUAGE plpgsql;
-
--- Trigger: run after a DeliveryItem is inserted
-CREATE TRIGGER trg_add_inventory_on_delivery
-AFTER INSERT ON DeliveryItem
-FOR EACH ROW
-EXECUTE FUNCTION add_inventory_on_delivery();
-
-            
-""")
+ddl = partitioned_schema(SCHEMA_DDL) if args.partitioned else SCHEMA_DDL
+plan = partitioned_plan(LOAD_PLAN) if args.partitioned else LOAD_PLAN
+cur.execute(ddl)
+cur.execute(INDEX_DDL)
+cur.execute(ROLLUP_DDL)
+set_trigger_mode(cur, args.trigger_mode)
+
+# CREATE TABLE IF NOT EXISTS keeps whichever layout the database already has
+if is_partitioned(cur) != args.partitioned:
+    layout = 'partitioned' if args.partitioned else 'plain'
+    parser.error(f"Sale already exists but is not {layout}; "
+                 f"use a database created with the same --partitioned setting")
+partitions = MonthlyPartitions(cur) if args.partitioned else None
+
+fast_load = None
+if args.fast_load:
+    fast_load = FastLoad(cur, [table for _, tables in plan for table, _, _ in tables])
+    nonempty = fast_load.nonempty(cur)
+    if nonempty:
+        parser.error(f"--fast-load needs empty tables; {', '.join(nonempty)} already hold rows")
+    fast_load.prepare(cur)
 
 conn.commit()
 
 
-# Create Store table from df_sales
-store_df = df_sales[['store_id', 'address', 'city', 'state', 'zipcode', 'operating_hours']].drop_duplicates()
-store_df.columns = ['store_id', 'address', 'city', 'state', 'zipcode', 'operating_hours']
-
-
-# Insert into Store table
-inserted = 0
-for idx, row in store_df.iterrows():
-    try:
-        cur.execute("""
-            INSERT INTO Store (store_id, address, city, state, zipcode, operating_hours)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (store_id) DO NOTHING;
-        """, (
-            int(row['store_id']),
-            row['address'],
-            row['city'],
-            row['state'],
-            str(row['zipcode']), 
-            row['operating_hours'])
-        )
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ Error inserting row {idx}: {e}")
-
-
+if args.load_method == 'insert':
+    merge = partial(insert_merge, page_rows=args.page_size)
+elif fast_load:
+    merge = partial(copy_append, binary=args.load_method == 'binary')
+else:
+    merge = partial(copy_merge, binary=args.load_method == 'binary')
+
+
+def load_rows(cur, table, df, conflict):
+    if fast_load:
+        # Nothing to conflict on yet; repeated keys go when the keys are built
+        return merge(cur, table, df)
+    capture = None
+    if table in NEW_DAYS_SQL:
+        # The rollup recomputes the store days of the rows actually inserted
+        capture = start_capture(cur, table, df.columns)
+    if args.bulk_inventory and table in INVENTORY_TRIGGERS:
+        count = load_with_inventory_delta(cur, table, df, conflict, merge=merge, capture=capture)
+    else:
+        count = merge(cur, table, df, conflict, capture=capture)
+    if capture:
+        rollup_days.update(captured_days(cur, table))
+    return count
+
+
+def load(conn, table, df, conflict=None):
+    # Bulk load one table, one transaction per batch (a single batch unless
+    # checkpointing); a failed batch is rolled back and reported
+    if checkpoint:
+        batches = checkpoint.split(table, df, args.batch_rows)
+    else:
+        batches = [(None, df, None)]
+
+    inserted = 0
+    for first_row, batch, done in batches:
+        if done is not None:
+            inserted += done
+            continue
+        try:
+            with metrics.stage('load', table, rows_in=len(batch)) as stage, conn.cursor() as load_cur:
+                count = load_rows(load_cur, table, batch, conflict)
+                if checkpoint:
+                    checkpoint.record_batch(load_cur, table, first_row, count)
+                stage.rows_out = count
+                stage.bytes_sent = load_cur.bytes_sent
+            with metrics.stage('commit', table):
+                conn.commit()
+            inserted += count
+        except Exception as e:
+            conn.rollback()
+            failed.add(table)
+            print(f"❌ Error loading {table} table: {e}")
+    return inserted
+
+
+def load_group(loads):
+    # loads: (table, df, conflict) entries in foreign-key order
+    if partitions:
+        loads, dropped = partitions.route(cur, loads)
+        conn.commit()
+        for table, count in dropped.items():
+            print(f"✅ {count} rows of {table} skipped; their months were detached.")
+    if args.workers > 1:
+        return run_dag(loads, graph, pool, load, args.workers, caps, exclusive)
+    return {table: load(conn, table, df, key) for table, df, key in loads}
+
+
+def project(path, tables, df):
+    # Master rows -> (table, frame, conflict) loads, minus rows already loaded
+    if marks:
+        df = marks.new_source_rows(path, df)
+        marks.observe(path, df)
+    tables = [entry for entry in tables if not (checkpoint and checkpoint.table_done(entry[0]))]
+    if transform_pool:
+        with metrics.stage('project', path, rows_in=len(df)):
+            built = transform_pool.project(df, tables)
+    else:
+        # Key columns are factorized once and shared by every projection
+        src = SourceFrame(df)
+    loads = []
+    for table, build, key in tables:
+        with metrics.stage('transform', table, rows_in=len(df)) as stage:
+            frame = built[table] if transform_pool else build(src)
+            if router:
+                frame = router.route(table, frame, df)
+            frame = dedup.new_rows(table, frame, key)
+            if marks:
+                frame = marks.new_table_rows(table, frame)
+            stage.rows_out = len(frame)
+        loads.append((table, frame, key))
+    if validator:
+        with metrics.stage('validate', path, rows_in=sum(len(frame) for _, frame, _ in loads)) as stage:
+            loads = validator.validate(loads)
+            stage.rows_out = sum(len(frame) for _, frame, _ in loads)
+    return loads
+
+
+def read_master(path):
+    # Frames of one master file, read lazily; one-shot mode yields the whole
+    # file as a single chunk
+    if args.chunksize:
+        if staging:
+            yield from staging.read(path, args.chunksize)
+        else:
+            yield from pd.read_csv(path, chunksize=args.chunksize, **read_options(path))
+        return
+    if staging:
+        df = staging.read(path)[0]
+    else:
+        df = pd.read_csv(path, **read_options(path))
+    print(df.head())
+    df.info()
+    yield df
+
+
+if args.workers > 1:
+    graph = fk_graph(ddl)
+    pool = db.pool
+    caps = dict(
+        (table, int(n)) for table, n in (spec.split('=') for spec in args.table_workers)
+    )
+    # With the inventory triggers firing, their tables load one slice at a
+    # time; a bulk or fast load applies Inventory set-based and splits them
+    exclusive = [] if fast_load or args.bulk_inventory else EXCLUSIVE_GROUPS
+    for table in overridden_caps(caps, exclusive):
+        print(f"❌ --table-workers {table}={caps[table]} ignored: {table} fires the inventory triggers, "
+              f"so it loads one slice at a time (use --bulk-inventory to split it).")
+
+inserted = {table: 0 for _, tables in plan for table, _, _ in tables}
+failed = set()
+rollup_days = set()
+dedup = DedupState()
+marks = HighWaterMarks(cur) if args.incremental else None
+pipeline = Pipeline(args.pipeline_depth) if args.pipeline else None
+router = ShardRouter(shard_map, args.shard) if shard_map else None
+
+
+def lookup_keys(table, column, keys):
+    # Foreign keys the validator could not resolve from the frames; a
+    # pipelined run first lets the chunks before this one reach the database
+    if pipeline:
+        pipeline.drain()
+    cur.execute(f"SELECT {column} FROM {table} WHERE {column} = ANY(%s);",
+                ([k.item() if hasattr(k, 'item') else k for k in keys],))
+    return {key for key, in cur.fetchall()}
+
+
+validator = None
+if not args.skip_validation:
+    validator = Validator(ddl, args.quarantine, seen=dedup, lookup=lookup_keys)
+
+checkpoint = None
+if args.checkpoint:
+    # Same files and options -> same batches, so an unfinished run can resume
+    signature = json.dumps({
+        'files': {path: [os.path.getsize(path), os.path.getmtime(path)] for path, _ in plan},
+        'options': [args.chunksize, args.batch_rows, sorted(args.table_workers), args.incremental,
+                    args.partitioned],
+    })
+    checkpoint = Checkpoint(cur, signature)
+    if checkpoint.resumed:
+        print(f"✅ Resuming ETL run {checkpoint.run_id}; skipping {len(checkpoint.tables)} finished tables.")
+    inserted.update(checkpoint.tables)
 conn.commit()
-print(f"✅ {inserted} rows actually inserted into Store table.")
-
-
-
 
-# Create Department table from df_shift
-dept_df = df_shift[['department_id', 'department_name']].drop_duplicates()
-dept_df.columns = ['department_id', 'department_name']
 
-# Insert into Store table into Department
-inserted = 0
-for idx, row in dept_df.iterrows():
+def finish_tables(tables):
+    # Record tables of this run that loaded completely
+    if not checkpoint:
+        return
+    for table, _, _ in tables:
+        if table not in failed:
+            checkpoint.finish_table(cur, table, inserted[table])
+    conn.commit()
+
+if pipeline:
+    # The chunked loop below with its three steps on separate threads; a
+    # (path, tables, None) item marks the end of a file
+    def chunks():
+        for path, tables in plan:
+            if checkpoint and all(checkpoint.table_done(table) for table, _, _ in tables):
+                continue
+            for chunk in metrics.iterate('read', path, read_master(path)):
+                yield path, tables, chunk
+            yield path, tables, None
+
+    def transform(item):
+        path, tables, chunk = item
+        return tables, None if chunk is None else project(path, tables, chunk)
+
+    def write(item):
+        tables, loads = item
+        if loads is None:
+            finish_tables(tables)
+            return
+        for table, count in load_group(loads).items():
+            inserted[table] += count
+
+    pipeline.run(chunks(), transform, write)
+elif args.chunksize:
+    # Every chunk of a master file goes through all of that file's projections
+    # and loaders before the next chunk is read, so peak memory is bounded by
+    # the chunk size. Dimension keys are remembered across chunks.
+    for path, tables in plan:
+        if checkpoint and all(checkpoint.table_done(table) for table, _, _ in tables):
+            continue
+        for chunk in metrics.iterate('read', path, read_master(path)):
+            loads = project(path, tables, chunk)
+            for table, count in load_group(loads).items():
+                inserted[table] += count
+            del chunk, loads
+        finish_tables(tables)
+else:
+    # All four files are read up front so the scheduler sees every table at once
+    loads = []
+    for path, tables in plan:
+        if checkpoint and all(checkpoint.table_done(table) for table, _, _ in tables):
+            continue
+        for df in metrics.iterate('read', path, read_master(path)):
+            loads += project(path, tables, df)
+    inserted.update(load_group(loads))
+    finish_tables([entry for _, tables in plan for entry in tables])
+
+if fast_load:
+    # Put back what prepare() took off, each in one pass over the loaded rows
     try:
-        cur.execute("""
-            INSERT INTO Department (department_id, department_name)
-            VALUES (%s, %s)
-            ON CONFLICT (department_id) DO NOTHING;
-        """, (
-            int(row['department_id']),
-            row['department_name']
-        ))
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ Error inserting row {idx}: {e}")
-
-# Finalize transaction and report inserted rows
-conn.commit()
-print(f"✅ {inserted} rows actually inserted into Department table.")
-
-
-# Create Employee table from df_shift
-emp_df = df_shift[[
-    'employee_id',
-    'first_name',
-    'last_name',
-    'email',
-    'phone',
-    'role',
-    'store_id',
-    'department_id'
-]].drop_duplicates()
-
-# 4) INSERT 
-inserted = 0
-for idx, row in emp_df.iterrows():
-    try:
-        cur.execute("""
-            INSERT INTO Employee (
-                employee_id,
-                first_name,
-                last_name,
-                email,
-                phone,
-                role,
-                store_id,
-                department_id
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (employee_id) DO NOTHING;
-        """, (
-            int(row['employee_id']),
-            row['first_name'],
-            row['last_name'],
-            row['email'],
-            row['phone'],
-            row['role'],
-            int(row['store_id']),
-            int(row['department_id'])
-        ))
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ Error inserting employee row {idx}: {e}")
-
-
-conn.commit()
-print(f"✅ Inserted {inserted} rows into Employee table.")
-
+        with metrics.stage('fast_load', 'logged'):
+            fast_load.set_logged(cur)
+            conn.commit()
+        with metrics.stage('fast_load', 'keys'):
+            for table, count in fast_load.add_keys(cur, {table: key for _, tables in plan
+                                                         for table, _, key in tables}).items():
+                inserted[table] -= count
+            conn.commit()
+        with metrics.stage('fast_load', 'indexes'):
+            fast_load.add_indexes(cur)
+            conn.commit()
+        with metrics.stage('fast_load', 'inventory'):
+            fast_load.apply_inventory(cur)
+            conn.commit()
+        with metrics.stage('fast_load', 'foreign_keys'):
+            fast_load.add_foreign_keys(cur)
+            conn.commit()
+        with metrics.stage('fast_load', 'analyze'):
+            fast_load.restore_triggers(cur)
+            fast_load.analyze(cur)
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"❌ Error restoring the schema after the fast load; recreate the database: {e}")
+        raise SystemExit(1)
+    print("✅ Fast load: keys, indexes, foreign keys and inventory built; tables logged and analyzed.")
+
+for table, count in inserted.items():
+    print(f"✅ {count} rows actually inserted into {table} table.")
+
+if validator:
+    for table, count in validator.rejected.items():
+        print(f"❌ {count} rows of {table} failed validation; see {args.quarantine}.")
+
+# Recompute the sales rollup for the store days of the sales, lines and
+# returns this run inserted. A resumed run cannot tell which days the
+# interrupted one loaded, a fast load captures nothing and a rollup from
+# before its promo_id columns lacks them, so those recompute them all.
+with metrics.stage('rollup', 'daily_store_sku_sales') as stage:
+    everything = fast_load or checkpoint and checkpoint.resumed or outdated(cur)
+    stage.rows_out, rollup_changed = refresh_rollup(cur, None if everything else rollup_days)
+    conn.commit()
+print(f"✅ Sales rollup recomputed for {stage.rows_out} store days; "
+      f"{sum(rollup_changed.values())} rollup rows changed.")
 
 # Update Store.manager_id based on Employee role
-cur.execute("""
-    UPDATE Store
-    SET manager_id = e.employee_id
-    FROM Employee e
-    WHERE e.role = 'Store Manager'
-      AND Store.store_id = e.store_id;
-""")
-conn.commit()
-print("✅ Store table manager_id is updated.")
-
-
-
-# Create ShiftSchedule table from df_shift
-
-shift_schedule_df = df_shift[
-    ['schedule_id', 'employee_id', 'shift_date', 'start_time', 'end_time']
-].drop_duplicates()
-
-inserted = 0
-for idx, row in shift_schedule_df.iterrows():
-    try:
-        cur.execute("""
-            INSERT INTO ShiftSchedule
-                (schedule_id, employee_id, shift_date, start_time, end_time)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (schedule_id) DO NOTHING;
-        """, (
-            int(row['schedule_id']),
-            int(row['employee_id']),
-            row['shift_date'],
-            row['start_time'],
-            row['end_time']
-        ))
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ ShiftSchedule errr at row {idx}: {e}")
-
-
-conn.commit()
-print(f"✅ ShiftSchedule: Total {inserted} rows inserted.")
-
-# Create Category table from df_sales
-
-cat_df = df_sales[['category_id', 'category_name']].drop_duplicates()
-
-
-cat_df['category_id'] = cat_df['category_id'].astype(int)
-cat_df['category_name'] = cat_df['category_name'].astype(str)
-
-
-inserted = 0
-for idx, row in cat_df.iterrows():
-    try:
-        cur.execute("""
-            INSERT INTO Category (category_id, category_name)
-            VALUES (%s, %s)
-            ON CONFLICT (category_id) DO NOTHING;
-        """, (
-            row['category_id'],
-            row['category_name']
-        ))
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ Category insert error at row {idx}: {e}")
-
-conn.commit()
-print(f"✅ Category: Total {inserted} rows inserted.")
-
-
-# Create Product table from df_sales
-
-prod_df = df_sales[[
-    'sku',
-    'product_name',
-    'brand',
-    'shelf_location',
-    'category_id'
-]].drop_duplicates()
-
-prod_df['sku']            = prod_df['sku'].astype(str)
-prod_df['product_name']   = prod_df['product_name'].astype(str)
-prod_df['brand']          = prod_df['brand'].astype(str)
-prod_df['shelf_location'] = prod_df['shelf_location'].astype(str)
-prod_df['category_id']    = prod_df['category_id'].astype(int)
-
-
-inserted = 0
-for idx, row in prod_df.iterrows():
-    try:
-        cur.execute("""
-            INSERT INTO Product
-                (sku, product_name, brand, shelf_location, category_id)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (sku) DO NOTHING;
-        """, (
-            row['sku'],
-            row['product_name'],
-            row['brand'],
-            row['shelf_location'],
-            row['category_id']
-        ))
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ Product insert error at row {idx}: {e}")
-
-conn.commit()
-print(f"✅ Product: total {inserted} rows inserted.")
-
-
-# Create ProductPricing table from df_sales
-pricing_df = df_sales[['sku', 'price_date', 'regular_price', 'promo_price']].drop_duplicates()
-
-pricing_df['regular_price'] = pricing_df['regular_price'].astype(float)
-pricing_df['promo_price']   = pricing_df['promo_price'].astype(float)
-pricing_df['promo_price']   = pricing_df['promo_price'].where(pricing_df['promo_price'].notna(), None)
-
-inserted = 0
-for _, row in pricing_df.iterrows():
+with metrics.stage('update', 'Store.manager_id') as stage:
     cur.execute("""
-        INSERT INTO ProductPricing
-            (sku, price_date, regular_price, promo_price)
-        VALUES (%s, %s, %s, %s)
-        ON CONFLICT (sku, price_date) DO NOTHING;
-    """, (
-        row['sku'],
-        row['price_date'],
-        row['regular_price'],
-        row['promo_price']   
-    ))
-    if cur.rowcount == 1:
-            if cur.rowcount == 1:
-                inserted += 1
-
-conn.commit()
-print(f"✅ ProductPricing: actually inserted {inserted} new rows.")
-
-
-
-# Create Inventory table from df_sales
-inv_df = df_sales[[
-    'inventory_id', 'store_id', 'sku', 'quantity_on_hand', 'reorder_threshold'
-]].dropna()
-
-inv_df = inv_df.drop_duplicates(subset=['store_id', 'sku'])
-
-inv_df['inventory_id'] = inv_df['inventory_id'].astype(int)
-inv_df['store_id'] = inv_df['store_id'].astype(int)
-inv_df['sku'] = inv_df['sku'].astype(str)
-inv_df['quantity_on_hand'] = inv_df['quantity_on_hand'].astype(int)
-inv_df['reorder_threshold'] = inv_df['reorder_threshold'].astype(int)
-
-inserted = 0
-for idx, row in inv_df.iterrows():
-    try:
-        cur.execute("""
-            INSERT INTO Inventory (
-                inventory_id, store_id, sku, quantity_on_hand, reorder_threshold
-            )
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (store_id, sku) DO NOTHING;
-        """, (
-            row['inventory_id'],
-            row['store_id'],
-            row['sku'],
-            row['quantity_on_hand'],
-            row['reorder_threshold']
-        ))
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ Inventory insert error at row {idx}: {e}")
-
-conn.commit()
-print(f"✅ Inventory: total {inserted} rows inserted.")
-
-
-
-# Create Vendor table from df_sales 
-# Drop duplicates to get unique vendors
-vendor_df = df_sales[['primary_vendor_id', 'vendor_name', 'vendor_tier']] \
-    .dropna(subset=['primary_vendor_id', 'vendor_name', 'vendor_tier']) \
-    .drop_duplicates().sort_values(by='primary_vendor_id')
-
-# Rename columns to match Vendor table
-vendor_df.columns = ['vendor_id', 'vendor_name', 'vendor_tier']
-
-
-# Insert rows into Vendor table
-inserted = 0
-for idx, row in vendor_df.iterrows():
-    try:
-        cur.execute("""
-            WITH ins AS (
-                INSERT INTO Vendor (vendor_id, vendor_name, vendor_tier)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (vendor_id) DO NOTHING
-                RETURNING vendor_id
-            )
-            SELECT COUNT(*) FROM ins;
-        """, (
-            int(row['vendor_id']),
-            row['vendor_name'],
-            row['vendor_tier']
-        ))
-
-        # Fetch result of SELECT COUNT(*) to see if insert actually happened
-        result = cur.fetchone()[0]
-        inserted += result
-
-    except Exception as e:
-        print(f"❌ Error inserting vendor row {idx}: {e}")
-
-conn.commit()
-print(f"✅ Actually inserted {inserted} new rows into Vendor table.")
-
-# Create VendorProduct table from df_sales
-
-# Extract and clean Vendor-Product relationships
-vendor_product_df = df_sales[['primary_vendor_id', 'sku']].drop_duplicates().dropna()
-vendor_product_df.columns = ['vendor_id', 'sku']
-vendor_product_df['vendor_id'] = vendor_product_df['vendor_id'].astype(int)
-vendor_product_df['sku'] = vendor_product_df['sku'].astype(str)
-
-inserted = 0
-for idx, row in vendor_product_df.iterrows():
-    try:
-        cur.execute("""
-            INSERT INTO VendorProduct (vendor_id, sku)
-            VALUES (%s, %s)
-            ON CONFLICT (vendor_id, sku) DO NOTHING;
-        """, (
-            row['vendor_id'],
-            row['sku']
-        ))
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ Error inserting row {idx}: {e}")
-
-conn.commit()
-print(f"✅ {inserted} rows actually inserted into VendorProduct table.")
-
-# Create Delivery table from df_delivery 
-delivery_unique_df = df_delivery[['delivery_id', 'vendor_id', 'store_id', 'delivery_date', 'status']].drop_duplicates()
-
-
-# INSERT
-inserted = 0
-for idx, row in delivery_unique_df.iterrows():
-    try:
-        cur.execute("""
-            INSERT INTO Delivery (delivery_id, vendor_id, store_id, delivery_date, status)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (delivery_id) DO NOTHING;
-        """, (
-            int(row['delivery_id']),
-            int(row['vendor_id']),
-            int(row['store_id']),
-            row['delivery_date'],
-            row['status']
-        ))
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ Error inserting delivery row {idx}: {e}")
-
-conn.commit()
-print(f"✅ {inserted} rows actually inserted into Delivery table.") 
-
-
-
-# Create DeliveryItem table from df_delivery
-
-delivery_item_df = df_delivery[['delivery_id', 'sku', 'delivered_quantity']].drop_duplicates()
-delivery_item_df.columns = ['delivery_id', 'sku', 'quantity']
-
-
-# # Insert into Store table into DeliveryItem table
-inserted = 0
-for idx, row in delivery_item_df.iterrows():
-    try:
-        cur.execute("""
-            INSERT INTO DeliveryItem (delivery_id, sku, quantity)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (delivery_id, sku) DO NOTHING;
-        """, (
-            int(row['delivery_id']),
-            row['sku'],
-            int(row['quantity'])
-        ))
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ Error inserting row {idx}: {e}")
-
-conn.commit()
-print(f"✅ DeliveryItem: {inserted} rows inserted.")
-
-
-# Create Promotion table from df_sales
-
-# Filter and clean promotion columns
-promotion_df = df_sales[['promo_id', 'sku', 'start_date', 'end_date', 'discount_amount']]\
-    .dropna(subset=['promo_id', 'sku'])\
-    .drop_duplicates()
-
-# Convert column types
-promotion_df['promo_id'] = promotion_df['promo_id'].astype(int)
-promotion_df['sku'] = promotion_df['sku'].astype(str)
-promotion_df['discount_amount'] = promotion_df['discount_amount'].astype(float)
-
-# Insert into Store table into Promotion table
-inserted = 0
-for idx, row in promotion_df.iterrows():
-    try:
-        cur.execute("""
-            INSERT INTO Promotion (promo_id, sku, start_date, end_date, discount_amount)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (promo_id) DO NOTHING;
-        """, (
-            int(row['promo_id']),
-            row['sku'],
-            row['start_date'],
-            row['end_date'],
-            row['discount_amount']
-        ))
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ Error at row {idx}: {e}")
-
-conn.commit()
-print(f"✅ {inserted} rows actually inserted into Promotion table.")
-
-
-# Create Sale table from df_sales 
-
-sale_df = df_sales[['sale_id', 'store_id', 'sale_datetime', 'payment_type']].drop_duplicates()
-sale_df['sale_id'] = sale_df['sale_id'].astype(int)
-sale_df['store_id'] = sale_df['store_id'].astype(int)
-sale_df['payment_type'] = sale_df['payment_type'].astype(str)
-
-
-inserted = 0
-for idx, row in sale_df.iterrows():
-    try:
-        cur.execute("""
-            INSERT INTO Sale (
-                sale_id,
-                store_id,
-                sale_datetime,
-                payment_type
-            ) VALUES (%s, %s, %s, %s)
-            ON CONFLICT (sale_id) DO NOTHING;
-        """, (
-            row['sale_id'],
-            row['store_id'],
-            row['sale_datetime'],
-            row['payment_type']
-        ))
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ Sale insert error at row {idx}: {e}")
-
-conn.commit()
-print(f"✅ {inserted} rows actually inserted into Sale table.")
-
-
-
-# Create SaleItem table from df_sales
-sale_item_df = df_sales[[
-    'sale_id',
-    'sku',
-    'quantity_sold',
-    'unit_price',
-    'promo_applied',
-    'promo_discount',
-    'promo_id'
-]].drop_duplicates()
-
-# Convert column types for SaleItem
-sale_item_df['sale_id'] = sale_item_df['sale_id'].astype(int)
-sale_item_df['sku'] = sale_item_df['sku'].astype(str)
-sale_item_df['quantity_sold'] = sale_item_df['quantity_sold'].astype(int)
-sale_item_df['unit_price'] = sale_item_df['unit_price'].astype(float)
-sale_item_df['promo_applied'] = sale_item_df['promo_applied'].astype(bool)
-sale_item_df['promo_discount'] = sale_item_df['promo_discount'].astype(float)
-
-sale_item_df['promo_id'] = sale_item_df['promo_id'].apply(lambda x: int(x) if pd.notnull(x) else None)
-
-# Insert rows into SaleItem table
-inserted = 0
-for idx, row in sale_item_df.iterrows():
-    try:
-        cur.execute("""
-            INSERT INTO SaleItem (sale_id, sku, quantity_sold, unit_price, promo_applied, promo_discount, promo_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (
-            int(row['sale_id']),
-            row['sku'],
-            int(row['quantity_sold']),
-            float(row['unit_price']),
-            row['promo_applied'],
-            float(row['promo_discount']) if pd.notnull(row['promo_discount']) else None,
-            int(row['promo_id']) if pd.notnull(row['promo_id']) else None
-        ))
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ SaleItem insert error at row {idx}: {e}")
-
-conn.commit()
-print(f"✅ {inserted} rows successfully inserted into SaleItem table.")
-
-
-# Create Expense table from df_expense 
-expense_df = df_expense[['store_id', 'expense_date', 'expense_category', 'amount']].drop_duplicates()
-
-
-df_expense['store_id'] = df_expense['store_id'].astype(int)
-df_expense['expense_category'] = df_expense['expense_category'].astype(str)
-df_expense['amount'] = df_expense['amount'].astype(float)
-
-# 2. Insert rows into Expense table
-inserted = 0
-for idx, row in df_expense.iterrows():
-    try:
-        cur.execute("""
-            INSERT INTO Expense (store_id, expense_date, expense_category, amount)
-            VALUES (%s, %s, %s, %s)
-            ON CONFLICT DO NOTHING;
-        """, (
-            row['store_id'],
-            row['expense_date'],
-            row['expense_category'],
-            row['amount']
-        ))
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ Error inserting expense row {idx}: {e}")
-
-conn.commit()
-print(f"✅ {inserted} rows actually inserted into Expense table.")
-
-
-# Create ReturnReason table from df_sales
-returnreason_df = df_sales[['reason_code','description']]\
-    .dropna(subset=['reason_code', 'description'])\
-    .drop_duplicates()
-
-inserted = 0
-for _, row in returnreason_df.iterrows():
-    try:
-        cur.execute("""
-            INSERT INTO ReturnReason (reason_code, description)
-            VALUES (%s, %s)
-            ON CONFLICT (reason_code) DO NOTHING;
-        """, (
-            row['reason_code'],
-            row['description']
-        ))
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ Error inserting reason {row['reason_code']}: {e}")
-
-conn.commit()
-print(f"✅ {inserted} rows actually inserted into ReturnReason table.")
-
-# Create ProductReturn table from df_sales
-
-productreturn_df = df_sales[df_sales['return_exists'] == True][[
-    'return_id', 'sale_id', 'sku', 'return_date', 'quantity_returned', 'reason_code'
-]].dropna(subset=['return_id', 'sale_id', 'sku', 'return_date', 'quantity_returned', 'reason_code'])
-
-productreturn_df['return_id'] = productreturn_df['return_id'].astype(int)
-productreturn_df['sale_id'] = productreturn_df['sale_id'].astype(int)
-productreturn_df['sku'] = productreturn_df['sku'].astype(str)
-productreturn_df['quantity_returned'] = productreturn_df['quantity_returned'].astype(int)
-productreturn_df['reason_code'] = productreturn_df['reason_code'].astype(str)
-
-
-inserted = 0
-for idx, row in productreturn_df.iterrows():
-    try:
-        cur.execute("""
-            INSERT INTO ProductReturn (return_id, sale_id, sku, return_date, quantity_returned, reason_code)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (return_id) DO NOTHING;
-        """, (
-            row['return_id'],
-            row['sale_id'],
-            row['sku'],
-            row['return_date'],
-            row['quantity_returned'],
-            row['reason_code']
-        ))
-        if cur.rowcount == 1:
-            inserted += 1
-    except Exception as e:
-        print(f"❌ Error inserting return_id {row['return_id']}: {e}")
-
-conn.commit()
-print(f"✅ {inserted} rows actually inserted into ProductReturn table.")
-
-conn.commit()
+        UPDATE Store
+        SET manager_id = e.employee_id
+        FROM Employee e
+        WHERE e.role = 'Store Manager'
+          AND Store.store_id = e.store_id
+          AND Store.manager_id IS DISTINCT FROM e.employee_id;
+    """)
+    stage.rows_out = cur.rowcount
+    conn.commit()
+print("✅ Store table manager_id is updated.")
+managers_changed = stage.rows_out > 0
+
+# Tables this run really changed: those it inserted rows into, Inventory
+# through the triggers, the rollup tables whose rows differ after the
+# recompute and Store if a manager moved. A run that changed none of them
+# keeps the data version, and the cached results with it.
+changed = {table.lower() for table, count in inserted.items() if count}
+if any(inserted.get(table) for table in INVENTORY_TRIGGERS):
+    changed.add('inventory')
+changed.update(table for table, count in rollup_changed.items() if count)
+if managers_changed:
+    changed.add('store')
+
+if changed:
+    # Cached query results (query_runner.py) are keyed on this version
+    version = bump_data_version(cur, changed)
+    conn.commit()
+    print(f"✅ Data version is now {version}.")
+
+if not args.skip_matviews:
+    # Refresh only the dashboard views that read a table this run changed
+    views = MaterializedViews()
+    unsupported = views.unsupported(cur)
+    if unsupported:
+        print(f"❌ Materialized views not created: {unsupported}")
+    else:
+        with metrics.stage('matviews', 'create') as stage:
+            created, broken = views.ensure(cur)
+            conn.commit()
+            stage.rows_out = len(created)
+        for name, error in broken.items():
+            print(f"❌ Could not create materialized view {name}: {error}")
+        stale = views.stale(cur, changed, fresh=created)
+        for name in stale:
+            try:
+                with metrics.stage('refresh', name):
+                    views.refresh(cur, name)
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"❌ Error refreshing {name}: {e}")
+        print(f"✅ Materialized views created: {len(created)}, refreshed: {len(stale)}.")
+
+if marks:
+    # Marks only move once every table has loaded, so a failed table is
+    # retried in full on the next run
+    if failed:
+        print(f"❌ High-water marks not advanced; failed tables: {', '.join(sorted(failed))}")
+    else:
+        marks.save(cur)
+        conn.commit()
+        print("✅ High-water marks: " + ", ".join(f"{m}={v}" for m, v in marks.formatted().items()))
+
+if checkpoint and not failed:
+    checkpoint.finish_run(cur)
+    conn.commit()
+
+if transform_pool:
+    transform_pool.close()
+
+metrics.summary()
+metrics.close()
+
+db.close()
 
 cur.close()
 conn.close()
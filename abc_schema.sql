@@ -2,6 +2,8 @@
 -- ============================
 -- ABC Foodmart Database Schema
 -- ============================
+-- Requires PostgreSQL 15 or later: the dashboard materialized views built
+-- on these tables (matviews.py) use NULLS NOT DISTINCT unique indexes.
 
 -- Store Table
 -- Stores details such as location, operating hours, and assigned manager.
@@ -139,6 +141,8 @@ CREATE TABLE Promotion (
 
 -- Sales Table
 -- Captures each sales transaction with payment method and promotion details
+-- (ETL_Python.py --partitioned creates Sale and SaleItem range-partitioned by
+-- month of sale_datetime instead; see partitioning.py)
 CREATE TABLE Sale (
     sale_id SERIAL PRIMARY KEY,
     store_id INTEGER REFERENCES Store(store_id),
@@ -290,6 +294,182 @@ FOR EACH ROW
 EXECUTE FUNCTION add_inventory_on_delivery();
 
 
+-- Statement-level alternatives to the three inventory triggers above.
+-- They read the whole inserted batch from a transition table, net it per
+-- (store_id, sku) and touch each Inventory row once, recomputing
+-- restock_status in the same statement. They are created DISABLED; to switch
+-- a table over, disable its row trigger and enable the _stmt one, e.g.
+--   ALTER TABLE SaleItem DISABLE TRIGGER trg_deduct_inventory,
+--                        ENABLE TRIGGER trg_deduct_inventory_stmt;
+
+CREATE OR REPLACE FUNCTION deduct_inventory_after_sale_stmt()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE Inventory i
+    SET quantity_on_hand = i.quantity_on_hand - d.qty,
+        restock_status = CASE
+            WHEN i.quantity_on_hand - d.qty < i.reorder_threshold THEN 'Restock Needed'
+            ELSE 'In Stock'
+        END
+    FROM (
+        SELECT s.store_id, n.sku, SUM(n.quantity_sold) AS qty
+        FROM new_items n
+        JOIN Sale s ON s.sale_id = n.sale_id
+        GROUP BY s.store_id, n.sku
+    ) d
+    WHERE i.store_id = d.store_id
+      AND i.sku = d.sku;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_deduct_inventory_stmt
+AFTER INSERT ON SaleItem
+REFERENCING NEW TABLE AS new_items
+FOR EACH STATEMENT
+EXECUTE FUNCTION deduct_inventory_after_sale_stmt();
+
+ALTER TABLE SaleItem DISABLE TRIGGER trg_deduct_inventory_stmt;
+
+
+CREATE OR REPLACE FUNCTION add_inventory_on_return_stmt()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE Inventory i
+    SET quantity_on_hand = i.quantity_on_hand + d.qty,
+        restock_status = CASE
+            WHEN i.quantity_on_hand + d.qty < i.reorder_threshold THEN 'Restock Needed'
+            ELSE 'In Stock'
+        END
+    FROM (
+        SELECT s.store_id, n.sku, SUM(n.quantity_returned) AS qty
+        FROM new_returns n
+        JOIN Sale s ON s.sale_id = n.sale_id
+        GROUP BY s.store_id, n.sku
+    ) d
+    WHERE i.store_id = d.store_id
+      AND i.sku = d.sku;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_add_inventory_on_return_stmt
+AFTER INSERT ON ProductReturn
+REFERENCING NEW TABLE AS new_returns
+FOR EACH STATEMENT
+EXECUTE FUNCTION add_inventory_on_return_stmt();
+
+ALTER TABLE ProductReturn DISABLE TRIGGER trg_add_inventory_on_return_stmt;
+
+
+-- Upserts the batch: existing rows are topped up, missing rows are created
+-- with the default reorder_threshold of 10
+CREATE OR REPLACE FUNCTION add_inventory_on_delivery_stmt()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO Inventory (store_id, sku, quantity_on_hand, reorder_threshold, restock_status)
+    SELECT
+        d.store_id,
+        n.sku,
+        SUM(n.quantity),
+        10,
+        CASE WHEN SUM(n.quantity) < 10 THEN 'Restock Needed' ELSE 'In Stock' END
+    FROM new_deliveries n
+    JOIN Delivery d ON d.delivery_id = n.delivery_id
+    GROUP BY d.store_id, n.sku
+    ON CONFLICT (store_id, sku) DO UPDATE
+    SET quantity_on_hand = Inventory.quantity_on_hand + EXCLUDED.quantity_on_hand,
+        restock_status = CASE
+            WHEN Inventory.quantity_on_hand + EXCLUDED.quantity_on_hand < Inventory.reorder_threshold
+                THEN 'Restock Needed'
+            ELSE 'In Stock'
+        END;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_add_inventory_on_delivery_stmt
+AFTER INSERT ON DeliveryItem
+REFERENCING NEW TABLE AS new_deliveries
+FOR EACH STATEMENT
+EXECUTE FUNCTION add_inventory_on_delivery_stmt();
+
+ALTER TABLE DeliveryItem DISABLE TRIGGER trg_add_inventory_on_delivery_stmt;
+
+
+--===========================================
+-- Indexes
+
+-- B-tree on every foreign key column that no primary key or unique
+-- constraint already leads with, plus the date columns the analytical
+-- queries filter on. Sale rows arrive roughly in sale_datetime order, so a
+-- BRIN index covers all-store date ranges at a fraction of a B-tree's size.
+CREATE INDEX idx_employee_store_id ON Employee (store_id);
+CREATE INDEX idx_employee_department_id ON Employee (department_id);
+CREATE INDEX idx_shiftschedule_employee_id ON ShiftSchedule (employee_id);
+CREATE INDEX idx_shiftschedule_shift_date ON ShiftSchedule (shift_date);
+CREATE INDEX idx_product_category_id ON Product (category_id);
+CREATE INDEX idx_inventory_sku ON Inventory (sku);
+CREATE INDEX idx_vendorproduct_sku ON VendorProduct (sku);
+CREATE INDEX idx_delivery_vendor_id ON Delivery (vendor_id);
+CREATE INDEX idx_delivery_store_id ON Delivery (store_id);
+CREATE INDEX idx_delivery_delivery_date ON Delivery (delivery_date);
+CREATE INDEX idx_deliveryitem_sku ON DeliveryItem (sku);
+CREATE INDEX idx_promotion_sku ON Promotion (sku);
+CREATE INDEX idx_sale_store_id_sale_datetime ON Sale (store_id, sale_datetime);
+CREATE INDEX idx_sale_sale_datetime_brin ON Sale USING brin (sale_datetime);
+CREATE INDEX idx_saleitem_sku ON SaleItem (sku);
+CREATE INDEX idx_saleitem_promo_id ON SaleItem (promo_id);
+CREATE INDEX idx_expense_store_id_expense_date ON Expense (store_id, expense_date);
+CREATE INDEX idx_productreturn_sale_id_sku ON ProductReturn (sale_id, sku);
+CREATE INDEX idx_productreturn_sku ON ProductReturn (sku);
+CREATE INDEX idx_productreturn_reason_code ON ProductReturn (reason_code);
+CREATE INDEX idx_productreturn_return_date ON ProductReturn (return_date);
+
+
+--===========================================
+-- Reporting rollups (recomputed by ETL_Python.py for the store days each
+-- load touches; see rollup.py)
+
+-- One row per store, sale day and SKU. Returns are booked on the day of the
+-- sale they belong to; promo / non-promo follows SaleItem.promo_applied, and
+-- promo_id_orders / promo_id_units count the lines with a promo_id.
+CREATE TABLE daily_store_sku_sales (
+    store_id INTEGER NOT NULL,
+    sale_date DATE NOT NULL,
+    sku varchar(20) NOT NULL,
+    orders INTEGER NOT NULL,
+    units_sold INTEGER NOT NULL,
+    gross_revenue NUMERIC(14,2) NOT NULL,
+    promo_discount NUMERIC(14,2) NOT NULL,
+    returned_units INTEGER NOT NULL,
+    refund_amount NUMERIC(14,2) NOT NULL,
+    promo_orders INTEGER NOT NULL,
+    promo_units INTEGER NOT NULL,
+    nonpromo_orders INTEGER NOT NULL,
+    nonpromo_units INTEGER NOT NULL,
+    promo_id_orders INTEGER NOT NULL,
+    promo_id_units INTEGER NOT NULL,
+    PRIMARY KEY (store_id, sale_date, sku)
+);
+
+-- Distinct orders per store and day, which do not add up across SKUs
+CREATE TABLE daily_store_sales (
+    store_id INTEGER NOT NULL,
+    sale_date DATE NOT NULL,
+    orders INTEGER NOT NULL,
+    units_sold INTEGER NOT NULL,
+    PRIMARY KEY (store_id, sale_date)
+);
+
+CREATE INDEX idx_daily_store_sku_sales_sale_date ON daily_store_sku_sales (sale_date);
+CREATE INDEX idx_daily_store_sku_sales_sku ON daily_store_sku_sales (sku);
+
+-- The dashboard queries are kept as materialized views (mv_q01_... to
+-- mv_q11_...) built from the query pack; ETL_Python.py creates them and
+-- refreshes the ones whose source tables changed, see matviews.py.
+
+
 --===========================================
 -- Cardinality/Relationships
 
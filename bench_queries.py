@@ -0,0 +1,124 @@
+"""Before/after EXPLAIN ANALYZE of the query pack rewrite and its index set.
+
+"before" runs the original pgAdmin queries with none of the INDEX_DDL
+indexes in place; "after" creates them, runs ANALYZE and runs the
+rewritten pack. Every query runs --repeat times under EXPLAIN (ANALYZE,
+BUFFERS, FORMAT JSON). The median execution time, the shared buffers it
+touched and the tables it read with a sequential scan are reported, and
+the full plans can be kept with --plans.
+
+The indexes are dropped and recreated, so this runs against a benchmark
+database (abc_bench, as loaded by bench_scale.py, by default).
+
+    python bench_queries.py --repeat 5 --plans plans
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+
+import psycopg2
+from psycopg2.extensions import make_dsn
+
+from db import resolve_dsn
+from query_pack import ORIGINAL_QUERY_PACK, QUERY_PACK, load_query_pack
+from schema import INDEX_DDL
+
+
+INDEX_NAMES = re.findall(r"CREATE INDEX IF NOT EXISTS (\w+)", INDEX_DDL)
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def explain(cur, sql, repeat):
+    # (median execution ms, shared blocks, seq-scanned tables, last plan)
+    timings = []
+    for _ in range(repeat):
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+        result = cur.fetchone()[0][0]
+        timings.append(result['Execution Time'])
+    top = result['Plan']
+    blocks = top.get('Shared Hit Blocks', 0) + top.get('Shared Read Blocks', 0)
+    seq_scans = sorted({n['Relation Name'] for n in plan_nodes(top) if n['Node Type'] == 'Seq Scan'})
+    return statistics.median(timings), blocks, seq_scans, result
+
+
+def run_pack(conn, queries, repeat):
+    results = {}
+    for number, (title, sql) in queries.items():
+        with conn.cursor() as cur:
+            try:
+                results[number] = explain(cur, sql.strip().rstrip(';'), repeat)
+            except psycopg2.Error as e:
+                results[number] = str(e).strip().splitlines()[0]
+        conn.rollback()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE the query pack before and after the rewrite.")
+    parser.add_argument('--dsn', default=None, help="server to use (default: see db.resolve_dsn)")
+    parser.add_argument('--database', default='abc_bench', help="loaded database to benchmark (default abc_bench)")
+    parser.add_argument('--before', default=ORIGINAL_QUERY_PACK, help="original query pack (zip or directory)")
+    parser.add_argument('--after', default=QUERY_PACK, help="rewritten query pack (zip or directory)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per query; the median is reported")
+    parser.add_argument('--plans', default=None, help="directory to write the JSON plans to")
+    parser.add_argument('--results', default=None, help="JSON lines file results are appended to")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(make_dsn(resolve_dsn(args.dsn), dbname=args.database))
+    runs = {}
+    with conn.cursor() as cur:
+        for name in INDEX_NAMES:
+            cur.execute(f"DROP INDEX IF EXISTS {name};")
+        cur.execute("ANALYZE;")
+    conn.commit()
+    runs['before'] = run_pack(conn, load_query_pack(args.before), args.repeat)
+
+    with conn.cursor() as cur:
+        cur.execute(INDEX_DDL)
+        cur.execute("ANALYZE;")
+    conn.commit()
+    after_queries = load_query_pack(args.after)
+    runs['after'] = run_pack(conn, after_queries, args.repeat)
+    conn.close()
+
+    if args.plans:
+        os.makedirs(args.plans, exist_ok=True)
+        for label, results in runs.items():
+            for number, result in results.items():
+                if isinstance(result, tuple):
+                    with open(os.path.join(args.plans, f"q{number}_{label}.json"), 'w') as f:
+                        json.dump(result[3], f, indent=2)
+
+    print(f"{'query':<48} {'before ms':>10} {'after ms':>10} {'speedup':>8} "
+          f"{'blocks before':>14} {'blocks after':>13}  seq scans before -> after")
+    for number, (title, _) in after_queries.items():
+        before, after = runs['before'].get(number), runs['after'].get(number)
+        label = f"{number}) {title}"[:48]
+        if not isinstance(before, tuple) or not isinstance(after, tuple):
+            print(f"{label:<48} failed: {before if isinstance(before, str) else after}")
+            continue
+        speedup = before[0] / after[0] if after[0] else float('inf')
+        print(f"{label:<48} {before[0]:>10.2f} {after[0]:>10.2f} {speedup:>7.2f}x {before[1]:>14} {after[1]:>13}  "
+              f"{','.join(before[2]) or '-'} -> {','.join(after[2]) or '-'}")
+
+    if args.results:
+        with open(args.results, 'a') as f:
+            for label, results in runs.items():
+                for number, result in results.items():
+                    entry = {'run': label, 'query': number}
+                    if isinstance(result, tuple):
+                        entry.update(execution_ms=result[0], shared_blocks=result[1], seq_scans=result[2])
+                    else:
+                        entry['error'] = result
+                    f.write(json.dumps(entry) + '\n')
+
+
+if __name__ == '__main__':
+    main()
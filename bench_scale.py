@@ -0,0 +1,183 @@
+"""Scale benchmark: generate data, run the full ETL and the 11 analytical queries.
+
+For every scale factor the master CSVs are generated with datagen.py (and
+reused while their parameters are unchanged), loaded by ETL_Python.py into
+a freshly created benchmark database, and every query of the query pack is
+timed. Results are appended to a JSON lines file; each timing is printed
+next to the previous result for the same scale and step, so a regression
+shows up as a ratio well above 1.
+
+    python bench_scale.py --scales xs s --repeat 3
+    python bench_scale.py --scales m --etl-args="--workers 4 --bulk-inventory"
+"""
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import psycopg2
+from psycopg2.extensions import make_dsn, parse_dsn
+
+from datagen import DEFAULT_PROMO_RATE, DEFAULT_RETURN_RATE, SCALE_FACTORS, generate
+from db import resolve_dsn
+from query_pack import QUERY_PACK, load_query_pack
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BENCH_DATABASE = 'abc_bench'
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def recreate_database(dsn, name):
+    # Drop and create the benchmark database from the server's maintenance database
+    conn = psycopg2.connect(make_dsn(dsn, dbname='postgres'))
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f'DROP DATABASE IF EXISTS "{name}";')
+        cur.execute(f"CREATE DATABASE \"{name}\" ENCODING 'UTF8' TEMPLATE template0;")
+    conn.close()
+
+
+def prepare_data(directory, params):
+    # Regenerate only when the parameters differ from the ones on disk
+    manifest = os.path.join(directory, 'datagen.json')
+    if os.path.exists(manifest):
+        with open(manifest) as f:
+            if {k: v for k, v in json.load(f).items() if k != 'rows'} == params:
+                return False
+    counts = generate(directory, **params)
+    with open(manifest, 'w') as f:
+        json.dump({**params, 'rows': counts}, f, indent=2)
+    return True
+
+
+def run_etl(directory, dsn, etl_args):
+    # The ETL reads the master CSVs from its working directory
+    report = os.path.join(directory, 'etl_report.jsonl')
+    if os.path.exists(report):
+        os.remove(report)
+    command = [sys.executable, os.path.join(HERE, 'ETL_Python.py'), '--dsn', dsn, '--report', report] + etl_args
+    began = time.perf_counter()
+    result = subprocess.run(command, cwd=directory, capture_output=True, text=True)
+    seconds = time.perf_counter() - began
+    if result.returncode != 0:
+        raise RuntimeError(f"ETL failed:\n{result.stdout[-2000:]}\n{result.stderr[-2000:]}")
+
+    stages = {}
+    with open(report) as f:
+        for line in f:
+            entry = json.loads(line)
+            stages[entry['stage']] = stages.get(entry['stage'], 0.0) + entry['seconds']
+    return seconds, stages
+
+
+def time_queries(dsn, queries, repeat):
+    conn = psycopg2.connect(dsn)
+    results = {}
+    with conn.cursor() as cur:
+        for number, (title, sql) in queries.items():
+            timings, rows, error = [], None, None
+            for _ in range(repeat):
+                began = time.perf_counter()
+                try:
+                    cur.execute(sql)
+                    rows = len(cur.fetchall())
+                except psycopg2.Error as e:
+                    error = str(e).strip().splitlines()[0]
+                    break
+                finally:
+                    conn.rollback()
+                timings.append(time.perf_counter() - began)
+            results[number] = (title, timings, rows, error)
+    conn.close()
+    return results
+
+
+def previous_results(path):
+    # Latest seconds per (scale, step) already recorded in path
+    latest = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry.get('seconds') is not None:
+                    latest[(entry['scale'], entry['step'])] = entry['seconds']
+    return latest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ETL and query benchmark at several data scale factors.")
+    parser.add_argument('--scales', nargs='+', default=['xs'], choices=list(SCALE_FACTORS))
+    parser.add_argument('--data-dir', default='bench_data', help="generated CSVs go to DATA_DIR/<scale>")
+    parser.add_argument('--dsn', default=None,
+                        help="server to benchmark on (default: see db.resolve_dsn); its database name is "
+                             f"replaced by --database")
+    parser.add_argument('--database', default=BENCH_DATABASE,
+                        help=f"database dropped and recreated for every scale (default {BENCH_DATABASE})")
+    parser.add_argument('--etl-args', default='', help="extra ETL_Python.py arguments, as one string")
+    parser.add_argument('--queries', default=QUERY_PACK, help="query pack directory or zip")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per query; the median is recorded")
+    parser.add_argument('--return-rate', type=float, default=DEFAULT_RETURN_RATE)
+    parser.add_argument('--promo-rate', type=float, default=DEFAULT_PROMO_RATE)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--results', default='bench_results.jsonl', help="JSON lines file results are appended to")
+    args = parser.parse_args()
+
+    base_dsn = resolve_dsn(args.dsn)
+    if parse_dsn(base_dsn).get('dbname') == args.database:
+        parser.error("--database must not be the database of the DSN")
+    dsn = make_dsn(base_dsn, dbname=args.database)
+    queries = load_query_pack(args.queries)
+    previous = previous_results(args.results)
+    revision = git_revision()
+    run_at = datetime.now().isoformat(sep=' ', timespec='seconds')
+
+    summary = []
+    for scale in args.scales:
+        params = dict(SCALE_FACTORS[scale], return_rate=args.return_rate, promo_rate=args.promo_rate, seed=args.seed)
+        directory = os.path.abspath(os.path.join(args.data_dir, scale))
+        began = time.perf_counter()
+        if prepare_data(directory, params):
+            print(f"✅ Generated scale {scale} in {time.perf_counter() - began:.1f}s.")
+
+        recreate_database(base_dsn, args.database)
+        etl_seconds, stages = run_etl(directory, dsn, shlex.split(args.etl_args))
+        steps = [('etl', etl_seconds, None, None, {'stages': stages})]
+        for number, (title, timings, rows, error) in time_queries(dsn, queries, args.repeat).items():
+            seconds = statistics.median(timings) if timings and not error else None
+            steps.append((f"q{number}", seconds, rows, error, {'title': title, 'runs': timings}))
+
+        with open(args.results, 'a') as f:
+            for step, seconds, rows, error, extra in steps:
+                f.write(json.dumps({
+                    'at': run_at, 'revision': revision, 'scale': scale, 'params': params,
+                    'etl_args': args.etl_args, 'step': step, 'seconds': seconds, 'rows': rows,
+                    'error': error, **extra,
+                }) + '\n')
+                summary.append((scale, step, seconds, rows, error, previous.get((scale, step))))
+
+    print(f"{'scale':<6} {'step':<5} {'seconds':>10} {'rows':>9} {'previous':>10} {'ratio':>7}")
+    for scale, step, seconds, rows, error, before in summary:
+        if error:
+            print(f"{scale:<6} {step:<5} {'failed':>10}  {error}")
+            continue
+        earlier = f"{before:.3f}" if before else ''
+        ratio = f"{seconds / before:.2f}x" if before else ''
+        print(f"{scale:<6} {step:<5} {seconds:>10.3f} {rows if rows is not None else '':>9} "
+              f"{earlier:>10} {ratio:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""Benchmark the row-level inventory triggers against the statement-level ones.
+
+The ETL schema is created in a scratch PostgreSQL schema and seeded with
+stores, products, inventory, sales and deliveries. The same SaleItem,
+ProductReturn and DeliveryItem rows are then inserted in multi-row batches
+(one INSERT statement and one commit per batch) under each trigger mode.
+After every run Inventory is checksummed, so the two modes can be seen to
+produce the same stock levels.
+
+    python bench_triggers.py --rows 20000 --batch-sizes 1 100 10000
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from db import resolve_dsn
+from inventory_sync import set_trigger_mode
+from schema import SCHEMA_DDL
+
+
+BENCH_SCHEMA = 'trigger_bench'
+STORES = 5
+SKUS = 200
+START_QTY = 1_000_000
+
+INSERT_SQL = {
+    'SaleItem': """
+        INSERT INTO SaleItem (sale_id, sku, quantity_sold, unit_price, promo_applied)
+        VALUES %s
+    """,
+    'ProductReturn': """
+        INSERT INTO ProductReturn (sale_id, sku, return_date, quantity_returned, reason_code)
+        VALUES %s
+    """,
+    'DeliveryItem': """
+        INSERT INTO DeliveryItem (delivery_id, sku, quantity)
+        VALUES %s
+    """,
+}
+
+
+def sku(i):
+    return f"SKU{i:05d}"
+
+
+def seed(cur, rows, rng):
+    # Dimensions plus enough sales and deliveries to hang `rows` child rows off
+    cur.executemany(
+        "INSERT INTO Store (store_id, address, city, state, zipcode, operating_hours) VALUES (%s, %s, %s, %s, %s, %s)",
+        [(s, f"{s} Main St", 'Springfield', 'NY', '10001', '8am-10pm') for s in range(1, STORES + 1)],
+    )
+    cur.execute("INSERT INTO Category (category_id, category_name) VALUES (1, 'Grocery');")
+    cur.execute("INSERT INTO Vendor (vendor_id, vendor_name, vendor_tier) VALUES (1, 'Bench Vendor', 'A');")
+    cur.execute("INSERT INTO ReturnReason (reason_code, description) VALUES ('DMG', 'Damaged');")
+    execute_values(cur, "INSERT INTO Product (sku, product_name, brand, shelf_location, category_id) VALUES %s",
+                   [(sku(i), f"Product {i}", 'Brand', 'A1', 1) for i in range(SKUS)])
+    execute_values(cur, "INSERT INTO Inventory (store_id, sku, quantity_on_hand, reorder_threshold, restock_status) VALUES %s",
+                   [(s, sku(i), START_QTY, 20, 'In Stock') for s in range(1, STORES + 1) for i in range(SKUS)])
+
+    # Each sale / delivery carries up to 4 distinct skus
+    parents = rows // 4 + 1
+    start = date(2024, 1, 1)
+    execute_values(cur, "INSERT INTO Sale (sale_id, store_id, sale_datetime, payment_type) VALUES %s",
+                   [(n, rng.randint(1, STORES), start + timedelta(minutes=n), 'Cash') for n in range(1, parents + 1)])
+    execute_values(cur, "INSERT INTO Delivery (delivery_id, vendor_id, store_id, delivery_date, status) VALUES %s",
+                   [(n, 1, rng.randint(1, STORES), start, 'Completed') for n in range(1, parents + 1)])
+
+
+def child_rows(rows, rng):
+    # (parent_id, sku) pairs are unique so every row lands
+    pairs = []
+    parent = 1
+    while len(pairs) < rows:
+        for i in rng.sample(range(SKUS), 4):
+            pairs.append((parent, sku(i)))
+        parent += 1
+    pairs = pairs[:rows]
+    return {
+        'SaleItem':      [(p, k, rng.randint(1, 5), 2.50, False) for p, k in pairs],
+        'ProductReturn': [(p, k, date(2024, 2, 1), 1, 'DMG') for p, k in pairs],
+        'DeliveryItem':  [(p, k, rng.randint(6, 48)) for p, k in pairs],
+    }
+
+
+def inventory_checksum(cur):
+    cur.execute("""
+        SELECT md5(string_agg(store_id || ':' || sku || ':' || quantity_on_hand || ':' || restock_status,
+                              ',' ORDER BY store_id, sku))
+        FROM Inventory;
+    """)
+    return cur.fetchone()[0]
+
+
+def run(conn, table, rows, batch):
+    with conn.cursor() as cur:
+        cur.execute(f"TRUNCATE {table};")
+        cur.execute("UPDATE Inventory SET quantity_on_hand = %s;", (START_QTY,))
+    conn.commit()
+
+    began = time.perf_counter()
+    with conn.cursor() as cur:
+        for start in range(0, len(rows), batch):
+            execute_values(cur, INSERT_SQL[table], rows[start:start + batch], page_size=batch)
+            conn.commit()
+    elapsed = time.perf_counter() - began
+
+    with conn.cursor() as cur:
+        checksum = inventory_checksum(cur)
+    return elapsed, checksum
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Row-level vs statement-level inventory trigger benchmark.")
+    parser.add_argument('--dsn', default=None, help="connection string (default: see db.resolve_dsn)")
+    parser.add_argument('--rows', type=int, default=20_000, help="rows inserted per run")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 10_000])
+    parser.add_argument('--tables', nargs='+', default=list(INSERT_SQL), choices=list(INSERT_SQL))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep', action='store_true', help=f"keep the {BENCH_SCHEMA} schema afterwards")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    conn = psycopg2.connect(resolve_dsn(args.dsn))
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+        cur.execute(f"CREATE SCHEMA {BENCH_SCHEMA};")
+        cur.execute(f"SET search_path TO {BENCH_SCHEMA};")
+        # Measure trigger work, not WAL flushes
+        cur.execute("SET synchronous_commit TO off;")
+        cur.execute(SCHEMA_DDL)
+        seed(cur, args.rows, rng)
+    conn.commit()
+
+    data = child_rows(args.rows, rng)
+    results = []
+    try:
+        for table in args.tables:
+            for batch in args.batch_sizes:
+                timings = {}
+                for mode in ('row', 'statement'):
+                    with conn.cursor() as cur:
+                        set_trigger_mode(cur, mode)
+                    conn.commit()
+                    timings[mode] = run(conn, table, data[table], batch)
+                (row_s, row_sum), (stmt_s, stmt_sum) = timings['row'], timings['statement']
+                results.append((table, batch, args.rows / row_s, args.rows / stmt_s, row_s / stmt_s, row_sum == stmt_sum))
+                print(f"{table:<14} batch={batch:<6} row={args.rows / row_s:>10.0f} rows/s  "
+                      f"statement={args.rows / stmt_s:>10.0f} rows/s  match={row_sum == stmt_sum}")
+    finally:
+        if not args.keep:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP SCHEMA {BENCH_SCHEMA} CASCADE;")
+            conn.commit()
+        conn.close()
+
+    print()
+    print(f"{'table':<14} {'batch':>6} {'row rows/s':>12} {'stmt rows/s':>12} {'speedup':>8} {'inventory':>10}")
+    for table, batch, row_rate, stmt_rate, speedup, match in results:
+        print(f"{table:<14} {batch:>6} {row_rate:>12.0f} {stmt_rate:>12.0f} {speedup:>7.2f}x "
+              f"{'same' if match else 'DIFFERS':>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import io
+
+from copy_binary import Unencodable, column_types, encode_frame
+from db import prepare
+
+
+# Rows written to the COPY stream per round trip
+COPY_PAGE_ROWS = 100_000
+
+# Rows bound to one EXECUTE of a prepared multi-row INSERT
+INSERT_PAGE_ROWS = 1_000
+
+# Bytes handed to the connection per read of a binary COPY buffer
+COPY_READ_SIZE = 1 << 20
+
+
+def on_conflict_clause(conflict):
+    if conflict:
+        return f"ON CONFLICT ({', '.join(conflict)}) DO NOTHING"
+    return "ON CONFLICT DO NOTHING"
+
+
+def with_capture(insert, columns, capture):
+    # Also copy the rows insert actually added into capture
+    if not capture:
+        return insert
+    return f"""
+        WITH ins AS ({insert} RETURNING {columns})
+        INSERT INTO {capture} ({columns}) SELECT {columns} FROM ins
+    """
+
+
+def copy_rows(cur, table, df, page_rows=COPY_PAGE_ROWS, binary=False):
+    # COPY df into table page by page, as CSV text or in binary format
+    columns = ', '.join(df.columns)
+    if binary:
+        types = column_types(cur, table, df.columns)
+    for start in range(0, len(df), page_rows):
+        page = df.iloc[start:start + page_rows]
+        if binary:
+            try:
+                buf = io.BytesIO(encode_frame(page, types))
+            except Unencodable:
+                buf = None
+            if buf is not None:
+                cur.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT binary)", buf, COPY_READ_SIZE)
+                continue
+        buf = io.StringIO()
+        page.to_csv(buf, index=False, header=False, na_rep='')
+        buf.seek(0)
+        cur.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def copy_merge(cur, table, df, conflict=None, page_rows=COPY_PAGE_ROWS, capture=None, binary=False):
+    """Bulk load df into table and return the number of rows actually inserted.
+
+    The frame is streamed with COPY FROM STDIN into a temporary staging
+    table that has the same column types as the target, then merged with a
+    single INSERT ... SELECT ... ON CONFLICT DO NOTHING.  Column names of df
+    must match the target table; integer columns that may hold NULLs should
+    use the nullable Int64 dtype so they are not written as floats.
+
+    If capture names an existing table with the same columns, the rows that
+    were actually inserted are also copied into it. binary sends the rows
+    in PostgreSQL's binary COPY format, encoded column-wise by
+    copy_binary.encode_frame() instead of rendered as CSV text.
+    """
+    columns = ', '.join(df.columns)
+    staging = f"stg_{table.lower()}"
+
+    cur.execute(f"DROP TABLE IF EXISTS {staging};")
+    cur.execute(f"""
+        CREATE TEMP TABLE {staging} AS
+        SELECT {columns} FROM {table} WITH NO DATA;
+    """)
+
+    copy_rows(cur, staging, df, page_rows, binary)
+
+    merge = f"""
+        INSERT INTO {table} ({columns})
+        SELECT {columns} FROM {staging}
+        {on_conflict_clause(conflict)}
+    """
+    cur.execute(with_capture(merge, columns, capture))
+    inserted = cur.rowcount
+
+    cur.execute(f"DROP TABLE {staging};")
+    return inserted
+
+
+def copy_append(cur, table, df, conflict=None, page_rows=COPY_PAGE_ROWS, capture=None, binary=False):
+    """COPY df straight into table; returns the number of rows sent.
+
+    For tables without keys to conflict on (see fast_load.py): conflict and
+    capture are accepted for the same signature as copy_merge and ignored.
+    """
+    copy_rows(cur, table, df, page_rows, binary)
+    return len(df)
+
+
+def insert_merge(cur, table, df, conflict=None, page_rows=INSERT_PAGE_ROWS, capture=None):
+    """Load df with a prepared multi-row INSERT ... ON CONFLICT DO NOTHING.
+
+    Same contract as copy_merge, for servers or poolers where COPY is not
+    available. The statement for a full page of page_rows rows is PREPAREd
+    once per connection and run with one EXECUTE per page, so the server
+    parses and plans it once; the last, shorter page is sent as a plain
+    statement. Returns the number of rows actually inserted.
+    """
+    columns = ', '.join(df.columns)
+    width = len(df.columns)
+
+    def statement(rows, placeholder):
+        values = ', '.join(
+            '(' + ', '.join(placeholder(r * width + c) for c in range(width)) + ')' for r in range(rows)
+        )
+        insert = f"INSERT INTO {table} ({columns}) VALUES {values} {on_conflict_clause(conflict)}"
+        return with_capture(insert, columns, capture)
+
+    # Column-wise conversion to Python values with None for NULL
+    data = [df[c].astype(object).where(df[c].notna(), None).tolist() for c in df.columns]
+    rows = list(zip(*data))
+
+    inserted = 0
+    full_pages = len(rows) // page_rows * page_rows
+    if full_pages:
+        name = prepare(cur, statement(page_rows, lambda i: f"${i + 1}"))
+        execute = f"EXECUTE {name} ({', '.join(['%s'] * (page_rows * width))})"
+        for start in range(0, full_pages, page_rows):
+            cur.execute(execute, [v for row in rows[start:start + page_rows] for v in row])
+            inserted += cur.rowcount
+    if full_pages < len(rows):
+        tail = rows[full_pages:]
+        cur.execute(statement(len(tail), lambda i: '%s'), [v for row in tail for v in row])
+        inserted += cur.rowcount
+    return inserted
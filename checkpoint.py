@@ -0,0 +1,87 @@
+CHECKPOINT_DDL = """
+    CREATE TABLE IF NOT EXISTS etl_run (
+        run_id SERIAL PRIMARY KEY,
+        signature TEXT NOT NULL,
+        started_at TIMESTAMP NOT NULL DEFAULT now(),
+        finished_at TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS etl_batch (
+        run_id INTEGER REFERENCES etl_run(run_id) ON DELETE CASCADE,
+        table_name VARCHAR(50) NOT NULL,
+        first_row BIGINT NOT NULL,
+        rows_inserted INTEGER NOT NULL,
+        PRIMARY KEY (run_id, table_name, first_row)
+    );
+
+    CREATE TABLE IF NOT EXISTS etl_table_done (
+        run_id INTEGER REFERENCES etl_run(run_id) ON DELETE CASCADE,
+        table_name VARCHAR(50) NOT NULL,
+        rows_inserted INTEGER NOT NULL,
+        PRIMARY KEY (run_id, table_name)
+    );
+"""
+
+
+class Checkpoint:
+    """Batch and table completion markers for one ETL run.
+
+    A run is identified by a signature of its inputs and options. If the
+    latest run with the same signature never finished, it is resumed:
+    tables it completed are skipped, and so are the batches it committed.
+    A batch is named by the source row number of its first row, which stays
+    the same between runs over the same files with the same options.
+    """
+
+    def __init__(self, cur, signature):
+        cur.execute(CHECKPOINT_DDL)
+        cur.execute("""
+            SELECT run_id FROM etl_run
+            WHERE signature = %s AND finished_at IS NULL
+            ORDER BY run_id DESC
+            LIMIT 1;
+        """, (signature,))
+        row = cur.fetchone()
+        self.resumed = row is not None
+        if row:
+            self.run_id = row[0]
+        else:
+            cur.execute("INSERT INTO etl_run (signature) VALUES (%s) RETURNING run_id;", (signature,))
+            self.run_id = cur.fetchone()[0]
+
+        cur.execute("SELECT table_name, first_row, rows_inserted FROM etl_batch WHERE run_id = %s;", (self.run_id,))
+        self.batches = {}
+        for table, first_row, rows in cur.fetchall():
+            self.batches.setdefault(table, {})[first_row] = rows
+
+        cur.execute("SELECT table_name, rows_inserted FROM etl_table_done WHERE run_id = %s;", (self.run_id,))
+        self.tables = dict(cur.fetchall())
+
+    def table_done(self, table):
+        return table in self.tables
+
+    def split(self, table, df, batch_rows):
+        # Yield (first_row, batch, rows inserted if already committed else None)
+        done = self.batches.get(table, {})
+        for start in range(0, len(df), batch_rows):
+            batch = df.iloc[start:start + batch_rows]
+            first_row = int(batch.index[0])
+            yield first_row, batch, done.get(first_row)
+
+    def record_batch(self, cur, table, first_row, rows):
+        # Called on the load's cursor so the marker commits with the data
+        cur.execute("""
+            INSERT INTO etl_batch (run_id, table_name, first_row, rows_inserted)
+            VALUES (%s, %s, %s, %s);
+        """, (self.run_id, table, first_row, rows))
+
+    def finish_table(self, cur, table, rows):
+        cur.execute("""
+            INSERT INTO etl_table_done (run_id, table_name, rows_inserted)
+            VALUES (%s, %s, %s)
+            ON CONFLICT DO NOTHING;
+        """, (self.run_id, table, rows))
+        self.tables[table] = rows
+
+    def finish_run(self, cur):
+        cur.execute("UPDATE etl_run SET finished_at = now() WHERE run_id = %s;", (self.run_id,))
@@ -0,0 +1,245 @@
+"""PostgreSQL binary COPY encoding straight from DataFrame columns.
+
+The CSV path renders every value as text with to_csv, then the server
+parses it back. encode_frame() builds the binary COPY stream instead, a
+whole column at a time: each column becomes a NumPy array of big-endian
+field bytes (int4, int8, float8, bool, date, time and timestamp at a fixed
+width; numeric at a fixed width per column; text through Arrow's string
+buffers), and the columns are scattered into one preallocated buffer at
+offsets computed from the field lengths. NULLs are length -1 fields with
+no data. No value ever becomes a Python object.
+
+The values stored are the same as through CSV. A float sent to a numeric
+column is encoded as its shortest round-trip decimal, the text to_csv would
+have written, and the server rounds it to the column's scale as it does
+text. An empty string is sent as NULL, as the empty CSV field it becomes
+would be read. Text sent to a date, time or timestamp column is parsed with pandas.
+A float with no exact decimal of up to MAX_NUMERIC_SCALE places raises
+Unencodable, and bulk_load sends that page as CSV.
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    from pyarrow import compute
+except ImportError:
+    pa = None
+
+
+HEADER = b'PGCOPY\n\xff\r\n\x00' + (0).to_bytes(4, 'big') + (0).to_bytes(4, 'big')
+TRAILER = (-1).to_bytes(2, 'big', signed=True)
+
+# Type OIDs of the column types encoders exist for
+BOOL, INT8, INT2, INT4, TEXT, FLOAT8, BPCHAR, VARCHAR, DATE, TIME, TIMESTAMP, NUMERIC = (
+    16, 20, 21, 23, 25, 701, 1042, 1043, 1082, 1083, 1114, 1700,
+)
+
+# PostgreSQL counts dates and timestamps from 2000-01-01
+EPOCH = pd.Timestamp('2000-01-01')
+
+# Fractional digits tried when looking for the decimal a float stands for;
+# four base-10000 groups keep the digit arithmetic within int64
+MAX_NUMERIC_SCALE = 16
+
+NUMERIC_NEG = 0x4000
+
+
+class Unencodable(ValueError):
+    """A value valid for its column that the encoder cannot represent; send it as text instead."""
+
+
+def column_types(cur, table, columns):
+    """Type OIDs of columns of table, read from the description of an empty SELECT."""
+    cur.execute(f"SELECT {', '.join(columns)} FROM {table} LIMIT 0;")
+    return [column.type_code for column in cur.description]
+
+
+def big_endian(values, dtype):
+    # (n, width) uint8 array of values in network byte order
+    values = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('>'))
+    return values.view(np.uint8).reshape(len(values), values.dtype.itemsize)
+
+
+def categorical_map(values, convert):
+    # convert() once per category rather than once per row
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        converted = convert(pd.Series(values.cat.categories))
+        return converted.take(values.cat.codes.to_numpy()[values.notna().to_numpy()])
+    return convert(values[values.notna()])
+
+
+def encode_int(values, dtype):
+    numbers = pd.to_numeric(values[values.notna()]).to_numpy(dtype=np.int64)
+    info = np.iinfo(dtype)
+    if len(numbers) and (numbers.min() < info.min or numbers.max() > info.max):
+        raise ValueError(f"integer out of range for {np.dtype(dtype).name}")
+    return big_endian(numbers, dtype)
+
+
+def encode_float8(values):
+    return big_endian(pd.to_numeric(values[values.notna()]).to_numpy(dtype=np.float64), 'f8')
+
+
+def encode_bool(values):
+    return values[values.notna()].to_numpy(dtype=bool).astype(np.uint8).reshape(-1, 1)
+
+
+def encode_date(values):
+    dates = categorical_map(values, lambda v: pd.Series(pd.to_datetime(v, format='ISO8601')))
+    days = (dates.to_numpy(dtype='datetime64[D]') - np.datetime64(EPOCH.date(), 'D')).astype(np.int64)
+    return big_endian(days, 'i4')
+
+
+def encode_timestamp(values):
+    stamps = categorical_map(values, lambda v: pd.Series(pd.to_datetime(v, format='ISO8601')))
+    micros = (stamps.to_numpy(dtype='datetime64[us]') - np.datetime64(EPOCH, 'us')).astype(np.int64)
+    return big_endian(micros, 'i8')
+
+
+def encode_time(values):
+    def to_micros(v):
+        if pd.api.types.is_timedelta64_dtype(v):
+            return pd.Series(v)
+        return pd.Series(pd.to_timedelta(v.astype(str)))
+    times = categorical_map(values, to_micros)
+    return big_endian(times.to_numpy(dtype='timedelta64[us]').astype(np.int64), 'i8')
+
+
+def decimal_parts(numbers):
+    """(integer, scale) of each float as repr() writes it.
+
+    integer / 10**scale is the value; the smallest scale whose rounded
+    product converts back to the same float is the one repr() would use,
+    except that repr() writes a whole number below 1e16 as 1234.0.
+    """
+    integers = np.zeros(len(numbers), dtype=np.int64)
+    scales = np.zeros(len(numbers), dtype=np.int64)
+    found = np.zeros(len(numbers), dtype=bool)
+    for scale in range(MAX_NUMERIC_SCALE + 1):
+        candidate = np.rint(numbers * 10.0 ** scale)
+        # Beyond 2**53 a float no longer holds every integer exactly
+        fits = np.abs(candidate) < 2.0 ** 53
+        ok = ~found & fits & (np.where(fits, candidate, 0) / 10.0 ** scale == numbers)
+        integers[ok], scales[ok] = candidate[ok], scale
+        found |= ok
+        if found.all():
+            whole = (scales == 0) & (np.abs(numbers) < 1e16)
+            return np.where(whole, integers * 10, integers), np.where(whole, 1, scales)
+    raise Unencodable(f"{numbers[~found][0]!r} has no exact decimal of up to {MAX_NUMERIC_SCALE} places")
+
+
+def base_10000(values, groups):
+    # (n, groups) int16 digits of non-negative values, most significant first
+    digits = np.empty((len(values), groups), dtype=np.int64)
+    for position in range(groups - 1, -1, -1):
+        values, digits[:, position] = np.divmod(values, 10_000)
+    return digits
+
+
+def encode_numeric(values):
+    numbers = pd.to_numeric(values[values.notna()]).to_numpy(dtype=np.float64)
+    if not np.isfinite(numbers).all():
+        raise ValueError("infinite numeric value")
+    integers, scales = decimal_parts(numbers)
+    magnitude = np.abs(integers)
+    whole, fraction = np.divmod(magnitude, 10 ** scales)
+
+    # Every value of the column gets the same digit groups: enough whole
+    # groups for the largest value and fraction groups for the largest
+    # scale; the server strips the zero groups
+    fraction_groups = -(-int(scales.max(initial=0)) // 4)
+    whole_groups = max(1, -(-len(str(int(whole.max(initial=0)))) // 4))
+    fraction = fraction * 10 ** (4 * fraction_groups - scales)
+    digits = np.hstack([base_10000(whole, whole_groups), base_10000(fraction, fraction_groups)])
+
+    header = np.empty((len(numbers), 4), dtype=np.int64)
+    header[:, 0] = whole_groups + fraction_groups
+    header[:, 1] = whole_groups - 1
+    header[:, 2] = np.where(integers < 0, NUMERIC_NEG, 0)
+    header[:, 3] = scales
+    fields = np.hstack([header, digits])
+    return big_endian(fields.ravel(), 'i2').reshape(len(numbers), 2 * fields.shape[1])
+
+
+def encode_text(values):
+    """(starts, sizes, data): the UTF-8 bytes of the non-NULL values, from Arrow's string buffers.
+
+    Value i is data[starts[i]:starts[i] + sizes[i]].
+    """
+    if pa is None:
+        raise ImportError("binary COPY of text columns needs pyarrow")
+    array = pa.array(values[values.notna()], from_pandas=True)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    if pa.types.is_dictionary(array.type):
+        array = compute.take(array.dictionary.cast(pa.string()), array.indices)
+    elif not pa.types.is_string(array.type):
+        array = array.cast(pa.string())
+    if not len(array):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8)
+    _, offsets, data = array.buffers()
+    offsets = np.frombuffer(offsets, dtype=np.int32)[array.offset:array.offset + len(array) + 1].astype(np.int64)
+    data = np.frombuffer(data, dtype=np.uint8) if data is not None else np.empty(0, dtype=np.uint8)
+    return offsets[:-1] - offsets[0], np.diff(offsets), data[offsets[0]:offsets[-1]]
+
+
+FIXED_ENCODERS = {
+    BOOL: encode_bool,
+    INT2: lambda values: encode_int(values, 'i2'),
+    INT4: lambda values: encode_int(values, 'i4'),
+    INT8: lambda values: encode_int(values, 'i8'),
+    FLOAT8: encode_float8,
+    DATE: encode_date,
+    TIME: encode_time,
+    TIMESTAMP: encode_timestamp,
+    NUMERIC: encode_numeric,
+}
+TEXT_TYPES = {TEXT, VARCHAR, BPCHAR}
+
+
+def encode_frame(df, types):
+    """Binary COPY stream (a bytearray) of the rows of df; types are the target columns' type OIDs."""
+    rows, width = df.shape
+    present = np.empty((rows, width), dtype=bool)
+    lengths = np.zeros((rows, width), dtype=np.int64)
+    encoded = []
+    for j, (column, oid) in enumerate(zip(df.columns, types)):
+        values = df[column]
+        present[:, j] = values.notna().to_numpy()
+        if oid in TEXT_TYPES:
+            starts, sizes, data = encode_text(values)
+            # An empty string goes as NULL, like the empty field CSV has for it
+            present[np.flatnonzero(present[:, j])[sizes == 0], j] = False
+            lengths[present[:, j], j] = sizes[sizes > 0]
+            encoded.append((starts[sizes > 0], sizes[sizes > 0], data))
+        elif oid in FIXED_ENCODERS:
+            fields = FIXED_ENCODERS[oid](values)
+            lengths[present[:, j], j] = fields.shape[1]
+            encoded.append(fields)
+        else:
+            raise ValueError(f"no binary COPY encoder for column {column} (type OID {oid})")
+
+    # Field: 4-byte length then the data; row: 2-byte field count then its fields
+    field_sizes = 4 + lengths
+    row_sizes = 2 + field_sizes.sum(axis=1)
+    row_starts = len(HEADER) + np.cumsum(row_sizes) - row_sizes
+    field_starts = row_starts[:, None] + 2 + np.cumsum(field_sizes, axis=1) - field_sizes
+
+    out = bytearray(len(HEADER) + int(row_sizes.sum()) + len(TRAILER))
+    buf = np.frombuffer(out, dtype=np.uint8)
+    buf[:len(HEADER)] = np.frombuffer(HEADER, dtype=np.uint8)
+    buf[row_starts[:, None] + np.arange(2)] = big_endian(np.full(rows, width), 'i2')
+    for j, fields in enumerate(encoded):
+        field_lengths = np.where(present[:, j], lengths[:, j], -1)
+        buf[field_starts[:, j, None] + np.arange(4)] = big_endian(field_lengths, 'i4')
+        starts = field_starts[present[:, j], j] + 4
+        if isinstance(fields, tuple):
+            # Byte p of data, in value i, goes to starts[i] + p - value_starts[i]
+            value_starts, sizes, data = fields
+            buf[np.repeat(starts - value_starts, sizes) + np.arange(len(data))] = data
+        else:
+            buf[starts[:, None] + np.arange(fields.shape[1])] = fields
+    buf[len(out) - len(TRAILER):] = np.frombuffer(TRAILER, dtype=np.uint8)
+    return out
+
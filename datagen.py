@@ -0,0 +1,356 @@
+"""Deterministic synthetic master CSVs for the ABC Foodmart ETL.
+
+Writes Sales_Master.csv, Shift_Master.csv, Delivery_Master.csv and
+Expense_Master.csv with the columns ETL_Python.py reads, at a named scale
+factor or with explicit sizes. The same seed and sizes always produce
+byte-identical files.
+
+    python datagen.py --scale s --out bench_data/s
+    python datagen.py --stores 4 --skus 300 --days 60 --baskets-per-day 80 --out data
+"""
+import argparse
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+START_DATE = date(2023, 7, 1)
+
+SCALE_FACTORS = {
+    'xs': dict(stores=3,  skus=200,  days=31,  baskets_per_day=40),
+    's':  dict(stores=5,  skus=1000, days=92,  baskets_per_day=150),
+    'm':  dict(stores=10, skus=3000, days=184, baskets_per_day=400),
+    'l':  dict(stores=25, skus=8000, days=365, baskets_per_day=800),
+}
+DEFAULT_RETURN_RATE = 0.03
+DEFAULT_PROMO_RATE = 0.2
+
+# Days of sales generated and written per step, which bounds memory use
+DAYS_PER_BLOCK = 7
+
+# Baskets are rung up between 8am and 10pm; returns come back within two weeks
+OPEN_MINUTE = 8 * 60
+CLOSE_MINUTE = 22 * 60
+MAX_RETURN_LAG = 14
+
+SALES_COLUMNS = [
+    'store_id', 'address', 'city', 'state', 'zipcode', 'operating_hours', 'category_id', 'category_name',
+    'sku', 'product_name', 'brand', 'shelf_location', 'price_date', 'regular_price', 'promo_price',
+    'inventory_id', 'quantity_on_hand', 'reorder_threshold', 'primary_vendor_id', 'vendor_name', 'vendor_tier',
+    'promo_id', 'start_date', 'end_date', 'discount_amount', 'sale_id', 'sale_datetime', 'payment_type',
+    'quantity_sold', 'unit_price', 'promo_applied', 'promo_discount', 'reason_code', 'description',
+    'return_exists', 'return_id', 'return_date', 'quantity_returned',
+]
+SHIFT_COLUMNS = [
+    'schedule_id', 'employee_id', 'first_name', 'last_name', 'email', 'phone', 'role', 'store_id',
+    'department_id', 'department_name', 'shift_date', 'start_time', 'end_time',
+]
+DELIVERY_COLUMNS = ['delivery_id', 'vendor_id', 'store_id', 'delivery_date', 'status', 'sku', 'delivered_quantity']
+EXPENSE_COLUMNS = ['store_id', 'expense_date', 'expense_category', 'amount']
+
+CATEGORIES = [
+    'Produce', 'Dairy', 'Bakery', 'Meat', 'Seafood', 'Frozen',
+    'Beverage', 'Snacks', 'Pantry', 'Household', 'Personal Care', 'Deli',
+]
+CITIES = [
+    ('Springfield', 'IL', '62701'), ('Madison', 'WI', '53703'), ('Columbus', 'OH', '43215'),
+    ('Albany', 'NY', '12207'), ('Salem', 'OR', '97301'), ('Austin', 'TX', '78701'),
+    ('Boston', 'MA', '02108'), ('Denver', 'CO', '80202'),
+]
+PAYMENT_TYPES = ['Cash', 'Credit Card', 'Mobile']
+PAYMENT_WEIGHTS = [0.25, 0.55, 0.20]
+RETURN_REASONS = [
+    ('DMG', 'Damaged'), ('EXP', 'Expired'), ('WRG', 'Wrong item'),
+    ('QLT', 'Quality issue'), ('CHG', 'Changed mind'),
+]
+# department_id -> (name, staff role)
+DEPARTMENTS = {
+    1: ('Front End', 'Cashier'),
+    2: ('Grocery', 'Stock Clerk'),
+    3: ('Produce', 'Produce Clerk'),
+    4: ('Bakery', 'Baker'),
+    5: ('Deli', 'Deli Clerk'),
+}
+EMPLOYEES_PER_STORE = 8
+SHIFTS = [('06:00:00', '14:00:00'), ('14:00:00', '22:00:00'), ('22:00:00', '06:00:00')]
+
+# Share of SKUs that run a promotion; their lines are sold on promotion often
+# enough for the overall share of promotional lines to match promo_rate
+PROMOTED_SHARE = 0.5
+
+
+def catalogue(rng, skus, days, promo_rate):
+    # One row per SKU with its category, vendor, price and promotion
+    vendors = max(3, skus // 50)
+    vendor_tier = rng.choice(['A', 'B', 'C'], size=vendors, p=[0.3, 0.5, 0.2])
+    category_id = rng.integers(1, len(CATEGORIES) + 1, size=skus)
+    vendor_id = rng.integers(1, vendors + 1, size=skus)
+    regular_price = np.round(rng.gamma(2.0, 2.5, size=skus) + 0.49, 2)
+
+    promoted = rng.random(skus) < PROMOTED_SHARE
+    discount = np.round(regular_price * rng.uniform(0.1, 0.3, size=skus), 2)
+    end = START_DATE + timedelta(days=days - 1)
+
+    idx = np.arange(skus)
+    products = pd.DataFrame({
+        'sku': [f"SKU{i:06d}" for i in idx + 1],
+        'product_name': [f"{CATEGORIES[c - 1]} Item {i}" for c, i in zip(category_id, idx + 1)],
+        'brand': [f"Brand {b}" for b in rng.integers(1, max(2, skus // 20) + 1, size=skus)],
+        'shelf_location': [f"{chr(65 + a)}{n}" for a, n in zip(rng.integers(0, 12, size=skus),
+                                                              rng.integers(1, 21, size=skus))],
+        'category_id': category_id,
+        'category_name': [CATEGORIES[c - 1] for c in category_id],
+        'primary_vendor_id': vendor_id,
+        'vendor_name': [f"Vendor {v}" for v in vendor_id],
+        'vendor_tier': vendor_tier[vendor_id - 1],
+        'price_date': START_DATE.isoformat(),
+        'regular_price': regular_price,
+        'promo_price': np.where(promoted, np.round(regular_price - discount, 2), np.nan),
+        'promoted': promoted,
+        'promo_id': np.where(promoted, np.cumsum(promoted), 0),
+        'start_date': START_DATE.isoformat(),
+        'end_date': end.isoformat(),
+        'discount_amount': discount,
+    })
+    line_promo_chance = min(1.0, promo_rate / PROMOTED_SHARE)
+    return products, vendors, line_promo_chance
+
+
+def stores_frame(stores):
+    rows = []
+    for s in range(1, stores + 1):
+        city, state, zipcode = CITIES[(s - 1) % len(CITIES)]
+        rows.append((s, f"{100 + 7 * s} Market St", city, state, zipcode, '8am-10pm'))
+    return pd.DataFrame(rows, columns=['store_id', 'address', 'city', 'state', 'zipcode', 'operating_hours'])
+
+
+def sales_block(rng, first_day, block_days, store_df, baskets_per_day, products, stock, line_promo_chance,
+                return_rate, next_sale_id, next_return_id):
+    # Sale lines for block_days days starting at first_day, in sale_id order
+    stores, skus = len(store_df), len(products)
+    baskets = stores * block_days * baskets_per_day
+    day = np.repeat(np.arange(block_days), stores * baskets_per_day)
+    store = np.tile(np.repeat(np.arange(1, stores + 1), baskets_per_day), block_days)
+    minute = rng.integers(OPEN_MINUTE, CLOSE_MINUTE, size=baskets)
+    order = np.lexsort((store, minute, day))
+    day, store, minute = day[order], store[order], minute[order]
+    sale_id = np.arange(next_sale_id, next_sale_id + baskets)
+    payment = rng.choice(len(PAYMENT_TYPES), size=baskets, p=PAYMENT_WEIGHTS)
+
+    # 1-6 distinct SKUs per basket: a popularity-weighted first SKU, then
+    # steps small enough that six of them never wrap onto an earlier one
+    items = 1 + rng.binomial(5, 0.5, size=baskets)
+    basket = np.repeat(np.arange(baskets), items)
+    lines = len(basket)
+    first = np.cumsum(items) - items
+    position = np.arange(lines) - np.repeat(first, items)
+    step = np.where(position == 0, 0, rng.integers(1, max(2, (skus - 1) // 5 + 1), size=lines))
+    offset = np.cumsum(step) - np.repeat(np.cumsum(step)[first], items)
+    sku = (np.repeat(rng.choice(skus, size=baskets, p=stock['popularity']), items) + offset) % skus
+
+    line_store = store[basket]
+    quantity = np.minimum(rng.geometric(0.55, size=lines), 12)
+    promo = products['promoted'].to_numpy()[sku] & (rng.random(lines) < line_promo_chance)
+    returned = rng.random(lines) < return_rate
+    return_lag = rng.integers(1, MAX_RETURN_LAG + 1, size=lines)
+    returned_qty = np.minimum(rng.integers(1, 13, size=lines), quantity)
+    reason = rng.integers(0, len(RETURN_REASONS), size=lines)
+
+    # Timestamps and return dates come from small lookup tables of strings
+    dates = [START_DATE + timedelta(days=first_day + d) for d in range(block_days + MAX_RETURN_LAG)]
+    minutes = [f"{m // 60:02d}:{m % 60:02d}:00" for m in range(OPEN_MINUTE, CLOSE_MINUTE)]
+    timestamps = np.array([f"{d.isoformat()} {m}" for d in dates[:block_days] for m in minutes], dtype=object)
+    iso_dates = np.array([d.isoformat() for d in dates], dtype=object)
+    line_day = day[basket]
+
+    p = products.iloc[sku].reset_index(drop=True)
+    pair = (line_store - 1) * skus + sku
+    stock['sold'][pair] = True
+    df = pd.DataFrame({
+        'category_id': p['category_id'], 'category_name': p['category_name'],
+        'sku': p['sku'], 'product_name': p['product_name'], 'brand': p['brand'],
+        'shelf_location': p['shelf_location'], 'price_date': p['price_date'],
+        'regular_price': p['regular_price'], 'promo_price': p['promo_price'],
+        'inventory_id': pair + 1,
+        'quantity_on_hand': stock['quantity_on_hand'][pair],
+        'reorder_threshold': stock['reorder_threshold'][pair],
+        'primary_vendor_id': p['primary_vendor_id'], 'vendor_name': p['vendor_name'],
+        'vendor_tier': p['vendor_tier'],
+        'promo_id': pd.array(np.where(promo, p['promo_id'], 0), dtype='Int64'),
+        'start_date': np.where(promo, p['start_date'], None),
+        'end_date': np.where(promo, p['end_date'], None),
+        'discount_amount': np.where(promo, p['discount_amount'], np.nan),
+        'sale_id': sale_id[basket],
+        'sale_datetime': timestamps[line_day * len(minutes) + minute[basket] - OPEN_MINUTE],
+        'payment_type': np.array(PAYMENT_TYPES, dtype=object)[payment[basket]],
+        'quantity_sold': quantity,
+        'unit_price': p['regular_price'],
+        'promo_applied': promo,
+        'promo_discount': np.where(promo, p['discount_amount'], np.nan),
+        'reason_code': np.where(returned, np.array([r[0] for r in RETURN_REASONS], dtype=object)[reason], None),
+        'description': np.where(returned, np.array([r[1] for r in RETURN_REASONS], dtype=object)[reason], None),
+        'return_exists': returned,
+        'return_id': pd.array(next_return_id + np.cumsum(returned) - 1, dtype='Int64'),
+        'return_date': np.where(returned, iso_dates[line_day + return_lag], None),
+        'quantity_returned': pd.array(returned_qty, dtype='Int64'),
+    })
+    df.loc[~promo, 'promo_id'] = pd.NA
+    df.loc[~returned, ['return_id', 'quantity_returned']] = pd.NA
+
+    store_rows = store_df.iloc[line_store - 1].reset_index(drop=True)
+    df = pd.concat([store_rows, df], axis=1)
+    return df[SALES_COLUMNS], next_sale_id + baskets, next_return_id + int(returned.sum())
+
+
+def shift_frame(rng, stores, days):
+    staff = []
+    employee_id = 1
+    for s in range(1, stores + 1):
+        for k in range(EMPLOYEES_PER_STORE):
+            if k == 0:
+                department_id, role = 1, 'Store Manager'
+            else:
+                department_id = 1 + (k - 1) % len(DEPARTMENTS)
+                role = DEPARTMENTS[department_id][1]
+            staff.append((employee_id, s, department_id, role))
+            employee_id += 1
+
+    days_off = {e: set(rng.choice(7, size=2, replace=False).tolist()) for e, _, _, role in staff
+                if role != 'Store Manager'}
+    rows = []
+    schedule_id = 1
+    for d in range(days):
+        shift_date = (START_DATE + timedelta(days=d)).isoformat()
+        for e, s, department_id, role in staff:
+            if role == 'Store Manager':
+                if d % 7 in (5, 6):
+                    continue
+                start, end = SHIFTS[0]
+            else:
+                if d % 7 in days_off[e]:
+                    continue
+                start, end = SHIFTS[(e + d // 7) % len(SHIFTS)]
+            rows.append((schedule_id, e, f"First{e}", f"Last{e}", f"emp{e}@abcfoodmart.com",
+                         f"555-{e:05d}", role, s, department_id, DEPARTMENTS[department_id][0],
+                         shift_date, start, end))
+            schedule_id += 1
+    return pd.DataFrame(rows, columns=SHIFT_COLUMNS)
+
+
+def delivery_frame(rng, stores, days, products, vendors, sold):
+    # Weekly delivery per vendor and store, only of SKUs the store stocks
+    skus = len(products)
+    vendor_of = products['primary_vendor_id'].to_numpy()
+    tier_delay = {'A': 0.05, 'B': 0.12, 'C': 0.25}
+    tiers = products.drop_duplicates('primary_vendor_id').set_index('primary_vendor_id')['vendor_tier']
+    rows = []
+    delivery_id = 1
+    for d in range(days):
+        delivery_date = (START_DATE + timedelta(days=d)).isoformat()
+        for v in range(1, vendors + 1):
+            if (v + d) % 7 or v not in tiers.index:
+                continue
+            for s in range(1, stores + 1):
+                stocked = np.flatnonzero((vendor_of == v) & sold[(s - 1) * skus:s * skus])
+                if not len(stocked):
+                    continue
+                chosen = np.sort(rng.choice(stocked, size=min(8, len(stocked)), replace=False))
+                status = 'Delayed' if rng.random() < tier_delay[tiers[v]] else 'Completed'
+                for i in chosen:
+                    rows.append((delivery_id, v, s, delivery_date, status, products['sku'].iat[i],
+                                 12 * int(rng.integers(1, 9))))
+                delivery_id += 1
+    return pd.DataFrame(rows, columns=DELIVERY_COLUMNS)
+
+
+def expense_frame(rng, stores, days):
+    rows = []
+    for d in range(days):
+        day = START_DATE + timedelta(days=d)
+        for s in range(1, stores + 1):
+            rows.append((s, day.isoformat(), 'Wages', round(rng.normal(900, 120), 2)))
+            if day.day == 1:
+                rows.append((s, day.isoformat(), 'Utilities', round(rng.uniform(1500, 3000), 2)))
+            if rng.random() < 0.6:
+                rows.append((s, day.isoformat(), 'Spoilage', round(rng.uniform(20, 400), 2)))
+            if rng.random() < 0.2:
+                rows.append((s, day.isoformat(), 'Other', round(rng.uniform(10, 250), 2)))
+    return pd.DataFrame(rows, columns=EXPENSE_COLUMNS)
+
+
+def generate(out, stores, skus, days, baskets_per_day, return_rate=DEFAULT_RETURN_RATE,
+             promo_rate=DEFAULT_PROMO_RATE, seed=42):
+    """Write the four master CSVs into out and return their row counts."""
+    os.makedirs(out, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    products, vendors, line_promo_chance = catalogue(rng, skus, days, promo_rate)
+
+    popularity = 1.0 / np.arange(1, skus + 1) ** 0.8
+    stock = {
+        'popularity': popularity / popularity.sum(),
+        'quantity_on_hand': rng.integers(200, 2000, size=stores * skus),
+        'reorder_threshold': rng.integers(10, 41, size=stores * skus),
+        'sold': np.zeros(stores * skus, dtype=bool),
+    }
+    store_df = stores_frame(stores)
+
+    counts = {}
+    sales_path = os.path.join(out, 'Sales_Master.csv')
+    next_sale_id, next_return_id, lines = 1, 1, 0
+    for first_day in range(0, days, DAYS_PER_BLOCK):
+        block_days = min(DAYS_PER_BLOCK, days - first_day)
+        df, next_sale_id, next_return_id = sales_block(
+            rng, first_day, block_days, store_df, baskets_per_day, products, stock, line_promo_chance,
+            return_rate, next_sale_id, next_return_id,
+        )
+        df.to_csv(sales_path, mode='w' if first_day == 0 else 'a', header=first_day == 0, index=False)
+        lines += len(df)
+    counts['Sales_Master.csv'] = lines
+
+    frames = {
+        'Shift_Master.csv': shift_frame(rng, stores, days),
+        'Delivery_Master.csv': delivery_frame(rng, stores, days, products, vendors, stock['sold']),
+        'Expense_Master.csv': expense_frame(rng, stores, days),
+    }
+    for name, df in frames.items():
+        df.to_csv(os.path.join(out, name), index=False)
+        counts[name] = len(df)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate deterministic ABC Foodmart master CSVs.")
+    parser.add_argument('--out', required=True, help="directory the four CSVs are written to")
+    parser.add_argument('--scale', choices=list(SCALE_FACTORS), help="named scale factor; explicit sizes override it")
+    parser.add_argument('--stores', type=int)
+    parser.add_argument('--skus', type=int)
+    parser.add_argument('--days', type=int)
+    parser.add_argument('--baskets-per-day', type=int, help="baskets per store per day")
+    parser.add_argument('--return-rate', type=float, default=DEFAULT_RETURN_RATE, help="share of sale lines returned")
+    parser.add_argument('--promo-rate', type=float, default=DEFAULT_PROMO_RATE,
+                        help=f"share of sale lines sold on promotion (at most {PROMOTED_SHARE})")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    sizes = dict(SCALE_FACTORS[args.scale]) if args.scale else {}
+    for name in ('stores', 'skus', 'days', 'baskets_per_day'):
+        if getattr(args, name) is not None:
+            sizes[name] = getattr(args, name)
+        elif name not in sizes:
+            parser.error(f"--{name.replace('_', '-')} is required without --scale")
+    if sizes['skus'] < 6:
+        parser.error("--skus must be at least 6")
+
+    counts = generate(args.out, return_rate=args.return_rate, promo_rate=args.promo_rate, seed=args.seed, **sizes)
+    with open(os.path.join(args.out, 'datagen.json'), 'w') as f:
+        json.dump({**sizes, 'return_rate': args.return_rate, 'promo_rate': args.promo_rate,
+                   'seed': args.seed, 'rows': counts}, f, indent=2)
+    for name, count in counts.items():
+        print(f"✅ {count} rows written to {os.path.join(args.out, name)}.")
+
+
+if __name__ == '__main__':
+    main()
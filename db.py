@@ -0,0 +1,118 @@
+import configparser
+import hashlib
+import os
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool
+
+
+# Used when neither the environment nor a config file names a database
+DEFAULT_DSN = "dbname=ABCFoodmart user=postgres host=localhost password=123"
+
+DSN_ENV = 'ABC_DSN'
+DEFAULT_CONFIG = 'database.ini'
+
+
+def resolve_dsn(dsn=None, config_path=None):
+    """Connection string from, in order: dsn, $ABC_DSN, a config file, DEFAULT_DSN.
+
+    The config file is an INI file whose [database] section holds either a
+    dsn entry or libpq keywords (host, port, dbname, user, password, ...).
+    Settings left out of the DSN fall back to libpq's own PG* variables.
+    """
+    if dsn:
+        return dsn
+    if os.environ.get(DSN_ENV):
+        return os.environ[DSN_ENV]
+    config_path = config_path or DEFAULT_CONFIG
+    if os.path.exists(config_path):
+        config = configparser.ConfigParser()
+        config.read(config_path)
+        if config.has_section('database'):
+            section = dict(config['database'])
+            if 'dsn' in section:
+                return section['dsn']
+            return ' '.join(f"{key}={value}" for key, value in section.items())
+    return DEFAULT_DSN
+
+
+class MeteredCursor(psycopg2.extensions.cursor):
+    """Cursor that counts the bytes of the statements and COPY data it sends."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bytes_sent = 0
+
+    def execute(self, query, vars=None):
+        try:
+            return super().execute(query, vars)
+        finally:
+            if self.query:
+                self.bytes_sent += len(self.query)
+
+    def copy_expert(self, sql, file, size=8192):
+        start = file.tell()
+        end = file.seek(0, 2)
+        file.seek(start)
+        self.bytes_sent += len(sql) + end - start
+        return super().copy_expert(sql, file, size)
+
+
+class Connection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers the statements PREPAREd on it.
+
+    Its cursors are MeteredCursors.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.cursor_factory = MeteredCursor
+
+
+class Database:
+    """One database: its DSN, a main connection factory and a shared pool.
+
+    The pool is created on first use with room for max_connections, and
+    hands out Connection objects so prepared statements are tracked per
+    session.
+    """
+
+    def __init__(self, dsn, max_connections=1):
+        self.dsn = dsn
+        self.max_connections = max_connections
+        self._pool = None
+
+    def connect(self):
+        return psycopg2.connect(self.dsn, connection_factory=Connection)
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ThreadedConnectionPool(1, self.max_connections, self.dsn, connection_factory=Connection)
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.closeall()
+            self._pool = None
+
+
+def prepare(cur, sql):
+    """Name of a server-side prepared statement for sql, PREPAREd once per session.
+
+    Prepared statements outlive transactions, so one PREPARE serves every
+    later batch on the same connection.
+    """
+    name = 'etl_' + hashlib.md5(sql.encode()).hexdigest()[:16]
+    prepared = getattr(cur.connection, 'prepared', None)
+    if prepared is None:
+        # Plain psycopg2 connection: ask the server
+        cur.execute("SELECT 1 FROM pg_prepared_statements WHERE name = %s;", (name,))
+        if cur.fetchone() is None:
+            cur.execute(f"PREPARE {name} AS {sql}")
+    elif name not in prepared:
+        cur.execute(f"PREPARE {name} AS {sql}")
+        prepared.add(name)
+    return name
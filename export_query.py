@@ -0,0 +1,255 @@
+"""Stream the result of a pack query to CSV, JSON lines or Parquet.
+
+Nothing is fetched into memory as a whole. CSV goes through COPY (query) TO
+STDOUT and is written as the server sends it. JSON lines and Parquet read a
+named (server-side) cursor --batch-size rows at a time, and a Parquet row
+group is written for each batch. A progress line counts what has been
+written so far. CSV and JSON lines can be compressed with gzip or zstd
+(zstd needs the zstandard package); Parquet uses the codec inside the file.
+
+    python export_query.py 1 -o daily_net_revenue.csv.gz --compress gzip
+    python export_query.py 6 --format parquet --compress zstd -o units_per_day.parquet
+    python export_query.py 11 --format jsonl --rollup
+"""
+import argparse
+import gzip
+import json
+import re
+import sys
+import time
+from datetime import date, datetime, time as time_of_day
+from decimal import Decimal
+
+import psycopg2
+
+from db import resolve_dsn
+from query_pack import QUERY_PACK, ROLLUP_QUERY_PACK, load_query_pack, statement_body
+
+try:
+    import pyarrow as pa
+    from pyarrow import parquet
+except ImportError:
+    pa = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+FORMATS = ('csv', 'jsonl', 'parquet')
+
+# File suffix of each format and compression
+EXTENSIONS = {'csv': '.csv', 'jsonl': '.jsonl', 'parquet': '.parquet', 'gzip': '.gz', 'zstd': '.zst'}
+
+BATCH_SIZE = 10_000
+
+# Bytes of COPY output gathered before each write to the (compressed) file
+WRITE_BUFFER = 1 << 20
+
+# Seconds between two updates of the progress line
+PROGRESS_INTERVAL = 0.5
+
+# Arrow types of the PostgreSQL types the pack returns, by type OID; numerics
+# with a declared precision become decimals, other types strings
+ARROW_TYPES = {
+    16: 'bool_', 20: 'int64', 21: 'int16', 23: 'int32', 700: 'float32', 701: 'float64',
+    1700: 'float64', 1082: 'date32', 1083: 'time64', 1114: 'timestamp', 1184: 'timestamp',
+}
+
+
+class Progress:
+    """Rows (and bytes) written so far, reported on one line of stderr."""
+
+    def __init__(self, quiet=False):
+        self.rows = self.bytes = 0
+        self.quiet = quiet
+        self.started = self.shown = time.perf_counter()
+
+    def update(self, rows=0, nbytes=0):
+        self.rows += rows
+        self.bytes += nbytes
+        now = time.perf_counter()
+        if not self.quiet and now - self.shown >= PROGRESS_INTERVAL:
+            self.shown = now
+            self.show(now)
+
+    def show(self, now):
+        counted = f"{self.rows:,} rows" if self.rows else f"{self.bytes / 1e6:,.1f} MB"
+        print(f"\r... {counted} in {now - self.started:.1f}s", end='', file=sys.stderr, flush=True)
+
+    def done(self):
+        if not self.quiet and self.shown > self.started:
+            self.show(time.perf_counter())
+            print(file=sys.stderr)
+
+
+class CountingWriter:
+    # File-like target for copy_expert; COPY TO hands it one row at a time,
+    # which is passed on in WRITE_BUFFER blocks
+    def __init__(self, out, progress):
+        self.out, self.progress = out, progress
+        self.pending, self.size = [], 0
+
+    def write(self, data):
+        self.pending.append(data)
+        self.size += len(data)
+        if self.size >= WRITE_BUFFER:
+            self.flush()
+
+    def flush(self):
+        self.out.write(b''.join(self.pending))
+        self.progress.update(nbytes=self.size)
+        self.pending, self.size = [], 0
+
+
+def open_output(path, compress=None):
+    """Binary file object for path, compressed on the way out if asked to."""
+    if compress == 'gzip':
+        # Level 6 like the gzip tool; gzip.open's 9 is several times slower
+        return gzip.open(path, 'wb', compresslevel=6)
+    if compress == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstd compression needs the zstandard package")
+        return zstandard.open(path, 'wb')
+    return open(path, 'wb')
+
+
+def export_csv(conn, sql, out, progress):
+    # COPY formats the rows on the server and streams them as it goes
+    writer = CountingWriter(out, progress)
+    with conn.cursor() as cur:
+        cur.copy_expert(f"COPY (\n{statement_body(sql)}\n) TO STDOUT WITH (FORMAT csv, HEADER)".encode(), writer)
+        writer.flush()
+        progress.rows = cur.rowcount
+
+
+def json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime, time_of_day)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def batches(conn, sql, batch_size):
+    """Yield the cursor description, then lists of at most batch_size rows."""
+    with conn.cursor(name='export_query') as cur:
+        cur.itersize = batch_size
+        # The pack's comments are not ASCII; see MaterializedViews.ensure()
+        cur.execute(statement_body(sql).encode())
+        rows = cur.fetchmany(batch_size)
+        yield cur.description
+        while rows:
+            yield rows
+            rows = cur.fetchmany(batch_size)
+
+
+def export_jsonl(conn, sql, out, progress, batch_size=BATCH_SIZE):
+    stream = batches(conn, sql, batch_size)
+    names = [column.name for column in next(stream)]
+    for rows in stream:
+        lines = ''.join(json.dumps(dict(zip(names, row)), default=json_value) + '\n' for row in rows)
+        out.write(lines.encode())
+        progress.update(rows=len(rows))
+
+
+def arrow_schema(description):
+    fields = []
+    for column in description:
+        kind = ARROW_TYPES.get(column.type_code)
+        # Unconstrained numerics report a precision of 65535
+        if column.type_code == 1700 and column.precision and column.precision <= 38:
+            arrow_type = pa.decimal128(column.precision, column.scale)
+        elif kind in ('time64', 'timestamp'):
+            arrow_type = getattr(pa, kind)('us')
+        elif kind:
+            arrow_type = getattr(pa, kind)()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def arrow_column(values, arrow_type):
+    # Decimals do not convert to doubles directly; they do through a decimal array
+    if pa.types.is_floating(arrow_type):
+        return pa.array(values).cast(arrow_type)
+    return pa.array(values, type=arrow_type)
+
+
+def export_parquet(conn, sql, path, progress, batch_size=BATCH_SIZE, compress=None):
+    if pa is None:
+        raise ImportError("Parquet export needs pyarrow")
+    stream = batches(conn, sql, batch_size)
+    schema = arrow_schema(next(stream))
+    with parquet.ParquetWriter(path, schema, compression=compress or 'none') as writer:
+        for rows in stream:
+            writer.write_table(pa.Table.from_arrays(
+                [arrow_column(values, field.type) for values, field in zip(zip(*rows), schema)], schema=schema))
+            progress.update(rows=len(rows))
+        if not progress.rows:
+            writer.write_table(schema.empty_table())
+
+
+def export_query(conn, sql, path, fmt='csv', compress=None, batch_size=BATCH_SIZE, quiet=False):
+    """Write the result of sql to path; returns the number of rows written."""
+    progress = Progress(quiet)
+    try:
+        if fmt == 'parquet':
+            export_parquet(conn, sql, path, progress, batch_size, compress)
+        else:
+            with open_output(path, compress) as out:
+                if fmt == 'csv':
+                    export_csv(conn, sql, out, progress)
+                else:
+                    export_jsonl(conn, sql, out, progress, batch_size)
+    finally:
+        progress.done()
+        conn.rollback()
+    return progress.rows
+
+
+def default_path(number, title, fmt, compress=None):
+    slug = re.sub(r"[^a-z0-9]+", '_', title.lower()).strip('_')
+    suffix = EXTENSIONS[fmt] + (EXTENSIONS[compress] if compress and fmt != 'parquet' else '')
+    return f"q{number:02d}_{slug}{suffix}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream the result of a pack query to a file.")
+    parser.add_argument('query', type=int, help="number of the query in the pack")
+    parser.add_argument('--dsn', default=None, help="database to use (default: see db.resolve_dsn)")
+    parser.add_argument('--pack', default=QUERY_PACK, help="query pack (zip or directory)")
+    parser.add_argument('--rollup', action='store_true',
+                        help="use the rollup version of the query where there is one")
+    parser.add_argument('--format', choices=FORMATS, default='csv', help="output format (default: csv)")
+    parser.add_argument('--compress', choices=('gzip', 'zstd'), default=None, help="compress the output")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help=f"rows fetched and written at a time (default: {BATCH_SIZE})")
+    parser.add_argument('-o', '--output', default=None, help="file to write (default: named after the query)")
+    parser.add_argument('--quiet', action='store_true', help="do not print progress")
+    args = parser.parse_args()
+
+    queries = load_query_pack(args.pack)
+    if args.rollup:
+        queries.update(load_query_pack(ROLLUP_QUERY_PACK))
+    if args.query not in queries:
+        parser.error(f"query {args.query} is not in {args.pack}")
+    title, sql = queries[args.query]
+    path = args.output or default_path(args.query, title, args.format, args.compress)
+
+    conn = psycopg2.connect(resolve_dsn(args.dsn))
+    started = time.perf_counter()
+    try:
+        rows = export_query(conn, sql, path, args.format, args.compress, args.batch_size, args.quiet)
+    except (ImportError, psycopg2.Error) as e:
+        print(f"❌ Error exporting query {args.query}: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+    print(f"✅ {rows} rows of query {args.query} written to {path} in {time.perf_counter() - started:.2f}s.")
+
+
+if __name__ == '__main__':
+    main()
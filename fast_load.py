@@ -0,0 +1,169 @@
+"""Fast initial load: tables loaded bare, constraints and indexes built after.
+
+A first load into an empty database spends most of its time maintaining
+what the schema puts on the tables: every row is written to the WAL,
+checked against its foreign keys, inserted into each index and, for sale,
+return and delivery lines, passed through an inventory trigger.
+ETL_Python.py --fast-load takes all of that off for the load:
+
+1. The schema is created as usual. FastLoad reads the primary keys, unique
+   and foreign key constraints and secondary indexes of the load's tables
+   back from the catalog, drops them, disables the inventory triggers and
+   makes the tables UNLOGGED.
+2. The rows are sent with plain COPY into the bare tables.
+3. The tables are made LOGGED again. That rewrites each table once, so it
+   is done before any index exists to be rebuilt along with it.
+4. Primary keys and unique constraints are added back, each index built
+   in one pass over its table. Where a load key repeats (a sale split over
+   two chunks), the later copies are deleted first, which leaves the rows
+   ON CONFLICT DO NOTHING would have kept. Then the secondary indexes.
+5. The inventory triggers' effect is applied set-based for each of their
+   tables in load order, as load_with_inventory_delta() does per batch.
+6. Foreign keys are added NOT VALID and then validated, one scan each.
+7. The triggers are enabled again and the tables analyzed.
+
+Constraints and indexes come back with the names and definitions
+pg_get_constraintdef() and pg_get_indexdef() returned for them, so the
+database ends with exactly the schema a normal load leaves. Unlogged tables
+are emptied by crash recovery, so a fast load interrupted by a server crash
+(or one that stops between steps 1 and 7) leaves a database to recreate.
+"""
+from psycopg2 import errors
+
+from inventory_sync import APPLY_DELTA_SQL, INVENTORY_TRIGGERS, enabled_triggers
+
+
+CONSTRAINTS_SQL = """
+    SELECT conrelid::regclass::text, conname, contype, pg_get_constraintdef(oid)
+    FROM pg_constraint
+    WHERE conrelid = ANY(%s::regclass[])
+      AND contype IN ('p', 'u', 'f')
+    ORDER BY conrelid::regclass::text, contype DESC, conname;
+"""
+
+# Indexes that do not back a primary key or unique constraint
+INDEXES_SQL = """
+    SELECT i.indrelid::regclass::text, i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+    FROM pg_index i
+    WHERE i.indrelid = ANY(%s::regclass[])
+      AND NOT EXISTS (
+          SELECT 1 FROM pg_constraint c
+          WHERE c.conrelid = i.indrelid AND c.conindid = i.indexrelid
+      )
+    ORDER BY 1, 2;
+"""
+
+# Every copy of a key after the first one loaded
+DEDUP_SQL = """
+    DELETE FROM {table}
+    WHERE ctid = ANY(ARRAY(
+        SELECT ctid FROM (
+            SELECT ctid, row_number() OVER (PARTITION BY {key} ORDER BY ctid) AS n
+            FROM {table}
+        ) d
+        WHERE n > 1
+    ));
+"""
+
+
+class FastLoad:
+    """Constraints, indexes and inventory triggers of tables, taken off for a load and put back after it.
+
+    tables are the load's table names; the catalog is read when the object
+    is created, so that has to be after the schema exists and before
+    prepare().
+    """
+
+    def __init__(self, cur, tables):
+        self.tables = list(tables)
+        self.names = {table.lower(): table for table in self.tables}
+        cur.execute(CONSTRAINTS_SQL, ([table.lower() for table in self.tables],))
+        constraints = cur.fetchall()
+        # (table, constraint, definition); keys before foreign keys
+        self.keys = [(table, name, definition) for table, name, kind, definition in constraints if kind != 'f']
+        self.foreign_keys = [(table, name, definition) for table, name, kind, definition in constraints
+                             if kind == 'f']
+        cur.execute(INDEXES_SQL, ([table.lower() for table in self.tables],))
+        self.indexes = cur.fetchall()
+        self.triggers = {table: enabled_triggers(cur, table) for table in INVENTORY_TRIGGERS if table in self.tables}
+
+    def nonempty(self, cur):
+        """Tables that already hold rows; a fast load needs none."""
+        tables = []
+        for table in self.tables:
+            cur.execute(f"SELECT EXISTS (SELECT 1 FROM {table});")
+            if cur.fetchone()[0]:
+                tables.append(table)
+        return tables
+
+    def prepare(self, cur):
+        # Foreign keys first: a key referenced by one cannot be dropped, and
+        # a table referenced by a logged table cannot be made unlogged
+        for table, name, _ in self.foreign_keys + self.keys:
+            cur.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name};")
+        for _, name, _ in self.indexes:
+            cur.execute(f"DROP INDEX {name};")
+        for table, triggers in self.triggers.items():
+            for trigger in triggers:
+                cur.execute(f"ALTER TABLE {table} DISABLE TRIGGER {trigger};")
+        for table in self.tables:
+            cur.execute(f"ALTER TABLE {table} SET UNLOGGED;")
+
+    def set_logged(self, cur):
+        for table in self.tables:
+            cur.execute(f"ALTER TABLE {table} SET LOGGED;")
+
+    def add_keys(self, cur, conflicts):
+        """Add the primary keys and unique constraints back; returns {table: duplicate rows deleted}.
+
+        conflicts maps a table to its load key. Only a violation of the load
+        key is resolved, by deleting the later copies; any other one (two
+        employees with one email) fails as the normal load would.
+        """
+        conflicts = {table.lower(): key for table, key in conflicts.items()}
+        removed = {}
+        for table, name, definition in self.keys:
+            add = f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition};"
+            cur.execute("SAVEPOINT fast_load_key;")
+            try:
+                cur.execute(add)
+            except errors.UniqueViolation:
+                key = conflicts.get(table)
+                if not key:
+                    raise
+                cur.execute("ROLLBACK TO SAVEPOINT fast_load_key;")
+                cur.execute(DEDUP_SQL.format(table=table, key=', '.join(key)))
+                removed[self.names[table]] = removed.get(self.names[table], 0) + cur.rowcount
+                cur.execute(add)
+            cur.execute("RELEASE SAVEPOINT fast_load_key;")
+        return removed
+
+    def add_indexes(self, cur):
+        for _, _, definition in self.indexes:
+            cur.execute(definition)
+
+    def apply_inventory(self, cur):
+        # Every row of the tables is new, so the whole table is the delta; the
+        # delivery lines keep their load (physical) order for new inventory_ids
+        for table in self.triggers:
+            order = ", row_number() OVER (ORDER BY ctid) AS ord" if table == 'DeliveryItem' else ""
+            cur.execute(f"CREATE TEMP VIEW inv_delta AS SELECT *{order} FROM {table};")
+            cur.execute(APPLY_DELTA_SQL[table])
+            cur.execute("DROP VIEW inv_delta;")
+
+    def add_foreign_keys(self, cur):
+        # NOT VALID takes only a brief lock; VALIDATE then checks existing
+        # rows with one join instead of a lookup per row
+        for table, name, definition in self.foreign_keys:
+            cur.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition} NOT VALID;")
+        for table, name, _ in self.foreign_keys:
+            cur.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name};")
+
+    def restore_triggers(self, cur):
+        for table, triggers in self.triggers.items():
+            for trigger in triggers:
+                cur.execute(f"ALTER TABLE {table} ENABLE TRIGGER {trigger};")
+
+    def analyze(self, cur):
+        for table in self.tables:
+            cur.execute(f"ANALYZE {table};")
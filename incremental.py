@@ -0,0 +1,107 @@
+import pandas as pd
+
+
+LOAD_STATE_DDL = """
+    CREATE TABLE IF NOT EXISTS etl_load_state (
+        mark VARCHAR(50) PRIMARY KEY,
+        value TEXT NOT NULL,
+        updated_at TIMESTAMP NOT NULL DEFAULT now()
+    );
+"""
+
+# High-water mark -> (master file, source column, kind). Integer marks are the
+# largest key already loaded; datetime marks the latest date/time loaded.
+WATERMARKS = {
+    'sale_id':       ('Sales_Master.csv',    'sale_id',       'int'),
+    'sale_datetime': ('Sales_Master.csv',    'sale_datetime', 'datetime'),
+    'return_id':     ('Sales_Master.csv',    'return_id',     'int'),
+    'schedule_id':   ('Shift_Master.csv',    'schedule_id',   'int'),
+    'delivery_id':   ('Delivery_Master.csv', 'delivery_id',   'int'),
+    'expense_date':  ('Expense_Master.csv',  'expense_date',  'datetime'),
+}
+
+# Fact tables filtered by a mark after projection, because their master rows
+# can be kept for another reason (an old sale line that carries a new return)
+TABLE_MARKS = {
+    'Sale':          'sale_id',
+    'SaleItem':      'sale_id',
+    'ProductReturn': 'return_id',
+}
+
+
+def as_kind(values, kind):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(values.cat.categories.dtype)
+    if kind == 'int':
+        return pd.to_numeric(values)
+    return pd.to_datetime(values)
+
+
+class HighWaterMarks:
+    """Per-source high-water marks persisted in etl_load_state.
+
+    Rows at or below a mark are dropped before any projection or database
+    work, so a run only pays for data newer than the previous run. Expenses
+    have no key and are filtered by date, so expenses that arrive late for a
+    day that was already loaded are not picked up.
+    """
+
+    def __init__(self, cur):
+        cur.execute(LOAD_STATE_DDL)
+        cur.execute("SELECT mark, value FROM etl_load_state;")
+        self.marks = {
+            mark: as_kind(pd.Series([value]), WATERMARKS[mark][2]).iloc[0]
+            for mark, value in cur.fetchall()
+            if mark in WATERMARKS
+        }
+        self.pending = dict(self.marks)
+
+    def newer(self, df, mark):
+        # Boolean mask of rows past the mark (all rows on the first run)
+        if mark not in self.marks:
+            return pd.Series(True, index=df.index)
+        values = as_kind(df[WATERMARKS[mark][1]], WATERMARKS[mark][2])
+        return values > self.marks[mark]
+
+    def new_source_rows(self, path, df):
+        if path == 'Sales_Master.csv':
+            # A return can arrive later than its sale, so keep old sale lines
+            # that now carry a new return
+            keep = self.newer(df, 'sale_id') | (df['return_id'].notna() & self.newer(df, 'return_id'))
+        else:
+            mark = next(m for m, (source, _, _) in WATERMARKS.items() if source == path)
+            keep = self.newer(df, mark)
+        return df[keep]
+
+    def new_table_rows(self, table, df):
+        mark = TABLE_MARKS.get(table)
+        if mark is None or df.empty:
+            return df
+        return df[self.newer(df, mark)]
+
+    def observe(self, path, df):
+        # Track the largest values seen in rows that are being loaded
+        for mark, (source, column, kind) in WATERMARKS.items():
+            if source != path or df.empty:
+                continue
+            top = as_kind(df[column].dropna(), kind).max()
+            if pd.isna(top):
+                continue
+            if mark not in self.pending or top > self.pending[mark]:
+                self.pending[mark] = top
+
+    def formatted(self, values=None):
+        return {
+            mark: str(int(value)) if WATERMARKS[mark][2] == 'int' else value.isoformat(sep=' ')
+            for mark, value in (self.marks if values is None else values).items()
+        }
+
+    def save(self, cur):
+        for mark, value in self.formatted(self.pending).items():
+            cur.execute("""
+                INSERT INTO etl_load_state (mark, value, updated_at)
+                VALUES (%s, %s, now())
+                ON CONFLICT (mark) DO UPDATE
+                SET value = EXCLUDED.value, updated_at = EXCLUDED.updated_at;
+            """, (mark, value))
+        self.marks = dict(self.pending)
@@ -0,0 +1,224 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Seconds between RSS samples taken while a stage runs
+SAMPLE_SECONDS = 0.01
+
+STATM = '/proc/self/statm'
+
+
+def rss_mb():
+    # Current resident set size, where /proc has it (Linux)
+    try:
+        with open(STATM) as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def process_peak_rss_mb():
+    # High-water mark of the whole process so far, not of one stage
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class Stage:
+    """Counters of one timed stage; the code being timed fills in rows_out and bytes_sent."""
+
+    def __init__(self, kind, name, rows_in):
+        self.kind = kind
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.bytes_sent = None
+        self.skip = False
+        self.peak_rss = None
+
+    def sample(self, rss):
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+
+    @property
+    def label(self):
+        return self.kind if self.name is None else f"{self.kind}:{self.name}"
+
+
+class Instrumentation:
+    """Wall time, row counts, peak RSS and bytes sent for each ETL stage.
+
+    A stage's peak RSS is the highest resident size of the process seen
+    while it ran: read when it starts and ends and every SAMPLE_SECONDS in
+    between by a sampling thread, so a spike shorter than that (or inside
+    a call that holds the GIL) can be missed. Stages running at the same
+    time on other threads count towards each other's peaks. Where /proc is
+    missing it is None; the report's process_peak_rss_mb is the process's
+    high-water mark so far.
+
+    Every stage is appended to the JSON lines report as soon as it ends, so
+    an interrupted run still leaves a partial report; summary() prints the
+    totals per stage at the end. profile_stage names one stage, by kind
+    ('load') or by label ('load:SaleItem'), to run under cProfile or
+    tracemalloc; every occurrence of it is profiled and the result is
+    written to profile_path by close(). Stages may run on several threads.
+    """
+
+    def __init__(self, report_path=None, profile_stage=None, profiler='cprofile', profile_path=None):
+        self.report_path = report_path
+        self.profile_stage = profile_stage
+        self.profiler = profiler
+        self.profile_path = profile_path or ('etl_profile.prof' if profiler == 'cprofile' else 'etl_tracemalloc.txt')
+        self.records = []
+        self.lock = threading.Lock()
+        self.profile_lock = threading.Lock()
+        self.profile = None
+        self.snapshot = None
+        self.snapshot_peak = 0
+        self.active = set()
+        self.sampler = None
+        self.stopped = threading.Event()
+
+    def sample_rss(self):
+        # Sampler thread: fold the current RSS into every running stage
+        while not self.stopped.wait(SAMPLE_SECONDS):
+            with self.lock:
+                if self.active:
+                    rss = rss_mb()
+                    for stage in self.active:
+                        stage.sample(rss)
+
+    def track(self, stage):
+        stage.sample(rss_mb())
+        with self.lock:
+            self.active.add(stage)
+            if self.sampler is None:
+                self.sampler = threading.Thread(target=self.sample_rss, daemon=True)
+                self.sampler.start()
+
+    def untrack(self, stage):
+        with self.lock:
+            self.active.discard(stage)
+        stage.sample(rss_mb())
+
+    @contextmanager
+    def stage(self, kind, name=None, rows_in=None):
+        stage = Stage(kind, name, rows_in)
+        profiling = self.profile_stage in (stage.kind, stage.label) and self.profile_lock.acquire(blocking=False)
+        if profiling:
+            self.start_profile()
+        self.track(stage)
+        began = time.perf_counter()
+        ok = False
+        try:
+            yield stage
+            ok = True
+        finally:
+            seconds = time.perf_counter() - began
+            self.untrack(stage)
+            if profiling:
+                self.stop_profile()
+                self.profile_lock.release()
+            if not stage.skip:
+                self.record(stage, seconds, ok)
+
+    def iterate(self, kind, name, frames):
+        # Time each step of an iterator of frames as its own stage
+        frames = iter(frames)
+        while True:
+            with self.stage(kind, name) as stage:
+                df = next(frames, None)
+                if df is None:
+                    stage.skip = True
+                else:
+                    stage.rows_out = len(df)
+            if df is None:
+                return
+            yield df
+
+    def start_profile(self):
+        if self.profiler == 'cprofile':
+            if self.profile is None:
+                self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            tracemalloc.start(25)
+
+    def stop_profile(self):
+        if self.profiler == 'cprofile':
+            self.profile.disable()
+            return
+        # Keep the allocation snapshot of the occurrence with the highest peak
+        _, peak = tracemalloc.get_traced_memory()
+        if peak >= self.snapshot_peak:
+            self.snapshot, self.snapshot_peak = tracemalloc.take_snapshot(), peak
+        tracemalloc.stop()
+
+    def record(self, stage, seconds, ok):
+        entry = {
+            'at': datetime.now().isoformat(sep=' ', timespec='milliseconds'),
+            'stage': stage.kind,
+            'name': stage.name,
+            'seconds': round(seconds, 6),
+            'rows_in': stage.rows_in,
+            'rows_out': stage.rows_out,
+            'rows_per_s': round(stage.rows_out / seconds, 1) if stage.rows_out and seconds > 0 else None,
+            'peak_rss_mb': round(stage.peak_rss, 1) if stage.peak_rss is not None else None,
+            'process_peak_rss_mb': process_peak_rss_mb(),
+            'bytes_sent': stage.bytes_sent,
+            'ok': ok,
+        }
+        with self.lock:
+            self.records.append(entry)
+            if self.report_path:
+                with open(self.report_path, 'a') as f:
+                    f.write(json.dumps(entry) + '\n')
+
+    def summary(self):
+        # Totals per stage label, in the order stages first ran
+        totals = {}
+        for entry in self.records:
+            label = entry['stage'] if entry['name'] is None else f"{entry['stage']}:{entry['name']}"
+            total = totals.setdefault(label, {'calls': 0, 'seconds': 0.0, 'rows_in': 0, 'rows_out': 0,
+                                              'bytes_sent': 0, 'peak_rss_mb': 0})
+            total['calls'] += 1
+            total['seconds'] += entry['seconds']
+            for key in ('rows_in', 'rows_out', 'bytes_sent'):
+                total[key] += entry[key] or 0
+            total['peak_rss_mb'] = max(total['peak_rss_mb'], entry['peak_rss_mb'] or 0)
+
+        print(f"{'stage':<36} {'calls':>6} {'seconds':>9} {'rows in':>10} {'rows out':>10} "
+              f"{'rows/s':>11} {'MB sent':>9} {'peak RSS MB':>12}")
+        for label, t in totals.items():
+            rate = t['rows_out'] / t['seconds'] if t['seconds'] > 0 else 0
+            print(f"{label:<36} {t['calls']:>6} {t['seconds']:>9.3f} {t['rows_in']:>10} {t['rows_out']:>10} "
+                  f"{rate:>11.0f} {t['bytes_sent'] / 1e6:>9.2f} {t['peak_rss_mb']:>12.1f}")
+
+    def close(self):
+        self.stopped.set()
+        if self.profile is not None:
+            self.profile.dump_stats(self.profile_path)
+            print(f"✅ cProfile stats for {self.profile_stage} written to {self.profile_path}.")
+            pstats.Stats(self.profile).sort_stats('cumulative').print_stats(15)
+        if self.snapshot is not None:
+            with open(self.profile_path, 'w') as f:
+                f.write(f"# {self.profile_stage}: peak traced memory {self.snapshot_peak / 1e6:.1f} MB\n")
+                for stat in self.snapshot.statistics('lineno')[:25]:
+                    f.write(f"{stat}\n")
+            print(f"✅ tracemalloc top allocations for {self.profile_stage} written to {self.profile_path}.")
@@ -0,0 +1,149 @@
+from bulk_load import copy_merge
+
+
+# Inventory triggers on each table: (row-level, statement-level). Only one of
+# the pair is enabled at a time; see set_trigger_mode().
+INVENTORY_TRIGGERS = {
+    'SaleItem':      ('trg_deduct_inventory',          'trg_deduct_inventory_stmt'),
+    'ProductReturn': ('trg_add_inventory_on_return',   'trg_add_inventory_on_return_stmt'),
+    'DeliveryItem':  ('trg_add_inventory_on_delivery', 'trg_add_inventory_on_delivery_stmt'),
+}
+
+# Set-based equivalent of each row trigger, applied to the rows captured in
+# inv_delta. Each nets the batch per (store_id, sku) and touches every
+# Inventory row once. The rows are locked in key order first (locked), so
+# loads of different tables applying their deltas side by side, as
+# --bulk-inventory lets the scheduler run them, cannot deadlock.
+APPLY_DELTA_SQL = {
+    # deduct_inventory_after_sale(): subtract sold units from existing rows
+    'SaleItem': """
+        WITH d AS (
+            SELECT s.store_id, x.sku, SUM(x.quantity_sold) AS qty
+            FROM inv_delta x
+            JOIN Sale s ON s.sale_id = x.sale_id
+            GROUP BY s.store_id, x.sku
+        ),
+        locked AS (
+            SELECT i.inventory_id
+            FROM Inventory i
+            JOIN d ON i.store_id = d.store_id AND i.sku = d.sku
+            ORDER BY i.store_id, i.sku
+            FOR UPDATE OF i
+        )
+        UPDATE Inventory i
+        SET quantity_on_hand = i.quantity_on_hand - d.qty
+        FROM d, locked l
+        WHERE i.inventory_id = l.inventory_id
+          AND i.store_id = d.store_id
+          AND i.sku = d.sku;
+    """,
+
+    # add_inventory_on_return(): add returned units back to existing rows
+    'ProductReturn': """
+        WITH d AS (
+            SELECT s.store_id, x.sku, SUM(x.quantity_returned) AS qty
+            FROM inv_delta x
+            JOIN Sale s ON s.sale_id = x.sale_id
+            GROUP BY s.store_id, x.sku
+        ),
+        locked AS (
+            SELECT i.inventory_id
+            FROM Inventory i
+            JOIN d ON i.store_id = d.store_id AND i.sku = d.sku
+            ORDER BY i.store_id, i.sku
+            FOR UPDATE OF i
+        )
+        UPDATE Inventory i
+        SET quantity_on_hand = i.quantity_on_hand + d.qty
+        FROM d, locked l
+        WHERE i.inventory_id = l.inventory_id
+          AND i.store_id = d.store_id
+          AND i.sku = d.sku;
+    """,
+
+    # add_inventory_on_delivery(): add delivered units, creating the Inventory
+    # row (default threshold 10) when the store has never stocked the sku.
+    # New rows are inserted in order of their first delivery line so they get
+    # the same inventory_id the row trigger would have assigned.
+    'DeliveryItem': """
+        WITH d AS (
+            SELECT dl.store_id, x.sku, SUM(x.quantity) AS qty, MIN(x.ord) AS first_ord
+            FROM inv_delta x
+            JOIN Delivery dl ON dl.delivery_id = x.delivery_id
+            GROUP BY dl.store_id, x.sku
+        ),
+        locked AS (
+            SELECT i.inventory_id
+            FROM Inventory i
+            JOIN d ON i.store_id = d.store_id AND i.sku = d.sku
+            ORDER BY i.store_id, i.sku
+            FOR UPDATE OF i
+        ),
+        upd AS (
+            UPDATE Inventory i
+            SET quantity_on_hand = i.quantity_on_hand + d.qty
+            FROM d, locked l
+            WHERE i.inventory_id = l.inventory_id
+              AND i.store_id = d.store_id
+              AND i.sku = d.sku
+            RETURNING i.store_id, i.sku
+        )
+        INSERT INTO Inventory (store_id, sku, quantity_on_hand, reorder_threshold, restock_status)
+        SELECT d.store_id, d.sku, d.qty, 10, 'In Stock'
+        FROM d
+        WHERE NOT EXISTS (
+            SELECT 1 FROM upd WHERE upd.store_id = d.store_id AND upd.sku = d.sku
+        )
+        ORDER BY d.first_ord;
+    """,
+}
+
+
+def set_trigger_mode(cur, mode):
+    """Switch the inventory triggers to 'row' (FOR EACH ROW) or 'statement' (transition tables)."""
+    for table, (row_trigger, stmt_trigger) in INVENTORY_TRIGGERS.items():
+        on, off = (row_trigger, stmt_trigger) if mode == 'row' else (stmt_trigger, row_trigger)
+        cur.execute(f"ALTER TABLE {table} DISABLE TRIGGER {off}, ENABLE TRIGGER {on};")
+
+
+def enabled_triggers(cur, table):
+    cur.execute("""
+        SELECT tgname FROM pg_trigger
+        WHERE tgrelid = %s::regclass
+          AND tgname = ANY(%s)
+          AND tgenabled <> 'D';
+    """, (table.lower(), list(INVENTORY_TRIGGERS[table])))
+    return [name for name, in cur.fetchall()]
+
+
+def load_with_inventory_delta(cur, table, df, conflict=None, merge=copy_merge, capture=None):
+    """Bulk load a SaleItem, ProductReturn or DeliveryItem frame without its inventory trigger.
+
+    Whichever trigger is enabled (row or statement level) is disabled only
+    inside the caller's transaction, so other sessions never see it off. The
+    rows actually inserted are captured and their net quantity change is
+    applied to Inventory in one statement, leaving Inventory as the row
+    trigger would have. merge is the loader used for the rows themselves
+    (copy_merge or insert_merge). As with the loaders, the inserted rows
+    are also copied into capture if it names a table with the same columns.
+    Returns the rows inserted into table.
+    """
+    triggers = enabled_triggers(cur, table)
+    columns = ', '.join(df.columns)
+
+    for trigger in triggers:
+        cur.execute(f"ALTER TABLE {table} DISABLE TRIGGER {trigger};")
+
+    cur.execute("DROP TABLE IF EXISTS inv_delta;")
+    cur.execute(f"CREATE TEMP TABLE inv_delta AS SELECT {columns} FROM {table} WITH NO DATA;")
+    cur.execute("ALTER TABLE inv_delta ADD COLUMN ord BIGSERIAL;")
+
+    inserted = merge(cur, table, df, conflict, capture='inv_delta')
+    cur.execute(APPLY_DELTA_SQL[table])
+    if capture:
+        cur.execute(f"INSERT INTO {capture} ({columns}) SELECT {columns} FROM inv_delta;")
+
+    cur.execute("DROP TABLE inv_delta;")
+    for trigger in triggers:
+        cur.execute(f"ALTER TABLE {table} ENABLE TRIGGER {trigger};")
+    return inserted
@@ -0,0 +1,206 @@
+"""Materialized views of the dashboard queries, refreshed when their sources change.
+
+Every query of the pack becomes a materialized view (mv_q01_daily_net_revenue,
+...) with a unique index on its result key, so REFRESH MATERIALIZED VIEW
+CONCURRENTLY can rebuild it while the dashboards keep reading the old rows.
+The dated queries (1, 2, 3, 5, 6, 8, 9 and 10) are built from their
+versions in queries/views, which have no params window and keep the day or
+month in the result key: a view holds every day or month, and the
+dashboard filters it. The views of queries 1, 2, 3, 6 and 7 read the
+rollup, so their refresh cost follows daily_store_sku_sales rather than raw
+sales.
+
+The relations each view reads are taken from pg_depend, so a view is only
+refreshed when one of them changed, and a view that reads another view is
+refreshed after it. Each view's comment holds a hash of its definition; a
+view whose query or key changed in the pack is dropped and recreated.
+
+The unique indexes use NULLS NOT DISTINCT, so the views need PostgreSQL 15
+or later; on an older server they are not created and unsupported() says
+why.
+
+    python matviews.py             # list the views and what they read
+    python matviews.py --refresh   # refresh every view
+"""
+import argparse
+import hashlib
+import re
+
+import psycopg2
+
+from db import resolve_dsn
+from query_pack import QUERY_PACK, ROLLUP_QUERY_PACK, VIEW_QUERY_PACK, load_query_pack, statement_body
+
+
+# Result key of every query: the columns its unique index is built on. NULLs
+# (a sale with no category, a delivery with no store) compare equal, so every
+# row is covered, as REFRESH ... CONCURRENTLY requires.
+VIEW_KEYS = {
+    1:  ('store_id', 'sale_date'),
+    2:  ('store_id', 'month_start', 'category_name'),
+    3:  ('store_id', 'sale_date'),
+    4:  ('store_id', 'sku'),
+    5:  ('store_id', 'shift_date'),
+    6:  ('store_id', 'month_start', 'sku'),
+    7:  ('sku',),
+    8:  ('store_id', 'month_start', 'category_name'),
+    9:  ('vendor_id', 'store_id', 'month_start'),
+    10: ('month_start', 'return_reason'),
+    11: ('store_id', 'category_id', 'sku_a', 'sku_b'),
+}
+
+# server_version_num of the first release with NULLS NOT DISTINCT indexes
+MIN_SERVER_VERSION = 150000
+
+# Leaves room for the "_key" suffix of the index within PostgreSQL's 63 bytes
+MAX_VIEW_NAME = 59
+
+
+def dashboard_queries():
+    """{number: (title, sql)} of the pack, with the view or else the rollup version where there is one."""
+    queries = load_query_pack(QUERY_PACK)
+    queries.update(load_query_pack(ROLLUP_QUERY_PACK))
+    queries.update(load_query_pack(VIEW_QUERY_PACK))
+    return queries
+
+
+def view_name(number, title):
+    slug = re.sub(r"[^a-z0-9]+", '_', title.lower()).strip('_')
+    return f"mv_q{number:02d}_{slug}"[:MAX_VIEW_NAME].rstrip('_')
+
+
+class MaterializedViews:
+    """The dashboard views: creation, source tracking and refresh order."""
+
+    def __init__(self, queries=None):
+        queries = dashboard_queries() if queries is None else queries
+        self.views = {}
+        for number, (title, sql) in queries.items():
+            body, key = statement_body(sql), VIEW_KEYS[number]
+            stamp = hashlib.md5(f"{body}\n{key}".encode()).hexdigest()
+            self.views[view_name(number, title)] = (body, key, f"query pack {stamp}")
+
+    @staticmethod
+    def unsupported(cur):
+        """Why the server cannot hold the views, or None if it can."""
+        cur.execute("SELECT current_setting('server_version_num')::int, current_setting('server_version');")
+        number, version = cur.fetchone()
+        if number < MIN_SERVER_VERSION:
+            return f"their unique indexes need PostgreSQL 15 or later (NULLS NOT DISTINCT); the server is {version}"
+        return None
+
+    def ensure(self, cur):
+        """Create the views that are missing or out of date, each with its data.
+
+        Each view is created under a savepoint, so one query that fails does
+        not stop the others. Returns (created names, {name: error}).
+        """
+        cur.execute("""
+            SELECT c.relname, obj_description(c.oid, 'pg_class')
+            FROM pg_class c
+            WHERE c.relkind = 'm' AND c.relname = ANY(%s);
+        """, (list(self.views),))
+        existing = dict(cur.fetchall())
+
+        created, failed = [], {}
+        for name, (body, key, stamp) in self.views.items():
+            if existing.get(name) == stamp:
+                continue
+            cur.execute("SAVEPOINT matview;")
+            try:
+                cur.execute(f"DROP MATERIALIZED VIEW IF EXISTS {name};")
+                # Sent as UTF-8 bytes: the pack's comments are not ASCII, which
+                # an SQL_ASCII database's client encoding cannot carry
+                cur.execute(f"CREATE MATERIALIZED VIEW {name} AS\n{body}\nWITH DATA;".encode())
+                cur.execute(f"CREATE UNIQUE INDEX {name}_key ON {name} ({', '.join(key)}) NULLS NOT DISTINCT;")
+                cur.execute(f"COMMENT ON MATERIALIZED VIEW {name} IS %s;", (stamp,))
+                cur.execute("RELEASE SAVEPOINT matview;")
+                created.append(name)
+            except psycopg2.Error as e:
+                cur.execute("ROLLBACK TO SAVEPOINT matview;")
+                failed[name] = str(e).strip().splitlines()[0]
+        return created, failed
+
+    def sources(self, cur):
+        """{view: lower-cased names of the tables and views it reads}, for views that exist."""
+        cur.execute("""
+            SELECT DISTINCT v.relname, t.relname
+            FROM pg_class v
+            JOIN pg_rewrite r ON r.ev_class = v.oid
+            JOIN pg_depend d ON d.classid = 'pg_rewrite'::regclass AND d.objid = r.oid
+            JOIN pg_class t ON d.refclassid = 'pg_class'::regclass AND t.oid = d.refobjid
+            WHERE v.relkind = 'm' AND v.relname = ANY(%s) AND t.oid <> v.oid;
+        """, (list(self.views),))
+        sources = {}
+        for view, relation in cur.fetchall():
+            sources.setdefault(view, set()).add(relation)
+        return sources
+
+    def order(self, sources):
+        # Views after the views they read, otherwise in pack order
+        ordered, visiting = [], set()
+
+        def visit(name):
+            if name in ordered or name in visiting:
+                return
+            visiting.add(name)
+            for parent in sorted(sources[name] & set(sources)):
+                visit(parent)
+            ordered.append(name)
+
+        for name in self.views:
+            if name in sources:
+                visit(name)
+        return ordered
+
+    def stale(self, cur, changed, fresh=()):
+        """Views to refresh, in dependency order, after the relations in changed were modified.
+
+        changed holds lower-cased table names. A view to be refreshed, or one
+        in fresh (just created), counts as changed for the views that read it.
+        """
+        sources = self.sources(cur)
+        changed = set(changed) | set(fresh)
+        stale = []
+        for name in self.order(sources):
+            if name not in fresh and sources[name] & changed:
+                stale.append(name)
+                changed.add(name)
+        return stale
+
+    @staticmethod
+    def refresh(cur, name):
+        cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name};")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or refresh the dashboard materialized views.")
+    parser.add_argument('--dsn', default=None, help="database to use (default: see db.resolve_dsn)")
+    parser.add_argument('--refresh', action='store_true', help="create missing views and refresh every view")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(resolve_dsn(args.dsn))
+    cur = conn.cursor()
+    views = MaterializedViews()
+    unsupported = views.unsupported(cur)
+    if unsupported:
+        print(f"❌ Materialized views not available: {unsupported}")
+        raise SystemExit(1)
+    if args.refresh:
+        created, failed = views.ensure(cur)
+        conn.commit()
+        for name, error in failed.items():
+            print(f"❌ Could not create {name}: {error}")
+        refreshed = [name for name in views.order(views.sources(cur)) if name not in created]
+        for name in refreshed:
+            views.refresh(cur, name)
+            conn.commit()
+        print(f"✅ Materialized views created: {len(created)}, refreshed: {len(refreshed)}.")
+
+    for name, relations in sorted(views.sources(cur).items()):
+        print(f"{name:<60} {', '.join(sorted(relations))}")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
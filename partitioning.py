@@ -0,0 +1,242 @@
+"""Optional month-partitioned layout for Sale and SaleItem.
+
+Sale is range-partitioned on sale_datetime, one partition per calendar
+month, and SaleItem is co-partitioned on the same bounds: each line carries
+the sale_datetime of its sale, and its foreign key to Sale is the
+(sale_id, sale_datetime) pair. PostgreSQL only allows unique and foreign
+keys on a partitioned table that include the partition key, so in this
+layout sale_id is unique together with sale_datetime, and ProductReturn
+keeps sale_id without a foreign key (returns outlive the months they are
+detached from). Queries that filter s.sale_datetime on a half-open range
+only scan the months they touch.
+
+ETL_Python.py --partitioned creates this layout in an empty database and
+adds the months each load needs before sending rows. Old months are
+detached, not deleted, and can be kept as plain tables or dropped:
+
+    python partitioning.py                       # list the monthly partitions
+    python partitioning.py --detach-before 2023-09 [--drop]
+"""
+import argparse
+import re
+from datetime import date
+from functools import partial
+
+import pandas as pd
+import psycopg2
+
+from db import resolve_dsn
+from query_runner import bump_data_version
+from scheduler import CREATE_TABLE_RE
+from transforms import sale_item_frame
+
+
+# Partitioned tables, parent first; SaleItem follows Sale's monthly bounds
+PARTITIONED_TABLES = ['Sale', 'SaleItem']
+
+# CREATE TABLE statements swapped into SCHEMA_DDL for the partitioned layout
+PARTITIONED_DDL = {
+    'sale': """CREATE TABLE IF NOT EXISTS Sale (
+        sale_id SERIAL,
+        store_id INTEGER REFERENCES Store(store_id),
+        sale_datetime TIMESTAMP NOT NULL,
+        payment_type VARCHAR(20) CHECK (payment_type IN ('Cash', 'Credit Card', 'Mobile')),
+        PRIMARY KEY (sale_id, sale_datetime)
+    ) PARTITION BY RANGE (sale_datetime);""",
+
+    'saleitem': """CREATE TABLE IF NOT EXISTS SaleItem (
+        sale_id INTEGER NOT NULL,
+        sku varchar(20) REFERENCES Product(sku),
+        quantity_sold INTEGER NOT NULL,
+        unit_price NUMERIC(10,2) NOT NULL,
+        promo_applied BOOLEAN DEFAULT FALSE,
+        promo_discount NUMERIC(10,2),
+        promo_id INTEGER REFERENCES Promotion(promo_id),
+        sale_datetime TIMESTAMP NOT NULL,
+        PRIMARY KEY (sale_id, sku, sale_datetime),
+        FOREIGN KEY (sale_id, sale_datetime) REFERENCES Sale(sale_id, sale_datetime) ON DELETE CASCADE
+    ) PARTITION BY RANGE (sale_datetime);""",
+
+    'productreturn': """CREATE TABLE IF NOT EXISTS ProductReturn (
+        return_id SERIAL PRIMARY KEY,
+        sale_id INTEGER,
+        sku varchar(20) REFERENCES Product(sku),
+        return_date DATE NOT NULL,
+        quantity_returned INTEGER NOT NULL,
+        reason_code VARCHAR(10) REFERENCES ReturnReason(reason_code)
+    );""",
+}
+
+# Load plan entries that differ in the partitioned layout: SaleItem rows carry
+# sale_datetime, and ON CONFLICT targets must name the whole primary key
+PARTITIONED_LOADS = {
+    'Sale':     (None, ('sale_id', 'sale_datetime')),
+    'SaleItem': (partial(sale_item_frame, with_sale_datetime=True), ('sale_id', 'sku', 'sale_datetime')),
+}
+
+# Months detached from the partitioned tables; the ETL never loads them again
+RETIRED_MONTH_DDL = """
+    CREATE TABLE IF NOT EXISTS etl_retired_month (
+        month DATE PRIMARY KEY,
+        detached_at TIMESTAMP NOT NULL DEFAULT now()
+    );
+"""
+
+PARTITION_NAME_RE = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def partitioned_schema(ddl):
+    """ddl with the Sale, SaleItem and ProductReturn tables of the partitioned layout."""
+    return CREATE_TABLE_RE.sub(lambda m: PARTITIONED_DDL.get(m.group(1).lower(), m.group(0)), ddl)
+
+
+def partitioned_plan(plan):
+    """A LOAD_PLAN with the Sale and SaleItem entries of the partitioned layout."""
+    return [
+        (path, [
+            (table, PARTITIONED_LOADS[table][0] or build, PARTITIONED_LOADS[table][1])
+            if table in PARTITIONED_LOADS else (table, build, key)
+            for table, build, key in tables
+        ])
+        for path, tables in plan
+    ]
+
+
+def is_partitioned(cur, table='Sale'):
+    cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s);", (table.lower(),))
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def partition_name(table, month):
+    return f"{table.lower()}_y{month:%Y}m{month:%m}"
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def months_of(values):
+    # First day of every month present in a column of timestamps
+    stamps = pd.to_datetime(values.dropna().unique())
+    return {date(y, m, 1) for y, m in zip(stamps.year, stamps.month)}
+
+
+class MonthlyPartitions:
+    """Monthly partitions of Sale and SaleItem, created as sales arrive."""
+
+    def __init__(self, cur):
+        cur.execute(RETIRED_MONTH_DDL)
+        cur.execute("SELECT month FROM etl_retired_month;")
+        self.retired = {month for month, in cur.fetchall()}
+        self.months = self.attached(cur)
+
+    @staticmethod
+    def attached(cur, table='Sale'):
+        cur.execute("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass;
+        """, (table.lower(),))
+        months = set()
+        for name, in cur.fetchall():
+            match = PARTITION_NAME_RE.search(name)
+            if match:
+                months.add(date(int(match.group(1)), int(match.group(2)), 1))
+        return months
+
+    def create(self, cur, month):
+        # Parent before child, so SaleItem's foreign key finds its Sale month
+        bounds = f"FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+        for table in PARTITIONED_TABLES:
+            cur.execute(f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} "
+                        f"PARTITION OF {table} FOR VALUES {bounds};")
+        self.months.add(month)
+
+    def route(self, cur, loads):
+        """Create the months loads need and drop their rows in retired months.
+
+        loads is a list of (table, df, conflict) entries. Returns the loads
+        and the number of rows dropped per table. Partitions are created on
+        cur, which the caller commits before any load starts, so concurrent
+        loads never race to create the same month.
+        """
+        routed, dropped = [], {}
+        for table, df, conflict in loads:
+            if table in PARTITIONED_TABLES and not df.empty:
+                stamps = pd.to_datetime(df['sale_datetime'])
+                if self.retired:
+                    month = stamps.dt.to_period('M').dt.start_time.dt.date
+                    keep = ~month.isin(self.retired).to_numpy()
+                    if not keep.all():
+                        dropped[table] = int((~keep).sum())
+                        df, stamps = df[keep], stamps[keep]
+                for month in sorted(months_of(stamps) - self.months):
+                    self.create(cur, month)
+            routed.append((table, df, conflict))
+        return routed, dropped
+
+    def detach_before(self, cur, before, drop=False):
+        """Detach (or drop) every month that starts before the month of before.
+
+        SaleItem's month is detached first and loses its foreign key to Sale,
+        which would otherwise keep the Sale month from being detached. The
+        months are recorded in etl_retired_month. Returns the months.
+        """
+        before = date(before.year, before.month, 1)
+        months = sorted(m for m in self.months if m < before)
+        for month in months:
+            for table in reversed(PARTITIONED_TABLES):
+                name = partition_name(table, month)
+                cur.execute(f"ALTER TABLE {table} DETACH PARTITION {name};")
+                cur.execute("""
+                    SELECT conname FROM pg_constraint
+                    WHERE conrelid = %s::regclass AND contype = 'f' AND confrelid = 'sale'::regclass;
+                """, (name,))
+                for constraint, in cur.fetchall():
+                    cur.execute(f"ALTER TABLE {name} DROP CONSTRAINT {constraint};")
+            if drop:
+                for table in reversed(PARTITIONED_TABLES):
+                    cur.execute(f"DROP TABLE {partition_name(table, month)};")
+            cur.execute("INSERT INTO etl_retired_month (month) VALUES (%s) ON CONFLICT DO NOTHING;", (month,))
+            self.months.discard(month)
+            self.retired.add(month)
+        return months
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or retire the monthly Sale and SaleItem partitions.")
+    parser.add_argument('--dsn', default=None, help="database to use (default: see db.resolve_dsn)")
+    parser.add_argument('--detach-before', default=None, metavar='YYYY-MM',
+                        help="detach every month before this one from Sale and SaleItem")
+    parser.add_argument('--drop', action='store_true', help="drop the detached months instead of keeping them")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(resolve_dsn(args.dsn))
+    cur = conn.cursor()
+    if not is_partitioned(cur):
+        parser.error("Sale is not partitioned; load the database with ETL_Python.py --partitioned")
+    partitions = MonthlyPartitions(cur)
+
+    if args.detach_before:
+        before = pd.Timestamp(args.detach_before).date()
+        months = partitions.detach_before(cur, before, drop=args.drop)
+        if months:
+            bump_data_version(cur, [table.lower() for table in PARTITIONED_TABLES])
+        conn.commit()
+        action = 'Dropped' if args.drop else 'Detached'
+        print(f"✅ {action} {len(months)} months: " + ", ".join(f"{m:%Y-%m}" for m in months))
+
+    for month in sorted(partitions.months):
+        cur.execute(f"SELECT count(*) FROM {partition_name('Sale', month)};")
+        sales, = cur.fetchone()
+        cur.execute(f"SELECT count(*) FROM {partition_name('SaleItem', month)};")
+        items, = cur.fetchone()
+        print(f"{month:%Y-%m}  {sales:>10} sales {items:>10} items")
+    if partitions.retired:
+        print("retired: " + ", ".join(f"{m:%Y-%m}" for m in sorted(partitions.retired)))
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
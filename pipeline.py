@@ -0,0 +1,116 @@
+"""Overlapped read, transform and write stages for the chunked ETL.
+
+Pipeline.run() reads items on one thread, transforms them on a second and
+writes them on the caller's, with a bounded queue between each pair: while
+chunk N is written, chunk N+1 is being projected and chunk N+2 parsed. A
+full queue blocks the stage feeding it, so at most depth items wait in each
+queue and memory stays bounded by about 2 * depth + 3 chunks, whatever the
+relative speed of the stages.
+
+Items are written one at a time in the order they were read, so parent
+tables reach the database before their children exactly as in a serial run.
+A transform that has to see earlier items in the database (a foreign key
+lookup) calls drain() first, which waits until every item transformed
+before it has been written.
+
+pandas parsing and psycopg2 both release the GIL for most of their work,
+so threads overlap well and share the ETL's dedup, validation and
+high-water-mark state without copying it.
+"""
+import queue
+import threading
+
+
+# Items waiting in each queue
+DEPTH = 2
+
+# Seconds a blocked stage waits before checking whether the run was stopped
+POLL_SECONDS = 0.1
+
+_DONE = object()
+
+
+class PipelineStopped(Exception):
+    """Raised in a stage that is waiting when the pipeline is stopped."""
+
+
+class Pipeline:
+    """Reader, transformer and writer stages joined by bounded queues."""
+
+    def __init__(self, depth=DEPTH):
+        self.depth = depth
+        self.transformed = self.written = 0
+        self.progress = threading.Condition()
+        self.stopped = threading.Event()
+
+    def prefetch(self, items):
+        """Yield items, produced ahead on a daemon thread through a queue of self.depth.
+
+        An exception raised while producing is re-raised in the consumer.
+        """
+        buffer = queue.Queue(maxsize=self.depth)
+
+        def put(entry):
+            while not self.stopped.is_set():
+                try:
+                    buffer.put(entry, timeout=POLL_SECONDS)
+                    return
+                except queue.Full:
+                    pass
+            raise PipelineStopped()
+
+        def produce():
+            try:
+                for item in items:
+                    put((item, None))
+                put((_DONE, None))
+            except PipelineStopped:
+                pass
+            except BaseException as e:
+                try:
+                    put((_DONE, e))
+                except PipelineStopped:
+                    pass
+
+        threading.Thread(target=produce, daemon=True).start()
+        while True:
+            item, error = buffer.get()
+            if error is not None:
+                raise error
+            if item is _DONE:
+                return
+            yield item
+
+    def run(self, items, transform, write):
+        """write(transform(item)) for every item, in order, with the three steps overlapped.
+
+        items is iterated on a reader thread and transform called on a
+        transformer thread; write runs on the calling thread. Stops every
+        stage if any of them raises, and re-raises the error.
+        """
+        def transformed():
+            for item in self.prefetch(items):
+                result = transform(item)
+                with self.progress:
+                    self.transformed += 1
+                yield result
+
+        self.stopped.clear()
+        try:
+            for result in self.prefetch(transformed()):
+                write(result)
+                with self.progress:
+                    self.written += 1
+                    self.progress.notify_all()
+        finally:
+            self.stopped.set()
+            with self.progress:
+                self.progress.notify_all()
+
+    def drain(self):
+        """Wait until every item transformed so far has been written; call from transform."""
+        with self.progress:
+            while self.written < self.transformed:
+                if self.stopped.is_set():
+                    raise PipelineStopped()
+                self.progress.wait(POLL_SECONDS)
@@ -0,0 +1,56 @@
+-- Daily net revenue per store and day
+-- Edit params (or bind them with query_runner.py) to test different ranges or a specific store.
+WITH params AS (
+  SELECT
+    DATE '2023-07-01' AS start_date,
+    DATE '2023-07-31' AS end_date,
+    NULL::int        AS store_id   -- NULL = all stores
+),
+sales AS (
+  SELECT
+      s.store_id,
+      DATE(s.sale_datetime) AS sale_date,
+      SUM(si.quantity_sold * si.unit_price)                                   AS gross_revenue,
+      SUM(si.quantity_sold * COALESCE(si.promo_discount, 0))                  AS promo_discount_total,
+      SUM(si.quantity_sold * (si.unit_price - COALESCE(si.promo_discount,0))) AS net_revenue
+  FROM Sale s
+  JOIN SaleItem si USING (sale_id)
+  JOIN params p ON TRUE
+  -- Half-open range on the bare column so indexes on sale_datetime apply;
+  -- scalar bounds let a partitioned Sale skip the months outside it
+  WHERE s.sale_datetime >= (SELECT start_date FROM params)
+    AND s.sale_datetime <  (SELECT end_date FROM params) + 1
+    AND (p.store_id IS NULL OR s.store_id = p.store_id)
+  GROUP BY s.store_id, DATE(s.sale_datetime)
+),
+returns AS (
+  SELECT
+      s.store_id,
+      DATE(s.sale_datetime) AS sale_date,
+      SUM(pr.quantity_returned * (si.unit_price - COALESCE(si.promo_discount,0))) AS refund_amount
+  FROM ProductReturn pr
+  JOIN Sale       s  ON s.sale_id = pr.sale_id
+  JOIN SaleItem   si ON si.sale_id = pr.sale_id AND si.sku = pr.sku
+  JOIN params p  ON TRUE
+  WHERE s.sale_datetime >= (SELECT start_date FROM params)
+    AND s.sale_datetime <  (SELECT end_date FROM params) + 1
+    AND (p.store_id IS NULL OR s.store_id = p.store_id)
+  GROUP BY s.store_id, DATE(s.sale_datetime)
+),
+final AS (
+  SELECT
+      sa.store_id,
+      sa.sale_date,
+      sa.gross_revenue,
+      sa.promo_discount_total,
+      COALESCE(r.refund_amount, 0) AS refund_amount,
+      (sa.net_revenue - COALESCE(r.refund_amount, 0)) AS net_after_returns
+  FROM sales sa
+  LEFT JOIN returns r
+    ON r.store_id = sa.store_id
+   AND r.sale_date = sa.sale_date
+)
+-- === Show result table ===
+SELECT *
+FROM final
+ORDER BY store_id, sale_date;
@@ -0,0 +1,27 @@
+-- Top Return Reasons by $ Value 
+-- Edit params (or bind them with query_runner.py) to set the window.
+
+WITH params AS (
+  SELECT
+    DATE '2024-01-01' AS start_date,
+    DATE '2024-01-31' AS end_date
+),
+return_values AS (
+    SELECT
+        rr.description AS return_reason,
+        SUM(pr.quantity_returned * si.unit_price) AS total_return_value
+    FROM ProductReturn pr
+    JOIN ReturnReason rr 
+        ON pr.reason_code = rr.reason_code
+    JOIN SaleItem si 
+        ON pr.sale_id = si.sale_id
+        AND pr.sku = si.sku
+    WHERE pr.return_date BETWEEN (SELECT start_date FROM params) AND (SELECT end_date FROM params)
+    GROUP BY rr.description
+)
+SELECT
+    return_reason,
+    total_return_value
+FROM return_values
+ORDER BY total_return_value DESC
+LIMIT 5; -- top 5 reasons
@@ -0,0 +1,105 @@
+-- Top 5 categories per store and month by net revenue after returns
+-- Edit params (or bind them with query_runner.py) to set your test window or a specific store.
+WITH params AS (
+  SELECT
+    DATE '2023-08-01' AS start_date,
+    DATE '2023-08-31' AS end_date,
+    NULL::int        AS store_id   -- NULL = all stores
+),
+
+-- Monthly sales by store × category
+sales_m AS (
+  SELECT
+      s.store_id,
+      date_trunc('month', s.sale_datetime)::date AS month_start,
+      COALESCE(c.category_name, 'Uncategorized') AS category_name,
+      SUM(si.quantity_sold * si.unit_price)                                   AS gross_revenue,
+      SUM(si.quantity_sold * COALESCE(si.promo_discount,0))                   AS promo_discount_total,
+      SUM(si.quantity_sold * (si.unit_price - COALESCE(si.promo_discount,0))) AS net_revenue
+  FROM Sale s
+  JOIN SaleItem si USING (sale_id)
+  JOIN Product p   USING (sku)
+  LEFT JOIN Category c ON c.category_id = p.category_id
+  JOIN params pz ON TRUE
+  -- Half-open range on the bare column so indexes on sale_datetime apply;
+  -- scalar bounds let a partitioned Sale skip the months outside it
+  WHERE s.sale_datetime >= (SELECT start_date FROM params)
+    AND s.sale_datetime <  (SELECT end_date FROM params) + 1
+    AND (pz.store_id IS NULL OR s.store_id = pz.store_id)
+  GROUP BY s.store_id, date_trunc('month', s.sale_datetime), COALESCE(c.category_name, 'Uncategorized')
+),
+
+-- Monthly refunds by store × category
+returns_m AS (
+  SELECT
+      s.store_id,
+      date_trunc('month', s.sale_datetime)::date AS month_start,
+      COALESCE(c.category_name, 'Uncategorized') AS category_name,
+      SUM(pr.quantity_returned * (si.unit_price - COALESCE(si.promo_discount,0))) AS refund_amount
+  FROM ProductReturn pr
+  JOIN Sale       s  ON s.sale_id = pr.sale_id
+  JOIN SaleItem   si ON si.sale_id = pr.sale_id AND si.sku = pr.sku
+  JOIN Product    p  ON p.sku = pr.sku
+  LEFT JOIN Category c ON c.category_id = p.category_id
+  JOIN params pz ON TRUE
+  WHERE s.sale_datetime >= (SELECT start_date FROM params)
+    AND s.sale_datetime <  (SELECT end_date FROM params) + 1
+    AND (pz.store_id IS NULL OR s.store_id = pz.store_id)
+  GROUP BY s.store_id, date_trunc('month', s.sale_datetime), COALESCE(c.category_name, 'Uncategorized')
+),
+
+-- Combine and compute net after returns
+combined AS (
+  SELECT
+    s.store_id,
+    s.month_start,
+    s.category_name,
+    s.net_revenue,
+    COALESCE(r.refund_amount, 0) AS refund_amount,
+    (s.net_revenue - COALESCE(r.refund_amount, 0)) AS net_after_returns
+  FROM sales_m s
+  LEFT JOIN returns_m r
+    ON r.store_id = s.store_id
+   AND r.month_start = s.month_start
+   AND r.category_name = s.category_name
+),
+
+-- Totals per store × month for contribution %
+store_month_totals AS (
+  SELECT store_id, month_start, SUM(net_after_returns) AS month_total_net
+  FROM combined
+  GROUP BY store_id, month_start
+),
+
+-- Rank categories within store × month
+ranked AS (
+  SELECT
+    c.store_id,
+    c.month_start,
+    c.category_name,
+    c.net_after_returns,
+    RANK() OVER (
+      PARTITION BY c.store_id, c.month_start
+      ORDER BY c.net_after_returns DESC
+    ) AS category_rank,
+    ROUND(
+      c.net_after_returns::numeric / NULLIF(t.month_total_net, 0),
+      4
+    ) AS contribution_pct
+  FROM combined c
+  JOIN store_month_totals t
+    ON t.store_id = c.store_id
+   AND t.month_start = c.month_start
+)
+
+-- === Show result table (Top 5 only) ===
+SELECT
+  store_id,
+  month_start,
+  category_rank,
+  category_name,
+  net_after_returns,
+  contribution_pct
+FROM ranked
+WHERE category_rank <= 5
+ORDER BY store_id, month_start DESC, category_rank, category_name;
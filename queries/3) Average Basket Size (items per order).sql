@@ -0,0 +1,33 @@
+-- Average Basket Size = items per order, per store × day
+-- Edit params (or bind them with query_runner.py) to set your test window or a specific store.
+WITH params AS (
+  SELECT
+    DATE '2023-07-01' AS start_date,
+    DATE '2023-09-30' AS end_date,
+    NULL::int        AS store_id   -- NULL = all stores
+),
+daily AS (
+  SELECT
+      s.store_id,
+      DATE(s.sale_datetime) AS sale_date,
+      COUNT(DISTINCT s.sale_id) AS orders,
+      SUM(si.quantity_sold)     AS items_sold
+  FROM Sale s
+  JOIN SaleItem si USING (sale_id)
+  JOIN params pz ON TRUE
+  -- Half-open range on the bare column so indexes on sale_datetime apply;
+  -- scalar bounds let a partitioned Sale skip the months outside it
+  WHERE s.sale_datetime >= (SELECT start_date FROM params)
+    AND s.sale_datetime <  (SELECT end_date FROM params) + 1
+    AND (pz.store_id IS NULL OR s.store_id = pz.store_id)
+  GROUP BY s.store_id, DATE(s.sale_datetime)
+)
+-- === Result table ===
+SELECT
+  store_id,
+  sale_date,
+  orders,
+  items_sold,
+  ROUND(items_sold::numeric / NULLIF(orders,0), 2) AS avg_basket_size
+FROM daily
+ORDER BY store_id, sale_date;
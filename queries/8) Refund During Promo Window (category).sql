@@ -0,0 +1,35 @@
+-- Refunds During Promo Window (by Category) 
+-- Edit params (or bind them with query_runner.py) to set the window or a specific store.
+
+WITH params AS (
+  SELECT
+    DATE '2024-01-01' AS start_date,
+    DATE '2024-01-31' AS end_date,
+    NULL::int        AS store_id   -- NULL = all stores
+),
+returns_promo AS (
+  SELECT
+      s.store_id,
+      pcat.category_name,
+      SUM(pr.quantity_returned) AS units_returned,
+      SUM(pr.quantity_returned * (si.unit_price - COALESCE(si.promo_discount, 0))) AS refund_amount
+  FROM ProductReturn pr
+  JOIN Sale       s  ON s.sale_id = pr.sale_id
+  JOIN SaleItem   si ON si.sale_id = pr.sale_id AND si.sku = pr.sku
+  JOIN Product    p  ON p.sku = pr.sku
+  LEFT JOIN Category pcat ON pcat.category_id = p.category_id
+  WHERE si.promo_id IS NOT NULL
+    -- Half-open range: first day included, day after the last day excluded
+    AND s.sale_datetime >= (SELECT start_date FROM params)
+    AND s.sale_datetime <  (SELECT end_date FROM params) + 1
+    AND ( (SELECT store_id FROM params) IS NULL
+          OR s.store_id = (SELECT store_id FROM params) )
+  GROUP BY s.store_id, pcat.category_name
+)
+SELECT
+  store_id,
+  category_name,
+  units_returned,
+  refund_amount
+FROM returns_promo
+ORDER BY refund_amount DESC, units_returned DESC;
@@ -0,0 +1,43 @@
+-- On-time Delivery Rate (by Vendor, optional Store) 
+-- Edit params (or bind them with query_runner.py) to set the window or a specific store.
+
+WITH params AS (
+  SELECT
+    DATE '2024-01-01' AS start_date,
+    DATE '2024-01-31' AS end_date,
+    NULL::int        AS store_id   -- NULL = all stores
+),
+deliveries AS (
+  SELECT
+    d.vendor_id,
+    d.store_id,
+    d.status
+  FROM Delivery d
+  WHERE d.delivery_date BETWEEN (SELECT start_date FROM params) AND (SELECT end_date FROM params)
+    AND ( (SELECT store_id FROM params) IS NULL
+          OR d.store_id = (SELECT store_id FROM params) )
+),
+agg AS (
+  SELECT
+    d.vendor_id,
+    d.store_id,
+    COUNT(*)::numeric AS total_deliveries,
+    SUM(CASE WHEN d.status = 'Delayed' THEN 1 ELSE 0 END)::numeric AS delayed_deliveries
+  FROM deliveries d
+  GROUP BY d.vendor_id, d.store_id
+)
+SELECT
+  a.vendor_id,
+  v.vendor_name,
+  a.store_id,
+  a.total_deliveries,
+  a.delayed_deliveries,
+  ROUND(
+    CASE WHEN a.total_deliveries > 0
+         THEN 1 - (a.delayed_deliveries / a.total_deliveries)
+         ELSE NULL
+    END, 4
+  ) AS on_time_rate
+FROM agg a
+LEFT JOIN Vendor v ON v.vendor_id = a.vendor_id
+ORDER BY on_time_rate DESC NULLS LAST, total_deliveries DESC, v.vendor_name;
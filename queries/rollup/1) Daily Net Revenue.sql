@@ -0,0 +1,26 @@
+-- Daily net revenue per store and day, read from the daily_store_sku_sales rollup
+-- Edit params (or bind them with query_runner.py) to test different ranges or a specific store.
+WITH params AS (
+  SELECT
+    DATE '2023-07-01' AS start_date,
+    DATE '2023-07-31' AS end_date,
+    NULL::int        AS store_id   -- NULL = all stores
+),
+final AS (
+  SELECT
+      r.store_id,
+      r.sale_date,
+      SUM(r.gross_revenue)                                         AS gross_revenue,
+      SUM(r.promo_discount)                                        AS promo_discount_total,
+      SUM(r.refund_amount)                                         AS refund_amount,
+      SUM(r.gross_revenue - r.promo_discount - r.refund_amount)    AS net_after_returns
+  FROM daily_store_sku_sales r
+  JOIN params p ON TRUE
+  WHERE r.sale_date BETWEEN p.start_date AND p.end_date
+    AND (p.store_id IS NULL OR r.store_id = p.store_id)
+  GROUP BY r.store_id, r.sale_date
+)
+-- === Show result table ===
+SELECT *
+FROM final
+ORDER BY store_id, sale_date;
@@ -0,0 +1,67 @@
+-- Top 5 categories per store and month by net revenue after returns,
+-- read from the daily_store_sku_sales rollup
+-- Edit params (or bind them with query_runner.py) to set your test window or a specific store.
+WITH params AS (
+  SELECT
+    DATE '2023-08-01' AS start_date,
+    DATE '2023-08-31' AS end_date,
+    NULL::int        AS store_id   -- NULL = all stores
+),
+
+-- Monthly sales and refunds by store × category
+combined AS (
+  SELECT
+      r.store_id,
+      date_trunc('month', r.sale_date)::date     AS month_start,
+      COALESCE(c.category_name, 'Uncategorized') AS category_name,
+      SUM(r.gross_revenue - r.promo_discount)    AS net_revenue,
+      SUM(r.refund_amount)                       AS refund_amount,
+      SUM(r.gross_revenue - r.promo_discount - r.refund_amount) AS net_after_returns
+  FROM daily_store_sku_sales r
+  JOIN Product p   USING (sku)
+  LEFT JOIN Category c ON c.category_id = p.category_id
+  JOIN params pz ON TRUE
+  WHERE r.sale_date BETWEEN pz.start_date AND pz.end_date
+    AND (pz.store_id IS NULL OR r.store_id = pz.store_id)
+  GROUP BY r.store_id, date_trunc('month', r.sale_date), COALESCE(c.category_name, 'Uncategorized')
+),
+
+-- Totals per store × month for contribution %
+store_month_totals AS (
+  SELECT store_id, month_start, SUM(net_after_returns) AS month_total_net
+  FROM combined
+  GROUP BY store_id, month_start
+),
+
+-- Rank categories within store × month
+ranked AS (
+  SELECT
+    c.store_id,
+    c.month_start,
+    c.category_name,
+    c.net_after_returns,
+    RANK() OVER (
+      PARTITION BY c.store_id, c.month_start
+      ORDER BY c.net_after_returns DESC
+    ) AS category_rank,
+    ROUND(
+      c.net_after_returns::numeric / NULLIF(t.month_total_net, 0),
+      4
+    ) AS contribution_pct
+  FROM combined c
+  JOIN store_month_totals t
+    ON t.store_id = c.store_id
+   AND t.month_start = c.month_start
+)
+
+-- === Show result table (Top 5 only) ===
+SELECT
+  store_id,
+  month_start,
+  category_rank,
+  category_name,
+  net_after_returns,
+  contribution_pct
+FROM ranked
+WHERE category_rank <= 5
+ORDER BY store_id, month_start DESC, category_rank, category_name;
@@ -0,0 +1,20 @@
+-- Average Basket Size = items per order, per store × day, read from the daily_store_sales rollup
+-- Edit params (or bind them with query_runner.py) to set your test window or a specific store.
+WITH params AS (
+  SELECT
+    DATE '2023-07-01' AS start_date,
+    DATE '2023-09-30' AS end_date,
+    NULL::int        AS store_id   -- NULL = all stores
+)
+-- === Result table ===
+SELECT
+  d.store_id,
+  d.sale_date,
+  d.orders,
+  d.units_sold AS items_sold,
+  ROUND(d.units_sold::numeric / NULLIF(d.orders,0), 2) AS avg_basket_size
+FROM daily_store_sales d
+JOIN params pz ON TRUE
+WHERE d.sale_date BETWEEN pz.start_date AND pz.end_date
+  AND (pz.store_id IS NULL OR d.store_id = pz.store_id)
+ORDER BY d.store_id, d.sale_date;
@@ -0,0 +1,20 @@
+-- Top SKUs Incremental Units (promo vs not), read from the daily_store_sku_sales rollup
+-- A line is promo when it has a promo_id, as in the raw query (not on promo_applied).
+
+WITH units AS (
+    SELECT
+        r.sku,
+        SUM(r.promo_id_units)                AS total_promo_units,
+        SUM(r.units_sold - r.promo_id_units) AS total_non_promo_units
+    FROM daily_store_sku_sales r
+    GROUP BY r.sku
+    HAVING SUM(r.promo_id_orders) > 0
+)
+SELECT
+    u.sku,
+    pr.product_name,
+    u.total_promo_units - u.total_non_promo_units AS incremental_units
+FROM units u
+JOIN Product pr ON u.sku = pr.sku
+ORDER BY incremental_units DESC
+LIMIT 5;
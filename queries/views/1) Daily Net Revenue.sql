@@ -0,0 +1,12 @@
+-- Daily net revenue per store and day, over every day of the daily_store_sku_sales rollup
+-- Materialized view version: no window, filter on store_id and sale_date when reading it.
+SELECT
+    r.store_id,
+    r.sale_date,
+    SUM(r.gross_revenue)                                         AS gross_revenue,
+    SUM(r.promo_discount)                                        AS promo_discount_total,
+    SUM(r.refund_amount)                                         AS refund_amount,
+    SUM(r.gross_revenue - r.promo_discount - r.refund_amount)    AS net_after_returns
+FROM daily_store_sku_sales r
+GROUP BY r.store_id, r.sale_date
+ORDER BY store_id, sale_date;
@@ -0,0 +1,22 @@
+-- Return Reasons by $ Value per month of the return, ranked within the month
+-- Materialized view version: no window, filter on month_start (and reason_rank <= 5 for the top 5) when reading it.
+WITH return_values AS (
+    SELECT
+        date_trunc('month', pr.return_date)::date AS month_start,
+        rr.description AS return_reason,
+        SUM(pr.quantity_returned * si.unit_price) AS total_return_value
+    FROM ProductReturn pr
+    JOIN ReturnReason rr
+        ON pr.reason_code = rr.reason_code
+    JOIN SaleItem si
+        ON pr.sale_id = si.sale_id
+        AND pr.sku = si.sku
+    GROUP BY date_trunc('month', pr.return_date), rr.description
+)
+SELECT
+    month_start,
+    RANK() OVER (PARTITION BY month_start ORDER BY total_return_value DESC) AS reason_rank,
+    return_reason,
+    total_return_value
+FROM return_values
+ORDER BY month_start, reason_rank, return_reason;
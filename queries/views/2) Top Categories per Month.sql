@@ -0,0 +1,43 @@
+-- Top 5 categories per store and month by net revenue after returns,
+-- over every month of the daily_store_sku_sales rollup
+-- Materialized view version: no window, filter on store_id and month_start when reading it.
+WITH combined AS (
+  SELECT
+      r.store_id,
+      date_trunc('month', r.sale_date)::date     AS month_start,
+      COALESCE(c.category_name, 'Uncategorized') AS category_name,
+      SUM(r.gross_revenue - r.promo_discount - r.refund_amount) AS net_after_returns
+  FROM daily_store_sku_sales r
+  JOIN Product p   USING (sku)
+  LEFT JOIN Category c ON c.category_id = p.category_id
+  GROUP BY r.store_id, date_trunc('month', r.sale_date), COALESCE(c.category_name, 'Uncategorized')
+),
+
+-- Rank categories within store × month, with their share of the month
+ranked AS (
+  SELECT
+    c.store_id,
+    c.month_start,
+    c.category_name,
+    c.net_after_returns,
+    RANK() OVER (
+      PARTITION BY c.store_id, c.month_start
+      ORDER BY c.net_after_returns DESC
+    ) AS category_rank,
+    ROUND(
+      c.net_after_returns::numeric
+        / NULLIF(SUM(c.net_after_returns) OVER (PARTITION BY c.store_id, c.month_start), 0),
+      4
+    ) AS contribution_pct
+  FROM combined c
+)
+SELECT
+  store_id,
+  month_start,
+  category_rank,
+  category_name,
+  net_after_returns,
+  contribution_pct
+FROM ranked
+WHERE category_rank <= 5
+ORDER BY store_id, month_start DESC, category_rank, category_name;
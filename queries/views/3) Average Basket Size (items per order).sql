@@ -0,0 +1,10 @@
+-- Average Basket Size = items per order, per store × day, over every day of the daily_store_sales rollup
+-- Materialized view version: no window, filter on store_id and sale_date when reading it.
+SELECT
+  d.store_id,
+  d.sale_date,
+  d.orders,
+  d.units_sold AS items_sold,
+  ROUND(d.units_sold::numeric / NULLIF(d.orders,0), 2) AS avg_basket_size
+FROM daily_store_sales d
+ORDER BY d.store_id, d.sale_date;
@@ -0,0 +1,29 @@
+-- Scheduled Labor Hours per store and day, over every scheduled shift
+-- Materialized view version: no window, filter on store_id and shift_date when reading it.
+WITH base AS (
+  SELECT
+      ss.shift_date,
+      e.store_id,
+      ss.employee_id,
+      -- hours per shift, handling overnight (end < start)
+      GREATEST(
+        EXTRACT(EPOCH FROM (
+          CASE
+            WHEN ss.end_time >= ss.start_time
+              THEN ss.end_time - ss.start_time
+            ELSE ss.end_time - ss.start_time + INTERVAL '24 hours'
+          END
+        )) / 3600.0,
+        0
+      ) AS hours
+  FROM ShiftSchedule ss
+  JOIN Employee e ON e.employee_id = ss.employee_id
+)
+SELECT
+  b.store_id,
+  b.shift_date,
+  ROUND(SUM(b.hours)::numeric, 2) AS scheduled_hours,
+  COUNT(DISTINCT b.employee_id)   AS scheduled_headcount
+FROM base b
+GROUP BY b.store_id, b.shift_date
+ORDER BY b.shift_date, b.store_id;
@@ -0,0 +1,32 @@
+-- Units/day: Promo vs Non-Promo per store, SKU and month, read from the daily_store_sku_sales rollup
+-- Materialized view version: no window, filter on store_id and month_start when reading it.
+-- A SKU is listed for a month with at least 3 promo and 3 non-promo sale days in it.
+WITH bucketed AS (
+  SELECT
+      r.store_id,
+      r.sku,
+      date_trunc('month', r.sale_date)::date AS month_start,
+      -- numerator: total units
+      SUM(r.promo_units)::numeric    AS promo_units,
+      SUM(r.nonpromo_units)::numeric AS nonpromo_units,
+      -- denominators: sale days with at least one promo / non-promo line
+      COUNT(*) FILTER (WHERE r.promo_orders > 0)    AS promo_days,
+      COUNT(*) FILTER (WHERE r.nonpromo_orders > 0) AS nonpromo_days
+  FROM daily_store_sku_sales r
+  GROUP BY r.store_id, r.sku, date_trunc('month', r.sale_date)
+)
+SELECT
+    b.store_id,
+    b.month_start,
+    b.sku,
+    p.product_name,
+    COALESCE(cat.category_name, 'Uncategorized') AS category_name,
+    ROUND(b.promo_units    / NULLIF(b.promo_days, 0)::numeric, 3)    AS units_per_day_promo,
+    ROUND(b.nonpromo_units / NULLIF(b.nonpromo_days, 0)::numeric, 3) AS units_per_day_nonpromo,
+    b.promo_days,
+    b.nonpromo_days
+FROM bucketed b
+JOIN Product p        ON p.sku = b.sku
+LEFT JOIN Category cat ON cat.category_id = p.category_id
+WHERE LEAST(b.promo_days, b.nonpromo_days) >= 3
+ORDER BY store_id, month_start, category_name, product_name, sku;
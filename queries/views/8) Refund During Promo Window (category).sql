@@ -0,0 +1,25 @@
+-- Refunds During Promo Window (by Category) per store and month of the sale
+-- Materialized view version: no window, filter on store_id and month_start when reading it.
+WITH returns_promo AS (
+  SELECT
+      s.store_id,
+      date_trunc('month', s.sale_datetime)::date AS month_start,
+      pcat.category_name,
+      SUM(pr.quantity_returned) AS units_returned,
+      SUM(pr.quantity_returned * (si.unit_price - COALESCE(si.promo_discount, 0))) AS refund_amount
+  FROM ProductReturn pr
+  JOIN Sale       s  ON s.sale_id = pr.sale_id
+  JOIN SaleItem   si ON si.sale_id = pr.sale_id AND si.sku = pr.sku
+  JOIN Product    p  ON p.sku = pr.sku
+  LEFT JOIN Category pcat ON pcat.category_id = p.category_id
+  WHERE si.promo_id IS NOT NULL
+  GROUP BY s.store_id, date_trunc('month', s.sale_datetime), pcat.category_name
+)
+SELECT
+  store_id,
+  month_start,
+  category_name,
+  units_returned,
+  refund_amount
+FROM returns_promo
+ORDER BY month_start, refund_amount DESC, units_returned DESC;
@@ -0,0 +1,28 @@
+-- On-time Delivery Rate (by Vendor and Store) per month of delivery
+-- Materialized view version: no window, filter on store_id and month_start when reading it.
+WITH agg AS (
+  SELECT
+    d.vendor_id,
+    d.store_id,
+    date_trunc('month', d.delivery_date)::date AS month_start,
+    COUNT(*)::numeric AS total_deliveries,
+    SUM(CASE WHEN d.status = 'Delayed' THEN 1 ELSE 0 END)::numeric AS delayed_deliveries
+  FROM Delivery d
+  GROUP BY d.vendor_id, d.store_id, date_trunc('month', d.delivery_date)
+)
+SELECT
+  a.vendor_id,
+  v.vendor_name,
+  a.store_id,
+  a.month_start,
+  a.total_deliveries,
+  a.delayed_deliveries,
+  ROUND(
+    CASE WHEN a.total_deliveries > 0
+         THEN 1 - (a.delayed_deliveries / a.total_deliveries)
+         ELSE NULL
+    END, 4
+  ) AS on_time_rate
+FROM agg a
+LEFT JOIN Vendor v ON v.vendor_id = a.vendor_id
+ORDER BY month_start, on_time_rate DESC NULLS LAST, total_deliveries DESC, v.vendor_name;
@@ -0,0 +1,50 @@
+import os
+import re
+import zipfile
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# The query pack as maintained (sargable date ranges), the original pgAdmin
+# export it was rewritten from, the versions of queries 1, 2, 3, 6 and 7
+# that read the daily sales rollup (rollup.py) instead of raw sales, and the
+# versions of the dated queries with no window that the materialized views
+# (matviews.py) are built from
+QUERY_PACK = os.path.join(HERE, 'queries')
+ORIGINAL_QUERY_PACK = os.path.join(HERE, '11_Complex_Analytical_Query.zip')
+ROLLUP_QUERY_PACK = os.path.join(QUERY_PACK, 'rollup')
+VIEW_QUERY_PACK = os.path.join(QUERY_PACK, 'views')
+
+# "7) Top SKUs by Incremental Units (promo vs not).sql" -> 7, title
+QUERY_FILE_RE = re.compile(r"(\d+)\)\s*(.*)\.sql$")
+
+# Trailing semicolon and any line comments after it, e.g. "LIMIT 5; -- top 5"
+TERMINATOR_RE = re.compile(r";\s*(?:--[^\n]*\s*)*$")
+
+
+def load_query_pack(path=QUERY_PACK):
+    """{number: (title, sql)} for the numbered .sql files of a query pack directory or zip, in order."""
+    if os.path.isdir(path):
+        files = {name: os.path.join(path, name) for name in os.listdir(path)}
+
+        def read(name):
+            with open(files[name], encoding='utf-8') as f:
+                return f.read()
+    else:
+        pack = zipfile.ZipFile(path)
+        files = {os.path.basename(name): name for name in pack.namelist()}
+
+        def read(name):
+            return pack.read(files[name]).decode('utf-8')
+
+    queries = {}
+    for name in files:
+        match = QUERY_FILE_RE.match(name)
+        if match:
+            queries[int(match.group(1))] = (match.group(2).strip(), read(name))
+    return dict(sorted(queries.items()))
+
+
+def statement_body(sql):
+    """sql without its terminating semicolon, so it can be embedded in another statement."""
+    return TERMINATOR_RE.sub('', sql.strip())
@@ -0,0 +1,273 @@
+"""Run pack queries with bound parameters and cache their results.
+
+The dated queries of the pack keep their defaults in a params CTE with
+named columns (start_date, end_date and, where the query can filter on it,
+store_id). The runner swaps in bound values for the parameters it is given
+and keeps the defaults for the others, so the files still run as they are
+in pgAdmin.
+
+Results are cached in memory, and optionally on disk, with least recently
+used eviction. The key is the bound query text and the data version: a
+number ETL_Python.py bumps in etl_data_version whenever a run changes a
+table, so a repeat request on unchanged data is answered from the cache and
+any new load makes every cached result stale.
+
+    python query_runner.py 1 --start-date 2023-07-01 --end-date 2023-07-31 --store-id 2
+    python query_runner.py 6 --rollup --cache-dir .query_cache --repeat 3
+"""
+import argparse
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import psycopg2
+
+from db import resolve_dsn
+from query_pack import QUERY_PACK, ROLLUP_QUERY_PACK, load_query_pack
+
+
+DATA_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS etl_data_version (
+        version BIGINT PRIMARY KEY,
+        tables TEXT[] NOT NULL,
+        changed_at TIMESTAMP NOT NULL DEFAULT now()
+    );
+"""
+
+# Parameters the runner binds, and the type each is cast to
+PARAMETERS = {'start_date': 'date', 'end_date': 'date', 'store_id': 'integer'}
+
+# The params CTE; its body is found by matching parentheses from here
+PARAMS_CTE_RE = re.compile(r"\bparams\s+AS\s*\(", re.IGNORECASE)
+PARAM_COLUMN_RE = re.compile(r"\bAS\s+(\w+)\s*(?:,|$)", re.IGNORECASE)
+LINE_COMMENT_RE = re.compile(r"--[^\n]*")
+
+MAX_ENTRIES = 128
+MAX_DISK_MB = 256
+
+
+def bump_data_version(cur, tables):
+    """Record that tables changed; returns the new data version."""
+    cur.execute(DATA_VERSION_DDL)
+    cur.execute("""
+        INSERT INTO etl_data_version (version, tables)
+        SELECT COALESCE(MAX(version), 0) + 1, %s FROM etl_data_version
+        RETURNING version;
+    """, (sorted(tables),))
+    return cur.fetchone()[0]
+
+
+def data_version(cur):
+    # 0 until the ETL first records a change
+    cur.execute("SELECT to_regclass('etl_data_version') IS NOT NULL;")
+    if not cur.fetchone()[0]:
+        return 0
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM etl_data_version;")
+    return cur.fetchone()[0]
+
+
+def params_cte(sql):
+    """(start, end) offsets of the params CTE body in sql, or None."""
+    match = PARAMS_CTE_RE.search(sql)
+    if not match:
+        return None
+    depth, position = 1, match.end()
+    while depth:
+        if sql.startswith('--', position):
+            position = sql.index('\n', position)
+        elif sql[position] == '(':
+            depth += 1
+        elif sql[position] == ')':
+            depth -= 1
+        position += 1
+    return match.end(), position - 1
+
+
+def query_parameters(sql):
+    """Names of the PARAMETERS the query's params CTE defines, in order."""
+    bounds = params_cte(sql)
+    if bounds is None:
+        return []
+    body = LINE_COMMENT_RE.sub('', sql[bounds[0]:bounds[1]])
+    return [name for name in PARAM_COLUMN_RE.findall(body) if name in PARAMETERS]
+
+
+def bind(sql, params):
+    """sql with psycopg2 placeholders for the given params, and their values.
+
+    The params CTE is wrapped so the bound values replace its columns of the
+    same name and its other columns keep their defaults. Literal % signs are
+    escaped, as psycopg2 requires once a query takes parameters.
+    """
+    params = {name: value for name, value in params.items() if value is not None}
+    if not params:
+        return sql, None
+    unknown = set(params) - set(query_parameters(sql))
+    if unknown:
+        raise ValueError(f"the query takes no {', '.join(sorted(unknown))} parameter")
+
+    start, end = params_cte(sql)
+    body = LINE_COMMENT_RE.sub('', sql[start:end])
+    columns = [
+        f"%({name})s::{PARAMETERS[name]} AS {name}" if name in params else f"d.{name}"
+        for name in PARAM_COLUMN_RE.findall(body)
+    ]
+    cte = f"\n  SELECT {', '.join(columns)}\n  FROM ({body.replace('%', '%%')}) d\n"
+    return sql[:start].replace('%', '%%') + cte + sql[end:].replace('%', '%%'), params
+
+
+class ResultCache:
+    """LRU cache of query results in memory, backed by a directory if given.
+
+    Disk entries are pickled DataFrames named after their data version and
+    key; entries of older versions are removed when the version moves on,
+    and the least recently read ones once the directory is over max_disk_mb.
+    """
+
+    def __init__(self, directory=None, max_entries=MAX_ENTRIES, max_disk_mb=MAX_DISK_MB):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_mb * 1024 * 1024
+        self.entries = OrderedDict()
+        self.version = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self, version, key):
+        return os.path.join(self.directory, f"v{version}-{key}.pkl")
+
+    def use_version(self, version):
+        # Results of an older data version are never read again
+        if version == self.version:
+            return
+        self.version = version
+        self.entries.clear()
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith('.pkl') and not name.startswith(f"v{version}-"):
+                    os.remove(os.path.join(self.directory, name))
+
+    def get(self, version, key):
+        self.use_version(version)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        if self.directory and os.path.exists(self.path(version, key)):
+            path = self.path(version, key)
+            os.utime(path)
+            result = pd.read_pickle(path)
+            self.remember(key, result)
+            return result
+        return None
+
+    def put(self, version, key, result):
+        self.use_version(version)
+        self.remember(key, result)
+        if self.directory:
+            result.to_pickle(self.path(version, key))
+            self.evict_disk()
+
+    def remember(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def evict_disk(self):
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.pkl')]
+        stats = sorted(((os.stat(path), path) for path in files), key=lambda entry: entry[0].st_mtime)
+        size = sum(stat.st_size for stat, _ in stats)
+        for stat, path in stats:
+            if size <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            size -= stat.st_size
+
+
+class QueryRunner:
+    """Pack queries by number, with bound parameters and cached results."""
+
+    def __init__(self, conn, pack=QUERY_PACK, rollup=False, cache=None):
+        self.conn = conn
+        self.queries = load_query_pack(pack)
+        if rollup:
+            self.queries.update(load_query_pack(ROLLUP_QUERY_PACK))
+        self.cache = cache or ResultCache()
+        self.hits = self.misses = 0
+
+    def parameters(self, number):
+        return query_parameters(self.queries[number][1])
+
+    def run(self, number, **params):
+        """DataFrame of query number run with params (start_date, end_date, store_id).
+
+        The frame may be shared with the cache and later callers; copy it
+        before changing it.
+        """
+        sql, values = bind(self.queries[number][1], params)
+        try:
+            with self.conn.cursor() as cur:
+                # The bound text is what runs, so it is the key. Bytes, as the
+                # pack's comments are not ASCII (see MaterializedViews.ensure())
+                text = cur.mogrify(sql.encode(), values)
+                version = data_version(cur)
+                key = hashlib.sha256(text).hexdigest()
+                result = self.cache.get(version, key)
+                if result is not None:
+                    self.hits += 1
+                    return result
+                self.misses += 1
+                cur.execute(text)
+                result = pd.DataFrame(cur.fetchall(), columns=[column.name for column in cur.description])
+        finally:
+            self.conn.rollback()
+        self.cache.put(version, key, result)
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a pack query with parameters, caching the result.")
+    parser.add_argument('query', type=int, help="number of the query in the pack")
+    parser.add_argument('--dsn', default=None, help="database to use (default: see db.resolve_dsn)")
+    parser.add_argument('--pack', default=QUERY_PACK, help="query pack (zip or directory)")
+    parser.add_argument('--rollup', action='store_true',
+                        help="use the rollup version of the query where there is one")
+    parser.add_argument('--start-date', default=None, help="first day of the window (YYYY-MM-DD)")
+    parser.add_argument('--end-date', default=None, help="last day of the window (YYYY-MM-DD)")
+    parser.add_argument('--store-id', type=int, default=None, help="limit the query to one store")
+    parser.add_argument('--cache-dir', default=None, help="keep results in this directory between runs")
+    parser.add_argument('--max-disk-mb', type=int, default=MAX_DISK_MB,
+                        help=f"size the cache directory is kept under (default: {MAX_DISK_MB})")
+    parser.add_argument('--repeat', type=int, default=1, help="run the query this many times")
+    parser.add_argument('--output', default=None, help="write the result to this CSV file")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(resolve_dsn(args.dsn))
+    runner = QueryRunner(conn, args.pack, args.rollup, ResultCache(args.cache_dir, max_disk_mb=args.max_disk_mb))
+    if args.query not in runner.queries:
+        parser.error(f"query {args.query} is not in {args.pack}")
+    params = {'start_date': args.start_date, 'end_date': args.end_date, 'store_id': args.store_id}
+    try:
+        for _ in range(args.repeat):
+            started, hits = time.perf_counter(), runner.hits
+            result = runner.run(args.query, **params)
+            source = 'cache' if runner.hits > hits else 'database'
+            print(f"✅ {len(result)} rows of query {args.query} from the {source} "
+                  f"in {(time.perf_counter() - started) * 1000:.1f} ms.")
+    except (ValueError, psycopg2.Error) as e:
+        print(f"❌ Error running query {args.query}: {e}")
+        raise SystemExit(1)
+    finally:
+        conn.close()
+
+    if args.output:
+        result.to_csv(args.output, index=False)
+    else:
+        print(result.to_string(index=False, max_rows=40))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""Daily store x SKU sales rollup maintained by the ETL.
+
+daily_store_sku_sales holds one row per store, sale day and SKU with the
+measures queries 1, 2, 6 and 7 aggregate from SaleItem, Sale and
+ProductReturn: orders, units, gross revenue, promo discount, returned
+units and refunds, the promo / non-promo split on promo_applied that query
+6 uses, and the orders and units of lines with a promo_id, which query 7
+counts as promo (the ETL fills a blank promo_applied with false on its
+own, so the two splits can differ).
+Returns are booked on the day of the sale they belong to, as those queries
+do. Distinct orders per store and day do not add up across SKUs, so they
+go to the companion daily_store_sales table that query 3 reads.
+
+Every run recomputes the store days of the Sale, SaleItem and
+ProductReturn rows it actually inserted, a sale line or return counting on
+the day of its sale: the ETL captures those rows as they are merged, so
+rows dropped as duplicates or skipped by ON CONFLICT recompute nothing, and
+a run that inserts no sales recomputes no day. Days whose Sale months were
+detached keep their rollup rows.
+"""
+import io
+
+
+ROLLUP_DDL = """
+    CREATE TABLE IF NOT EXISTS daily_store_sku_sales (
+        store_id INTEGER NOT NULL,
+        sale_date DATE NOT NULL,
+        sku varchar(20) NOT NULL,
+        orders INTEGER NOT NULL,
+        units_sold INTEGER NOT NULL,
+        gross_revenue NUMERIC(14,2) NOT NULL,
+        promo_discount NUMERIC(14,2) NOT NULL,
+        returned_units INTEGER NOT NULL,
+        refund_amount NUMERIC(14,2) NOT NULL,
+        promo_orders INTEGER NOT NULL,
+        promo_units INTEGER NOT NULL,
+        nonpromo_orders INTEGER NOT NULL,
+        nonpromo_units INTEGER NOT NULL,
+        promo_id_orders INTEGER NOT NULL,
+        promo_id_units INTEGER NOT NULL,
+        PRIMARY KEY (store_id, sale_date, sku)
+    );
+
+    -- Rollups created before the promo_id columns get them empty, and are
+    -- then recomputed in full (see outdated())
+    ALTER TABLE daily_store_sku_sales
+        ADD COLUMN IF NOT EXISTS promo_id_orders INTEGER,
+        ADD COLUMN IF NOT EXISTS promo_id_units INTEGER;
+
+    CREATE TABLE IF NOT EXISTS daily_store_sales (
+        store_id INTEGER NOT NULL,
+        sale_date DATE NOT NULL,
+        orders INTEGER NOT NULL,
+        units_sold INTEGER NOT NULL,
+        PRIMARY KEY (store_id, sale_date)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_daily_store_sku_sales_sale_date ON daily_store_sku_sales (sale_date);
+    CREATE INDEX IF NOT EXISTS idx_daily_store_sku_sales_sku ON daily_store_sku_sales (sku);
+"""
+
+# Tables refresh_rollup() maintains
+ROLLUP_TABLES = ('daily_store_sku_sales', 'daily_store_sales')
+
+# Tables whose inserted rows change the rollup, and the store days of the
+# rows of each captured in rollup_new
+NEW_DAYS_SQL = {
+    'Sale': """
+        SELECT DISTINCT store_id, sale_datetime::date FROM rollup_new
+        WHERE store_id IS NOT NULL AND sale_datetime IS NOT NULL;
+    """,
+    'SaleItem': """
+        SELECT DISTINCT s.store_id, s.sale_datetime::date
+        FROM rollup_new x
+        JOIN Sale s ON s.sale_id = x.sale_id
+        WHERE s.store_id IS NOT NULL AND s.sale_datetime IS NOT NULL;
+    """,
+}
+NEW_DAYS_SQL['ProductReturn'] = NEW_DAYS_SQL['SaleItem']
+
+# Store days to recompute; filled from the captured rows or from Sale
+DAYS_DDL = """
+    DROP TABLE IF EXISTS rollup_days;
+    CREATE TEMP TABLE rollup_days (
+        store_id INTEGER NOT NULL,
+        sale_date DATE NOT NULL,
+        PRIMARY KEY (store_id, sale_date)
+    );
+"""
+
+ALL_DAYS_SQL = """
+    INSERT INTO rollup_days (store_id, sale_date)
+    SELECT DISTINCT store_id, sale_datetime::date FROM Sale
+    WHERE store_id IS NOT NULL AND sale_datetime IS NOT NULL;
+"""
+
+# Rows of each rollup table for the days in rollup_days: (key, columns, query)
+ROLLUP_ROWS = {
+    # A line is one (sale, sku) pair, so lines counted are orders of the sku
+    'daily_store_sku_sales': (
+        ('store_id', 'sale_date', 'sku'),
+        ('store_id', 'sale_date', 'sku', 'orders', 'units_sold', 'gross_revenue', 'promo_discount',
+         'returned_units', 'refund_amount', 'promo_orders', 'promo_units', 'nonpromo_orders', 'nonpromo_units',
+         'promo_id_orders', 'promo_id_units'),
+        """
+        SELECT
+            d.store_id,
+            d.sale_date,
+            si.sku,
+            COUNT(*),
+            SUM(si.quantity_sold),
+            SUM(si.quantity_sold * si.unit_price),
+            SUM(si.quantity_sold * COALESCE(si.promo_discount, 0)),
+            COALESCE(SUM(r.returned_units), 0),
+            COALESCE(SUM(r.returned_units * (si.unit_price - COALESCE(si.promo_discount, 0))), 0),
+            COUNT(*) FILTER (WHERE si.promo_applied),
+            COALESCE(SUM(si.quantity_sold) FILTER (WHERE si.promo_applied), 0),
+            COUNT(*) FILTER (WHERE NOT si.promo_applied),
+            COALESCE(SUM(si.quantity_sold) FILTER (WHERE NOT si.promo_applied), 0),
+            COUNT(*) FILTER (WHERE si.promo_id IS NOT NULL),
+            COALESCE(SUM(si.quantity_sold) FILTER (WHERE si.promo_id IS NOT NULL), 0)
+        FROM rollup_days d
+        JOIN Sale s
+          ON s.store_id = d.store_id
+         AND s.sale_datetime >= d.sale_date
+         AND s.sale_datetime <  d.sale_date + 1
+        JOIN SaleItem si ON si.sale_id = s.sale_id
+        LEFT JOIN LATERAL (
+            SELECT SUM(pr.quantity_returned) AS returned_units
+            FROM ProductReturn pr
+            WHERE pr.sale_id = si.sale_id AND pr.sku = si.sku
+        ) r ON TRUE
+        GROUP BY d.store_id, d.sale_date, si.sku
+        """,
+    ),
+    'daily_store_sales': (
+        ('store_id', 'sale_date'),
+        ('store_id', 'sale_date', 'orders', 'units_sold'),
+        """
+        SELECT d.store_id, d.sale_date, COUNT(DISTINCT s.sale_id), SUM(si.quantity_sold)
+        FROM rollup_days d
+        JOIN Sale s
+          ON s.store_id = d.store_id
+         AND s.sale_datetime >= d.sale_date
+         AND s.sale_datetime <  d.sale_date + 1
+        JOIN SaleItem si ON si.sale_id = s.sale_id
+        GROUP BY d.store_id, d.sale_date
+        """,
+    ),
+}
+
+
+def start_capture(cur, table, columns):
+    """Create the temp table the inserted rows of table are captured in; returns its name.
+
+    Pass the name as the capture of the loader (copy_merge, insert_merge or
+    load_with_inventory_delta), then read the days with captured_days().
+    """
+    cur.execute("DROP TABLE IF EXISTS rollup_new;")
+    cur.execute(f"CREATE TEMP TABLE rollup_new AS SELECT {', '.join(columns)} FROM {table} WITH NO DATA;")
+    return 'rollup_new'
+
+
+def captured_days(cur, table):
+    """Set of (store_id, sale date) pairs of the rows captured since start_capture(); drops the capture."""
+    cur.execute(NEW_DAYS_SQL[table])
+    days = set(cur.fetchall())
+    cur.execute("DROP TABLE rollup_new;")
+    return days
+
+
+def outdated(cur):
+    """True if the rollup has rows from before its promo_id columns, which a full recompute fills."""
+    cur.execute("SELECT EXISTS (SELECT 1 FROM daily_store_sku_sales WHERE promo_id_units IS NULL);")
+    return cur.fetchone()[0]
+
+
+def merge_rows(cur, table):
+    # Bring table's rows of the days in rollup_days in line with their
+    # recomputed rows, writing only those that differ; returns how many
+    key, columns, query = ROLLUP_ROWS[table]
+    names = ', '.join(columns)
+    cur.execute(f"CREATE TEMP TABLE rollup_rows ({names}) AS {query};")
+    cur.execute(f"""
+        DELETE FROM {table} r USING rollup_days d
+        WHERE r.store_id = d.store_id AND r.sale_date = d.sale_date
+          AND NOT EXISTS (
+              SELECT 1 FROM rollup_rows n WHERE {' AND '.join(f"n.{c} = r.{c}" for c in key)}
+          );
+    """)
+    changed = cur.rowcount
+    values = [c for c in columns if c not in key]
+    cur.execute(f"""
+        INSERT INTO {table} ({names}) SELECT {names} FROM rollup_rows
+        ON CONFLICT ({', '.join(key)}) DO UPDATE
+        SET {', '.join(f"{c} = EXCLUDED.{c}" for c in values)}
+        WHERE ({', '.join(f"{table}.{c}" for c in values)})
+              IS DISTINCT FROM ({', '.join(f"EXCLUDED.{c}" for c in values)});
+    """)
+    changed += cur.rowcount
+    cur.execute("DROP TABLE rollup_rows;")
+    return changed
+
+
+def refresh_rollup(cur, days=None):
+    """Recompute the rollup rows of days, or of every day in Sale when days is None.
+
+    Rows whose recomputed values are the same are left as they are. Runs in
+    the caller's transaction. Returns the number of store days recomputed
+    and {table: rows inserted, updated or deleted} of ROLLUP_TABLES.
+    """
+    cur.execute(DAYS_DDL)
+    if days is None:
+        cur.execute(ALL_DAYS_SQL)
+    elif days:
+        buf = io.StringIO(''.join(f"{store_id},{day.isoformat()}\n" for store_id, day in sorted(days)))
+        cur.copy_expert("COPY rollup_days (store_id, sale_date) FROM STDIN WITH (FORMAT csv)", buf)
+    cur.execute("SELECT count(*) FROM rollup_days;")
+    count, = cur.fetchone()
+    changed = {table: merge_rows(cur, table) if count else 0 for table in ROLLUP_TABLES}
+    cur.execute("DROP TABLE rollup_days;")
+    return count, changed
@@ -0,0 +1,126 @@
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+
+CREATE_TABLE_RE = re.compile(
+    r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\((.*?)\n\s*\)(?:\s*PARTITION\s+BY\s+[^;]*)?;",
+    re.IGNORECASE | re.DOTALL,
+)
+REFERENCES_RE = re.compile(r"REFERENCES\s+(\w+)", re.IGNORECASE)
+
+# Loads that touch Inventory through the row triggers. They must wait for the
+# Inventory load, and for Sale, which the triggers read the store from (there
+# is no FK to express that in the partitioned layout), and while the triggers
+# fire neither two of them nor two slices of one of them may run at the same
+# time, or their UPDATEs on hot Inventory rows can deadlock. Loads that apply
+# the inventory change set-based instead (--bulk-inventory, --fast-load) lock
+# the rows in key order and need no exclusive group.
+TRIGGER_DEPENDENCIES = {
+    'saleitem': {'inventory', 'sale'},
+    'productreturn': {'inventory', 'sale'},
+    'deliveryitem': {'inventory'},
+}
+EXCLUSIVE_GROUPS = [
+    {'saleitem', 'productreturn', 'deliveryitem'},
+]
+
+
+def fk_graph(ddl):
+    """Map each table in the CREATE TABLE statements of ddl to the tables it references.
+
+    Names are lower-cased. Only REFERENCES clauses inside CREATE TABLE bodies
+    are read, so the deferred Store -> Employee manager constraint that
+    abc_schema.sql adds with ALTER TABLE does not create a cycle.
+    """
+    graph = {}
+    for name, body in CREATE_TABLE_RE.findall(ddl):
+        table = name.lower()
+        parents = {ref.lower() for ref in REFERENCES_RE.findall(body)}
+        parents.discard(table)
+        graph[table] = parents | TRIGGER_DEPENDENCIES.get(table, set())
+    return graph
+
+
+def split_frame(df, key, parts):
+    # Partition by a hash of the conflict key so slices never share a key
+    if parts <= 1 or key is None or len(df) < parts:
+        return [df]
+    bucket = pd.util.hash_pandas_object(df[list(key)], index=False) % parts
+    return [df[bucket == i] for i in range(parts)]
+
+
+def overridden_caps(caps, exclusive=EXCLUSIVE_GROUPS):
+    """Tables of caps given more than one slice that run_dag loads one at a time, being in an exclusive group."""
+    return [table for table, n in caps.items()
+            if n > 1 and any(table.lower() in group for group in exclusive)]
+
+
+def run_dag(loads, graph, pool, load_slice, workers, caps=None, exclusive=EXCLUSIVE_GROUPS):
+    """Run table loads concurrently in foreign-key order.
+
+    loads is a list of (table, df, conflict) entries. A table starts once every
+    parent present in loads has finished; parents not in loads are assumed to
+    be loaded already. caps maps a table name to how many slices of it may be
+    loaded at the same time (default 1); tables in an exclusive group are never
+    split, whatever their cap (see overridden_caps()), and never overlap with
+    another member of their group.
+    load_slice(conn, table, df, conflict) loads one slice on a pooled
+    connection and returns the rows inserted. Returns {table: rows inserted}.
+    """
+    caps = {t.lower(): n for t, n in (caps or {}).items()}
+    for name in overridden_caps(caps, exclusive):
+        caps[name] = 1
+    present = {table.lower(): table for table, _, _ in loads}
+    waiting = {
+        table: {p for p in graph.get(table.lower(), set()) if p in present and p != table.lower()}
+        for table, _, _ in loads
+    }
+    slices = {
+        table: split_frame(df, key, caps.get(table.lower(), 1))
+        for table, df, key in loads
+    }
+    keys = {table: key for table, _, key in loads}
+
+    inserted = {table: 0 for table, _, _ in loads}
+    remaining = {table: len(parts) for table, parts in slices.items()}
+    finished, running = set(), set()
+
+    def exclusive_busy(table):
+        name = table.lower()
+        return any(
+            name in group and any(r.lower() in group for r in running)
+            for group in exclusive
+        )
+
+    def run(table, df):
+        conn = pool.getconn()
+        try:
+            return load_slice(conn, table, df, keys[table])
+        finally:
+            pool.putconn(conn)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        while waiting or futures:
+            for table in list(waiting):
+                if waiting[table] <= finished and not exclusive_busy(table):
+                    del waiting[table]
+                    running.add(table)
+                    for part in slices[table]:
+                        futures[executor.submit(run, table, part)] = table
+
+            if not futures:
+                raise RuntimeError(f"Cyclic table dependencies: {sorted(waiting)}")
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                table = futures.pop(future)
+                inserted[table] += future.result()
+                remaining[table] -= 1
+                if remaining[table] == 0:
+                    running.discard(table)
+                    finished.add(table.lower())
+
+    return inserted
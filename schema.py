@@ -0,0 +1,412 @@
+# DDL run by ETL_Python.py: every table of the ABC Foodmart schema plus the
+# inventory triggers. Kept in sync with abc_schema.sql.
+SCHEMA_DDL = """
+                
+    CREATE TABLE IF NOT EXISTS Store (
+        store_id SERIAL PRIMARY KEY,
+        address VARCHAR(255) NOT NULL,
+        city VARCHAR(100) NOT NULL,
+        state VARCHAR(50) NOT NULL,
+        zipcode VARCHAR(10) NOT NULL,
+        operating_hours VARCHAR(100) NOT NULL,
+        manager_id INTEGER UNIQUE
+    );
+
+
+    CREATE TABLE IF NOT EXISTS Department (
+        department_id SERIAL PRIMARY KEY,
+        department_name VARCHAR(100) NOT NULL
+    );
+
+
+    CREATE TABLE IF NOT EXISTS Employee (
+        employee_id SERIAL PRIMARY KEY,
+        first_name VARCHAR(100) NOT NULL,
+        last_name VARCHAR(100) NOT NULL,
+        email VARCHAR(100) NOT NULL UNIQUE,
+        phone VARCHAR(20) NOT NULL,
+        role VARCHAR(50) NOT NULL,
+        store_id INTEGER REFERENCES Store(store_id) ON DELETE CASCADE,
+        department_id INTEGER REFERENCES Department(department_id)
+    );
+
+
+
+    CREATE TABLE IF NOT EXISTS ShiftSchedule (
+        schedule_id SERIAL PRIMARY KEY,
+        employee_id INTEGER REFERENCES Employee(employee_id) ON DELETE CASCADE,
+        shift_date DATE NOT NULL,
+        start_time TIME NOT NULL,
+        end_time TIME NOT NULL
+    );
+
+
+
+    CREATE TABLE IF NOT EXISTS Category (
+        category_id SERIAL PRIMARY KEY,
+        category_name VARCHAR(100) NOT NULL
+    );
+
+
+    CREATE TABLE IF NOT EXISTS Product (
+        sku varchar(20) PRIMARY KEY,
+        product_name VARCHAR(150) NOT NULL,
+        brand VARCHAR(100) NOT NULL,
+        shelf_location VARCHAR(50) NOT NULL,
+        category_id INTEGER REFERENCES Category(category_id)
+    );
+
+
+    CREATE TABLE IF NOT EXISTS ProductPricing (
+        sku varchar(20) REFERENCES Product(sku),
+        price_date DATE NOT NULL,
+        regular_price NUMERIC(10,2) NOT NULL,
+        promo_price NUMERIC(10,2),
+        PRIMARY KEY (sku, price_date)
+    );
+
+
+    CREATE TABLE IF NOT EXISTS Inventory (
+        inventory_id SERIAL PRIMARY KEY,
+        store_id INTEGER REFERENCES Store(store_id),
+        sku varchar(20) REFERENCES Product(sku),
+        quantity_on_hand INTEGER NOT NULL,
+        reorder_threshold INTEGER NOT NULL,
+        restock_status VARCHAR(20) CHECK (restock_status IN ('Restock Needed', 'In Stock')) NOT NULL,
+        UNIQUE (store_id, sku)
+    );
+
+
+    CREATE TABLE IF NOT EXISTS Vendor (
+    vendor_id SERIAL PRIMARY KEY,
+    vendor_name VARCHAR(100) NOT NULL,
+    vendor_tier VARCHAR(10) NOT NULL
+    );
+
+
+    CREATE TABLE IF NOT EXISTS VendorProduct (
+        vendor_id INTEGER REFERENCES Vendor(vendor_id) ON DELETE CASCADE,
+        sku varchar(20) REFERENCES Product(sku),
+        PRIMARY KEY (vendor_id, sku)
+    );
+
+
+    CREATE TABLE IF NOT EXISTS Delivery (
+        delivery_id SERIAL PRIMARY KEY,
+        vendor_id INTEGER REFERENCES Vendor(vendor_id),
+        store_id INTEGER REFERENCES Store(store_id),
+        delivery_date DATE NOT NULL,
+        status VARCHAR(20) CHECK (status IN ('Completed', 'Delayed')) NOT NULL
+    );
+
+
+    CREATE TABLE IF NOT EXISTS DeliveryItem (
+        delivery_id INTEGER REFERENCES Delivery(delivery_id) ON DELETE CASCADE,
+        sku varchar(20) REFERENCES Product(sku),
+        quantity INTEGER NOT NULL,
+        PRIMARY KEY (delivery_id, sku)
+    );
+
+
+
+    CREATE TABLE IF NOT EXISTS Promotion (
+        promo_id SERIAL PRIMARY KEY,
+        sku varchar(20) REFERENCES Product(sku),
+        start_date DATE,
+        end_date DATE,
+        discount_amount NUMERIC
+    );
+
+
+    CREATE TABLE IF NOT EXISTS Sale (
+        sale_id SERIAL PRIMARY KEY,
+        store_id INTEGER REFERENCES Store(store_id),
+        sale_datetime TIMESTAMP,
+        payment_type VARCHAR(20) CHECK (payment_type IN ('Cash', 'Credit Card', 'Mobile'))
+    );
+
+                
+    CREATE TABLE IF NOT EXISTS SaleItem (
+        sale_id INTEGER REFERENCES Sale(sale_id) ON DELETE CASCADE,
+        sku varchar(20) REFERENCES Product(sku),
+        quantity_sold INTEGER NOT NULL,
+        unit_price NUMERIC(10,2) NOT NULL,
+        promo_applied BOOLEAN DEFAULT FALSE,
+        promo_discount NUMERIC(10,2),
+        promo_id INTEGER REFERENCES Promotion(promo_id),
+        PRIMARY KEY (sale_id, sku)
+    );
+
+
+
+    CREATE TABLE IF NOT EXISTS Expense (
+        expense_id SERIAL PRIMARY KEY,
+        store_id INTEGER REFERENCES Store(store_id),
+        expense_date DATE NOT NULL,
+        expense_category VARCHAR(50) CHECK (expense_category IN ('Wages', 'Utilities', 'Spoilage', 'Other')) NOT NULL,
+        amount NUMERIC(12,2) NOT NULL
+    );
+
+
+    CREATE TABLE IF NOT EXISTS ReturnReason (
+        reason_code VARCHAR(10) PRIMARY KEY,
+        description TEXT
+    );
+
+
+    CREATE TABLE IF NOT EXISTS ProductReturn (
+        return_id SERIAL PRIMARY KEY,
+        sale_id INTEGER REFERENCES Sale(sale_id),
+        sku varchar(20) REFERENCES Product(sku),
+        return_date DATE NOT NULL,
+        quantity_returned INTEGER NOT NULL,
+        reason_code VARCHAR(10) REFERENCES ReturnReason(reason_code)
+    );
+
+DROP TRIGGER IF EXISTS trg_update_restock_status ON Inventory;
+DROP FUNCTION IF EXISTS update_restock_status() CASCADE;
+
+    CREATE OR REPLACE FUNCTION update_restock_status()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF NEW.quantity_on_hand <= NEW.reorder_threshold THEN
+            NEW.restock_status := 'Restock Needed';
+        ELSE
+            NEW.restock_status := 'In Stock';
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+
+            
+
+    CREATE TRIGGER trg_update_restock_status
+    BEFORE INSERT OR UPDATE ON Inventory
+    FOR EACH ROW
+    EXECUTE FUNCTION update_restock_status();
+
+
+DROP TRIGGER IF EXISTS trg_deduct_inventory ON SaleItem;
+DROP FUNCTION IF EXISTS deduct_inventory_after_sale() CASCADE;
+
+    CREATE OR REPLACE FUNCTION deduct_inventory_after_sale()
+    RETURNS TRIGGER AS $$
+    BEGIN
+    UPDATE Inventory
+    SET quantity_on_hand = quantity_on_hand - NEW.quantity_sold
+    WHERE store_id = (SELECT store_id FROM Sale WHERE sale_id = NEW.sale_id)
+        AND sku = NEW.sku;
+    RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+
+
+    CREATE TRIGGER trg_deduct_inventory
+    AFTER INSERT ON SaleItem
+    FOR EACH ROW
+    EXECUTE FUNCTION deduct_inventory_after_sale();
+
+
+DROP TRIGGER IF EXISTS trg_add_inventory_on_return ON ProductReturn;
+DROP FUNCTION IF EXISTS add_inventory_on_return() CASCADE;
+
+    CREATE OR REPLACE FUNCTION  add_inventory_on_return()
+    RETURNS TRIGGER AS $$
+    BEGIN
+    UPDATE Inventory
+    SET quantity_on_hand = quantity_on_hand + NEW.quantity_returned
+    WHERE store_id = (SELECT store_id FROM Sale WHERE sale_id = NEW.sale_id)
+        AND sku = NEW.sku;
+    RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+
+
+    CREATE TRIGGER trg_add_inventory_on_return
+    AFTER INSERT ON ProductReturn
+    FOR EACH ROW
+    EXECUTE FUNCTION add_inventory_on_return();
+
+
+DROP TRIGGER IF EXISTS trg_add_inventory_on_delivery ON DeliveryItem;
+DROP FUNCTION IF EXISTS add_inventory_on_delivery() CASCADE;
+            
+-- Trigger Function: Add inventory when delivery is received
+CREATE OR REPLACE FUNCTION add_inventory_on_delivery()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Check if the Inventory record already exists
+    IF EXISTS (
+        SELECT 1 FROM Inventory 
+        WHERE store_id = (SELECT store_id FROM Delivery WHERE delivery_id = NEW.delivery_id)
+          AND sku = NEW.sku
+    ) THEN
+        -- If exists, increase quantity_on_hand
+        UPDATE Inventory
+        SET quantity_on_hand = quantity_on_hand + NEW.quantity
+        WHERE store_id = (SELECT store_id FROM Delivery WHERE delivery_id = NEW.delivery_id)
+          AND sku = NEW.sku;
+    ELSE
+        -- If not exists, insert a new record (default reorder_threshold = 10)
+        INSERT INTO Inventory (store_id, sku, quantity_on_hand, reorder_threshold, restock_status)
+        VALUES (
+            (SELECT store_id FROM Delivery WHERE delivery_id = NEW.delivery_id),
+            NEW.sku,
+            NEW.quantity,
+            10,  -- Default threshold, adjust as needed
+            'In Stock'
+        );
+    END IF;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger: run after a DeliveryItem is inserted
+CREATE TRIGGER trg_add_inventory_on_delivery
+AFTER INSERT ON DeliveryItem
+FOR EACH ROW
+EXECUTE FUNCTION add_inventory_on_delivery();
+
+
+-- Statement-level alternatives to the three inventory triggers above.
+-- They read the whole inserted batch from a transition table, net it per
+-- (store_id, sku) and touch each Inventory row once, recomputing
+-- restock_status in the same statement. They are created DISABLED; to switch
+-- a table over, disable its row trigger and enable the _stmt one, e.g.
+--   ALTER TABLE SaleItem DISABLE TRIGGER trg_deduct_inventory,
+--                        ENABLE TRIGGER trg_deduct_inventory_stmt;
+DROP TRIGGER IF EXISTS trg_deduct_inventory_stmt ON SaleItem;
+DROP FUNCTION IF EXISTS deduct_inventory_after_sale_stmt() CASCADE;
+
+CREATE OR REPLACE FUNCTION deduct_inventory_after_sale_stmt()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE Inventory i
+    SET quantity_on_hand = i.quantity_on_hand - d.qty,
+        restock_status = CASE
+            WHEN i.quantity_on_hand - d.qty <= i.reorder_threshold THEN 'Restock Needed'
+            ELSE 'In Stock'
+        END
+    FROM (
+        SELECT s.store_id, n.sku, SUM(n.quantity_sold) AS qty
+        FROM new_items n
+        JOIN Sale s ON s.sale_id = n.sale_id
+        GROUP BY s.store_id, n.sku
+    ) d
+    WHERE i.store_id = d.store_id
+      AND i.sku = d.sku;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_deduct_inventory_stmt
+AFTER INSERT ON SaleItem
+REFERENCING NEW TABLE AS new_items
+FOR EACH STATEMENT
+EXECUTE FUNCTION deduct_inventory_after_sale_stmt();
+
+ALTER TABLE SaleItem DISABLE TRIGGER trg_deduct_inventory_stmt;
+
+
+DROP TRIGGER IF EXISTS trg_add_inventory_on_return_stmt ON ProductReturn;
+DROP FUNCTION IF EXISTS add_inventory_on_return_stmt() CASCADE;
+
+CREATE OR REPLACE FUNCTION add_inventory_on_return_stmt()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE Inventory i
+    SET quantity_on_hand = i.quantity_on_hand + d.qty,
+        restock_status = CASE
+            WHEN i.quantity_on_hand + d.qty <= i.reorder_threshold THEN 'Restock Needed'
+            ELSE 'In Stock'
+        END
+    FROM (
+        SELECT s.store_id, n.sku, SUM(n.quantity_returned) AS qty
+        FROM new_returns n
+        JOIN Sale s ON s.sale_id = n.sale_id
+        GROUP BY s.store_id, n.sku
+    ) d
+    WHERE i.store_id = d.store_id
+      AND i.sku = d.sku;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_add_inventory_on_return_stmt
+AFTER INSERT ON ProductReturn
+REFERENCING NEW TABLE AS new_returns
+FOR EACH STATEMENT
+EXECUTE FUNCTION add_inventory_on_return_stmt();
+
+ALTER TABLE ProductReturn DISABLE TRIGGER trg_add_inventory_on_return_stmt;
+
+
+DROP TRIGGER IF EXISTS trg_add_inventory_on_delivery_stmt ON DeliveryItem;
+DROP FUNCTION IF EXISTS add_inventory_on_delivery_stmt() CASCADE;
+
+-- Upserts the batch: existing rows are topped up, missing rows are created
+-- with the default reorder_threshold of 10
+CREATE OR REPLACE FUNCTION add_inventory_on_delivery_stmt()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO Inventory (store_id, sku, quantity_on_hand, reorder_threshold, restock_status)
+    SELECT
+        d.store_id,
+        n.sku,
+        SUM(n.quantity),
+        10,
+        CASE WHEN SUM(n.quantity) <= 10 THEN 'Restock Needed' ELSE 'In Stock' END
+    FROM new_deliveries n
+    JOIN Delivery d ON d.delivery_id = n.delivery_id
+    GROUP BY d.store_id, n.sku
+    ON CONFLICT (store_id, sku) DO UPDATE
+    SET quantity_on_hand = Inventory.quantity_on_hand + EXCLUDED.quantity_on_hand,
+        restock_status = CASE
+            WHEN Inventory.quantity_on_hand + EXCLUDED.quantity_on_hand <= Inventory.reorder_threshold
+                THEN 'Restock Needed'
+            ELSE 'In Stock'
+        END;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_add_inventory_on_delivery_stmt
+AFTER INSERT ON DeliveryItem
+REFERENCING NEW TABLE AS new_deliveries
+FOR EACH STATEMENT
+EXECUTE FUNCTION add_inventory_on_delivery_stmt();
+
+ALTER TABLE DeliveryItem DISABLE TRIGGER trg_add_inventory_on_delivery_stmt;
+
+            
+"""
+
+
+# Secondary indexes: one B-tree per foreign key column that no primary key or
+# unique constraint already leads with, plus the date columns the analytical
+# queries filter on. Sale rows arrive roughly in sale_datetime order, so a
+# BRIN index covers all-store date ranges at a fraction of a B-tree's size.
+INDEX_DDL = """
+    CREATE INDEX IF NOT EXISTS idx_employee_store_id ON Employee (store_id);
+    CREATE INDEX IF NOT EXISTS idx_employee_department_id ON Employee (department_id);
+    CREATE INDEX IF NOT EXISTS idx_shiftschedule_employee_id ON ShiftSchedule (employee_id);
+    CREATE INDEX IF NOT EXISTS idx_shiftschedule_shift_date ON ShiftSchedule (shift_date);
+    CREATE INDEX IF NOT EXISTS idx_product_category_id ON Product (category_id);
+    CREATE INDEX IF NOT EXISTS idx_inventory_sku ON Inventory (sku);
+    CREATE INDEX IF NOT EXISTS idx_vendorproduct_sku ON VendorProduct (sku);
+    CREATE INDEX IF NOT EXISTS idx_delivery_vendor_id ON Delivery (vendor_id);
+    CREATE INDEX IF NOT EXISTS idx_delivery_store_id ON Delivery (store_id);
+    CREATE INDEX IF NOT EXISTS idx_delivery_delivery_date ON Delivery (delivery_date);
+    CREATE INDEX IF NOT EXISTS idx_deliveryitem_sku ON DeliveryItem (sku);
+    CREATE INDEX IF NOT EXISTS idx_promotion_sku ON Promotion (sku);
+    CREATE INDEX IF NOT EXISTS idx_sale_store_id_sale_datetime ON Sale (store_id, sale_datetime);
+    CREATE INDEX IF NOT EXISTS idx_sale_sale_datetime_brin ON Sale USING brin (sale_datetime);
+    CREATE INDEX IF NOT EXISTS idx_saleitem_sku ON SaleItem (sku);
+    CREATE INDEX IF NOT EXISTS idx_saleitem_promo_id ON SaleItem (promo_id);
+    CREATE INDEX IF NOT EXISTS idx_expense_store_id_expense_date ON Expense (store_id, expense_date);
+    CREATE INDEX IF NOT EXISTS idx_productreturn_sale_id_sku ON ProductReturn (sale_id, sku);
+    CREATE INDEX IF NOT EXISTS idx_productreturn_sku ON ProductReturn (sku);
+    CREATE INDEX IF NOT EXISTS idx_productreturn_reason_code ON ProductReturn (reason_code);
+    CREATE INDEX IF NOT EXISTS idx_productreturn_return_date ON ProductReturn (return_date);
+"""
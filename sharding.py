@@ -0,0 +1,304 @@
+"""Store-sharded deployment: one database per group of stores.
+
+Every store-scoped row lives on exactly one shard, the one its store maps
+to; the tables with no store (the catalogue, vendors, promotions, return
+reasons, departments) are copied to every shard, so each shard joins and
+enforces its foreign keys locally. The shard map is an INI file with one
+section per shard, in the style of db.resolve_dsn's config file:
+
+    [north]
+    dsn = host=localhost port=5433 dbname=ABCFoodmart user=postgres
+    stores = 1, 2
+
+    [south]
+    host = localhost
+    port = 5434
+    dbname = ABCFoodmart
+    user = postgres
+    stores = 3
+
+A store no section lists goes to shard store_id % (number of shards), in
+file order, and a row with no store to the first shard.
+
+Loading: ETL_Python.py --shard-map shards.ini starts one ETL process per
+shard, each with --shard NAME. Every process reads all the master files
+and keeps the rows ShardRouter gives its shard: rows of Store, Inventory,
+Sale, Employee, Delivery and Expense by their store_id, and sale lines,
+returns, shifts and delivery lines by the store of their parent row, so a
+child never lands apart from its parent. Each shard then runs the usual
+rollup, manager update and materialized views on its own rows.
+
+Querying: the per-store analytical queries (1, 2, 3, 5 and 9) are run on
+every shard at once by ScatterGather, through one QueryRunner per shard
+(so results are cached per shard against that shard's data version), and
+the parts are merged in the query's own order. Query 2's top-5 categories
+are re-ranked over the merged rows.
+
+    python sharding.py 2 --shard-map shards.ini --start-date 2023-08-01 --end-date 2023-08-31
+"""
+import argparse
+import configparser
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from query_pack import QUERY_PACK
+from query_runner import QueryRunner, ResultCache
+
+
+# Child tables placed with their parent row: table -> (parent, key column)
+PARENTS = {
+    'SaleItem': ('Sale', 'sale_id'),
+    'ProductReturn': ('Sale', 'sale_id'),
+    'ShiftSchedule': ('Employee', 'employee_id'),
+    'DeliveryItem': ('Delivery', 'delivery_id'),
+}
+
+# Tables placed by their own store_id column, and the key of those that
+# are parents above
+STORE_TABLES = {
+    'Store': None,
+    'Inventory': None,
+    'Sale': 'sale_id',
+    'Employee': 'employee_id',
+    'Delivery': 'delivery_id',
+    'Expense': None,
+}
+
+# Query ORDER BY clauses as (column, ascending) pairs, NULLs last
+MERGE_ORDER = {
+    1: [('store_id', True), ('sale_date', True)],
+    2: [('store_id', True), ('month_start', False), ('category_rank', True), ('category_name', True)],
+    3: [('store_id', True), ('sale_date', True)],
+    5: [('shift_date', True), ('store_id', True)],
+    9: [('on_time_rate', False), ('total_deliveries', False), ('vendor_name', True)],
+}
+
+# Top-N queries: (rank column, partition columns, value ranked descending, N)
+TOP_N = {
+    2: ('category_rank', ['store_id', 'month_start'], 'net_after_returns', 5),
+}
+
+
+class ShardMap:
+    """Shard names, their DSNs and the stores each one holds."""
+
+    def __init__(self, dsns, stores):
+        self.dsns = dsns
+        self.names = list(dsns)
+        self.stores = stores
+
+    @classmethod
+    def read(cls, path):
+        if not os.path.exists(path):
+            raise ValueError(f"shard map {path} does not exist")
+        config = configparser.ConfigParser()
+        config.read(path)
+        dsns, stores = {}, {}
+        for name in config.sections():
+            section = dict(config[name])
+            listed = section.pop('stores', '')
+            dsns[name] = section['dsn'] if 'dsn' in section else ' '.join(
+                f"{key}={value}" for key, value in section.items()
+            )
+            for store in (int(s) for s in listed.replace(',', ' ').split()):
+                if store in stores:
+                    raise ValueError(f"store {store} is listed for both {stores[store]} and {name}")
+                stores[store] = name
+        if not dsns:
+            raise ValueError(f"shard map {path} has no shards")
+        return cls(dsns, stores)
+
+    def shard_of(self, store_id):
+        if store_id in self.stores:
+            return self.stores[store_id]
+        return self.names[store_id % len(self.names)]
+
+    def positions(self, store_ids):
+        """Position in self.names of the shard of each store_id (an array; NaN or NA for no store)."""
+        stores = pd.Series(store_ids).astype('Int64')
+        listed = {store: self.names.index(name) for store, name in self.stores.items()}
+        positions = stores.map(listed).astype('Int64').fillna(stores % len(self.names))
+        return positions.fillna(0).to_numpy(dtype=np.int64)
+
+
+class ShardRouter:
+    """Picks the rows of each table frame that belong on one shard.
+
+    The store of a parent row (a sale, employee or delivery) is remembered
+    the first time it is seen, so its lines follow it and a key repeated in
+    a later chunk stays where it was first sent, as ON CONFLICT would keep
+    it. A child whose parent came from an earlier run goes by the store of
+    its own source row.
+    """
+
+    def __init__(self, shard_map, shard):
+        self.shard_map = shard_map
+        self.position = shard_map.names.index(shard)
+        self.owners = {}
+
+    def owner_stores(self, parent, keys):
+        # Stores recorded for keys of parent, NA where unknown
+        owners = self.owners.get(parent)
+        if owners is None:
+            return pd.Series(pd.NA, index=keys.index, dtype='Int64')
+        found = owners.index.get_indexer(keys.astype('Int64'))
+        stores = owners.to_numpy(dtype='float64', na_value=np.nan)
+        return pd.Series(np.where(found >= 0, stores[found], np.nan), index=keys.index).astype('Int64')
+
+    def remember(self, parent, keys, stores):
+        new = pd.Series(stores.to_numpy(), index=pd.Index(keys.astype('Int64').to_numpy()), dtype='Int64')
+        new = new[new.index.notna() & ~new.index.duplicated()]
+        owners = self.owners.get(parent)
+        if owners is not None:
+            new = pd.concat([owners, new[~new.index.isin(owners.index)]])
+        self.owners[parent] = new
+
+    def route(self, table, frame, source):
+        """Rows of frame for this shard; source is the master frame it was projected from."""
+        if table in PARENTS:
+            parent, column = PARENTS[table]
+            stores = self.owner_stores(parent, frame[column])
+            # Fall back to the store of the source row each line came from
+            stores = stores.fillna(source['store_id'].loc[frame.index].astype('Int64'))
+        elif table in STORE_TABLES:
+            stores = frame['store_id'].astype('Int64')
+            key = STORE_TABLES[table]
+            if key:
+                stores = self.owner_stores(table, frame[key]).fillna(stores)
+                self.remember(table, frame[key], stores)
+        else:
+            # Replicated to every shard
+            return frame
+        return frame[self.shard_map.positions(stores.to_numpy()) == self.position]
+
+
+def shard_path(path, shard):
+    # quarantine.csv -> quarantine.north.csv, for files each shard process writes
+    root, ext = os.path.splitext(path)
+    return f"{root}.{shard}{ext}"
+
+
+def run_shards(shard_map, command):
+    """Run command once per shard with --shard NAME, all at once; returns the exit status.
+
+    Each process's output is printed when it ends, so the logs of the
+    shards are not interleaved.
+    """
+    logs = {name: tempfile.TemporaryFile() for name in shard_map.names}
+    processes = {
+        name: subprocess.Popen(command + ['--shard', name], stdout=logs[name], stderr=subprocess.STDOUT)
+        for name in shard_map.names
+    }
+    failed = []
+    for name, process in processes.items():
+        status = process.wait()
+        logs[name].seek(0)
+        print(f"===== shard {name} =====")
+        print(logs[name].read().decode(errors='replace'), end='')
+        logs[name].close()
+        if status:
+            failed.append(name)
+    if failed:
+        print(f"❌ ETL failed on shards: {', '.join(failed)}")
+        return 1
+    print(f"✅ ETL finished on {len(processes)} shards.")
+    return 0
+
+
+class ScatterGather:
+    """Store-scoped pack queries run on every shard in parallel and merged."""
+
+    def __init__(self, shard_map, pack=QUERY_PACK, rollup=False, cache_dir=None):
+        self.shard_map = shard_map
+        self.connections = {name: psycopg2.connect(dsn) for name, dsn in shard_map.dsns.items()}
+        self.runners = {
+            name: QueryRunner(conn, pack, rollup,
+                              ResultCache(os.path.join(cache_dir, name) if cache_dir else None))
+            for name, conn in self.connections.items()
+        }
+        self.executor = ThreadPoolExecutor(len(self.runners))
+
+    def run(self, number, **params):
+        """Merged DataFrame of query number over the shards (over one shard if store_id is given)."""
+        if number not in MERGE_ORDER:
+            raise ValueError(f"query {number} is not a per-store query that can be run across shards")
+        shards = self.shard_map.names
+        if params.get('store_id') is not None:
+            shards = [self.shard_map.shard_of(params['store_id'])]
+        parts = list(self.executor.map(lambda name: self.runners[name].run(number, **params), shards))
+        return merge(number, parts)
+
+    def close(self):
+        self.executor.shutdown()
+        for conn in self.connections.values():
+            conn.close()
+
+
+def merge(number, parts):
+    """The per-shard results of query number as one result in the query's order.
+
+    A top-N query's rank is computed again over all rows, as RANK() does,
+    and rows past N dropped: a shard only knows its own rows.
+    """
+    merged = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].copy()
+    if number in TOP_N and len(merged):
+        rank, partition, value, limit = TOP_N[number]
+        values = pd.to_numeric(merged[value])
+        merged[rank] = values.groupby([merged[c] for c in partition]).rank(
+            method='min', ascending=False, na_option='top'
+        ).astype('int64')
+        merged = merged[merged[rank] <= limit]
+    order = MERGE_ORDER[number]
+    merged = merged.sort_values([c for c, _ in order], ascending=[a for _, a in order],
+                                na_position='last', kind='stable')
+    return merged.reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a per-store pack query on every shard and merge the results.")
+    parser.add_argument('query', type=int, choices=sorted(MERGE_ORDER), help="number of the query in the pack")
+    parser.add_argument('--shard-map', required=True, help="INI file of the shards (see sharding.py)")
+    parser.add_argument('--pack', default=QUERY_PACK, help="query pack (zip or directory)")
+    parser.add_argument('--rollup', action='store_true',
+                        help="use the rollup version of the query where there is one")
+    parser.add_argument('--start-date', default=None, help="first day of the window (YYYY-MM-DD)")
+    parser.add_argument('--end-date', default=None, help="last day of the window (YYYY-MM-DD)")
+    parser.add_argument('--store-id', type=int, default=None, help="run on the store's shard only, for one store")
+    parser.add_argument('--cache-dir', default=None,
+                        help="keep results in this directory between runs, one subdirectory per shard")
+    parser.add_argument('--output', default=None, help="write the result to this CSV file")
+    args = parser.parse_args()
+
+    try:
+        shard_map = ShardMap.read(args.shard_map)
+    except ValueError as e:
+        parser.error(str(e))
+    scatter = ScatterGather(shard_map, args.pack, args.rollup, args.cache_dir)
+    params = {'start_date': args.start_date, 'end_date': args.end_date, 'store_id': args.store_id}
+    try:
+        started = time.perf_counter()
+        result = scatter.run(args.query, **params)
+        shards = [shard_map.shard_of(args.store_id)] if args.store_id is not None else shard_map.names
+        print(f"✅ {len(result)} rows of query {args.query} from shards {', '.join(shards)} "
+              f"in {(time.perf_counter() - started) * 1000:.1f} ms.")
+    except (ValueError, psycopg2.Error) as e:
+        print(f"❌ Error running query {args.query}: {e}")
+        raise SystemExit(1)
+    finally:
+        scatter.close()
+
+    if args.output:
+        result.to_csv(args.output, index=False)
+    else:
+        print(result.to_string(index=False, max_rows=40))
+
+
+if __name__ == '__main__':
+    main()
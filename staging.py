@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from transforms import SOURCE_DTYPES, TEXT, read_options
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:
+    pa = None
+
+
+HASH_BLOCK = 1 << 20
+
+# CSV rows parsed and written per record batch while a cache file is built
+BUILD_CHUNK_ROWS = 100_000
+
+# Bumped whenever the cached layout changes; SOURCE_DTYPES is part of the key too
+CACHE_FORMAT = 2
+
+# Arrow type each source dtype is stored as. Categorical columns are stored
+# as plain strings: every batch would have its own dictionary, which an
+# Arrow file cannot hold, so they are made categorical again when read
+ARROW_TYPES = {'Int32': 'int32', 'float64': 'float64', 'boolean': 'bool', 'category': 'string', TEXT: 'string'}
+PANDAS_TYPES = {'int32': pd.Int32Dtype(), 'bool': pd.BooleanDtype()}
+
+
+def arrow_schema(path):
+    return pa.schema([(column, ARROW_TYPES[dtype]) for column, dtype in SOURCE_DTYPES[path].items()])
+
+
+def to_frame(table, path):
+    # The frame read_csv with SOURCE_DTYPES gives for the rows of table
+    df = table.to_pandas(types_mapper=lambda t: PANDAS_TYPES.get(str(t)))
+    return df.astype({column: dtype for column, dtype in SOURCE_DTYPES[path].items()
+                      if dtype in ('category', TEXT)})
+
+
+def content_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StagingCache:
+    """Typed columnar copies of the master CSVs, parsed once per content.
+
+    Each master file is converted with SOURCE_DTYPES into an uncompressed
+    Arrow IPC (Feather v2) file, which later runs memory-map and read
+    column by column, so startup skips CSV parsing and type inference and
+    only touches the columns the projections use. A file is built in
+    batches of BUILD_CHUNK_ROWS rows, so building one takes no more memory
+    than reading the CSV in chunks. A manifest records the
+    size, mtime and content hash each cached file was built from: an
+    unchanged size and mtime reuses the cache without reading the CSV, and
+    a touched file whose hash still matches is reused after one hash pass.
+    """
+
+    def __init__(self, directory):
+        if pa is None:
+            raise ImportError("the staging cache needs pyarrow")
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {}
+        self.dtypes_stamp = hashlib.blake2b(
+            json.dumps([CACHE_FORMAT, SOURCE_DTYPES], sort_keys=True).encode(), digest_size=8
+        ).hexdigest()
+
+    def save_manifest(self):
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def cached_file(self, path):
+        # Path of an up-to-date columnar copy of path, building it if needed
+        stat = os.stat(path)
+        entry = self.manifest.get(path)
+        if entry and entry['dtypes'] == self.dtypes_stamp and os.path.exists(entry['file']):
+            if entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                return entry['file']
+            digest = content_hash(path)
+            if entry['size'] == stat.st_size and entry['hash'] == digest:
+                entry['mtime_ns'] = stat.st_mtime_ns
+                self.save_manifest()
+                return entry['file']
+        else:
+            digest = content_hash(path)
+
+        stem = os.path.splitext(os.path.basename(path))[0]
+        target = os.path.join(self.directory, f"{stem}.{digest}.{self.dtypes_stamp}.arrow")
+        schema = arrow_schema(path)
+        rows = 0
+        with pa.OSFile(target + '.tmp', 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+            for chunk in pd.read_csv(path, chunksize=BUILD_CHUNK_ROWS, **read_options(path)):
+                batch = pa.Table.from_pandas(chunk[schema.names], preserve_index=False)
+                writer.write_table(batch.cast(schema))
+                rows += len(chunk)
+        os.replace(target + '.tmp', target)
+        print(f"✅ Staged {path} ({rows} rows) in {target}.")
+
+        if entry and entry['file'] != target and os.path.exists(entry['file']):
+            os.remove(entry['file'])
+        self.manifest[path] = {
+            'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest,
+            'dtypes': self.dtypes_stamp, 'file': target,
+        }
+        self.save_manifest()
+        return target
+
+    def read(self, path, chunksize=None):
+        """Frames of path from its columnar copy: one whole frame, or chunks of chunksize rows.
+
+        Frames are indexed by source row number, the same as read_csv gives.
+        """
+        table = feather.read_table(self.cached_file(path), columns=list(SOURCE_DTYPES[path]), memory_map=True)
+        if not chunksize:
+            return [to_frame(table, path)]
+        return self.chunks(table, path, chunksize)
+
+    @staticmethod
+    def chunks(table, path, chunksize):
+        for start in range(0, table.num_rows, chunksize):
+            df = to_frame(table.slice(start, chunksize), path)
+            df.index = pd.RangeIndex(start, start + len(df))
+            yield df
@@ -0,0 +1,145 @@
+"""Multi-process projection of master frames into table frames.
+
+TransformPool runs the LOAD_PLAN projections of a master frame (or chunk)
+on a pool of worker processes. The frame is written once as an Arrow IPC
+file in shared memory (/dev/shm where there is one), which every worker
+memory-maps instead of receiving a pickled copy; results come back the
+same way, one Arrow file per task.
+
+The large tables are split into partitions by a hash of one column of
+their conflict key (PARTITION_COLUMNS: sale_id for the sale facts, sku for
+the product tables), so every row sharing a key lands in the same
+partition and keeping the first row per key within a partition keeps the
+same rows as over the whole frame. A task projects one partition for all
+the tables partitioned on its column; the parts are put back in source
+order, so the result is identical to the serial projection, index and
+dtypes included. The other tables are projected whole by one more task.
+
+Workers are forked, once, when the pool is created: the ETL script has no
+main guard for a spawned interpreter to import safely.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from transforms import SourceFrame
+
+try:
+    import pyarrow as pa
+    from pyarrow import compute
+except ImportError:
+    pa = None
+
+
+# Column of its key each table is partitioned on; tables not listed are
+# projected whole
+PARTITION_COLUMNS = {
+    'Product': 'sku',
+    'ProductPricing': 'sku',
+    'Inventory': 'sku',
+    'VendorProduct': 'sku',
+    'Sale': 'sale_id',
+    'SaleItem': 'sale_id',
+    'ProductReturn': 'return_id',
+    'ShiftSchedule': 'schedule_id',
+    'DeliveryItem': 'delivery_id',
+}
+
+# Where the Arrow files go: memory, not disk, where the platform has it
+SHARED_DIR = '/dev/shm'
+
+SOURCE_FILE = 'source.arrow'
+BUCKET_PREFIX = '__bucket_'
+
+
+def write_arrow(table, path):
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def read_arrow(path):
+    # Memory-mapped, so the columns are read from the file's pages in place
+    return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+
+def project_partition(directory, projections, column, bucket):
+    """Worker task: project the rows of one partition (all rows if column is None).
+
+    projections are (table, build) pairs; returns {table: path of the Arrow
+    file its frame was written to}.
+    """
+    source = read_arrow(os.path.join(directory, SOURCE_FILE))
+    if column is not None:
+        source = source.filter(compute.equal(source[BUCKET_PREFIX + column], bucket))
+    source = source.select([name for name in source.column_names if not name.startswith(BUCKET_PREFIX)])
+    src = SourceFrame(source.to_pandas())
+    paths = {}
+    for table, build in projections:
+        paths[table] = os.path.join(directory, f"{table}-{bucket}.arrow")
+        write_arrow(pa.Table.from_pandas(build(src), preserve_index=True), paths[table])
+    return paths
+
+
+class TransformPool:
+    """Worker processes projecting master frames, partitioned by key."""
+
+    def __init__(self, workers, partitions=None):
+        if pa is None:
+            raise ImportError("the transform pool needs pyarrow")
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise ImportError("the transform pool needs the fork start method, which this platform lacks")
+        self.partitions = partitions or workers
+        self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'))
+        # Fork every worker now, before the ETL starts any threads of its own
+        self.executor.submit(os.getpid).result()
+
+    def project(self, df, tables):
+        """{table: frame} of the (table, build, key) projections of df, as build(SourceFrame(df)) would return."""
+        if not (df.index.is_unique and df.index.is_monotonic_increasing):
+            # Source order is restored by index, so it has to follow it
+            src = SourceFrame(df)
+            return {table: build(src) for table, build, _ in tables}
+
+        directory = tempfile.mkdtemp(prefix='etl_transform_', dir=SHARED_DIR if os.path.isdir(SHARED_DIR) else None)
+        try:
+            source = pa.Table.from_pandas(df, preserve_index=True)
+            columns = {PARTITION_COLUMNS.get(table) for table, _, _ in tables} - {None}
+            for column in sorted(columns) if self.partitions > 1 else []:
+                bucket = pd.util.hash_pandas_object(df[column], index=False).to_numpy() % self.partitions
+                source = source.append_column(BUCKET_PREFIX + column, pa.array(bucket.astype('int32')))
+            write_arrow(source, os.path.join(directory, SOURCE_FILE))
+            del source
+
+            # One task per partition of each column, projecting every table
+            # partitioned on it; the tables projected whole share one task
+            groups = {}
+            for table, build, _ in tables:
+                column = PARTITION_COLUMNS.get(table) if self.partitions > 1 else None
+                groups.setdefault(column, []).append((table, build))
+            futures = [
+                self.executor.submit(project_partition, directory, projections, column, bucket)
+                for column, projections in groups.items()
+                for bucket in (range(self.partitions) if column else [None])
+            ]
+
+            parts = {table: [] for table, _, _ in tables}
+            for future in futures:
+                for table, path in future.result().items():
+                    parts[table].append(read_arrow(path).to_pandas())
+            frames = {}
+            for table, frames_of_table in parts.items():
+                if len(frames_of_table) == 1:
+                    frames[table] = frames_of_table[0]
+                    continue
+                non_empty = [part for part in frames_of_table if len(part)] or frames_of_table[:1]
+                frames[table] = pd.concat(non_empty).sort_index()
+            return frames
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def close(self):
+        self.executor.shutdown()
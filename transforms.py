@@ -0,0 +1,273 @@
+import numpy as np
+import pandas as pd
+
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT = 'string[pyarrow]'
+except ImportError:
+    TEXT = 'string'
+
+
+# Source columns of each master file and the dtypes they are parsed as. IDs
+# and counts are nullable Int32 like the INTEGER columns they load into, and
+# low-cardinality text is categorical so each distinct value is stored once
+# per chunk. Columns no projection uses are not read at all.
+SOURCE_DTYPES = {
+    'Sales_Master.csv': {
+        'store_id': 'Int32', 'address': 'category', 'city': 'category', 'state': 'category',
+        'zipcode': 'category', 'operating_hours': 'category',
+        'category_id': 'Int32', 'category_name': 'category',
+        'sku': 'category', 'product_name': 'category', 'brand': 'category', 'shelf_location': 'category',
+        'price_date': 'category', 'regular_price': 'float64', 'promo_price': 'float64',
+        'inventory_id': 'Int32', 'quantity_on_hand': 'Int32', 'reorder_threshold': 'Int32',
+        'primary_vendor_id': 'Int32', 'vendor_name': 'category', 'vendor_tier': 'category',
+        'promo_id': 'Int32', 'start_date': 'category', 'end_date': 'category', 'discount_amount': 'float64',
+        'sale_id': 'Int32', 'sale_datetime': TEXT, 'payment_type': 'category',
+        'quantity_sold': 'Int32', 'unit_price': 'float64', 'promo_applied': 'boolean', 'promo_discount': 'float64',
+        'reason_code': 'category', 'description': 'category',
+        'return_exists': 'boolean', 'return_id': 'Int32', 'return_date': 'category', 'quantity_returned': 'Int32',
+    },
+    'Shift_Master.csv': {
+        'schedule_id': 'Int32', 'employee_id': 'Int32', 'first_name': 'category', 'last_name': 'category',
+        'email': 'category', 'phone': 'category', 'role': 'category', 'store_id': 'Int32',
+        'department_id': 'Int32', 'department_name': 'category',
+        'shift_date': 'category', 'start_time': 'category', 'end_time': 'category',
+    },
+    'Delivery_Master.csv': {
+        'delivery_id': 'Int32', 'vendor_id': 'Int32', 'store_id': 'Int32', 'delivery_date': 'category',
+        'status': 'category', 'sku': 'category', 'delivered_quantity': 'Int32',
+    },
+    'Expense_Master.csv': {
+        'store_id': 'Int32', 'expense_date': 'category', 'expense_category': 'category', 'amount': 'float64',
+    },
+}
+
+
+def read_options(path):
+    # read_csv keyword arguments for one master file
+    dtypes = SOURCE_DTYPES[path]
+    return {'usecols': list(dtypes), 'dtype': dtypes}
+
+
+class SourceFrame:
+    """One master frame (or chunk) with its key columns factorized once.
+
+    Every projection keeps the first source row per key of its table, the
+    row ON CONFLICT DO NOTHING would keep anyway. Each key column is turned
+    into integer codes at most once per chunk and composite keys are
+    combined arithmetically, so finding duplicates is one hash pass over an
+    int64 array per table rather than a comparison of whole rows.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.codes = {}
+
+    def column_codes(self, column):
+        # (codes, cardinality) with NULL as code 0
+        if column not in self.codes:
+            values = self.df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, size = values.cat.codes.to_numpy(dtype=np.int64), len(values.cat.categories)
+            else:
+                codes, uniques = pd.factorize(values)
+                codes, size = codes.astype(np.int64), len(uniques)
+            self.codes[column] = (codes + 1, size + 1)
+        return self.codes[column]
+
+    def key_codes(self, key):
+        combined, size = np.zeros(len(self.df), dtype=np.int64), 1
+        for column in key:
+            codes, cardinality = self.column_codes(column)
+            if size * cardinality >= 2 ** 62:
+                # Renumber densely before the product could overflow
+                combined, uniques = pd.factorize(combined)
+                size = len(uniques)
+            combined, size = combined * cardinality + codes, size * cardinality
+        return combined
+
+    def first(self, key, columns, required=(), where=None):
+        """columns of the first row per key among rows with no NULL in required."""
+        df = self.df
+        keep = np.ones(len(df), dtype=bool) if where is None else np.asarray(where, dtype=bool)
+        for column in required:
+            keep &= df[column].notna().to_numpy()
+        positions = np.flatnonzero(keep)
+        if key is not None:
+            codes = self.key_codes(key)[positions]
+            positions = positions[~pd.Series(codes).duplicated().to_numpy()]
+        return df.iloc[positions, df.columns.get_indexer(columns)]
+
+
+# Per-table projections of the master CSVs. Each function takes a SourceFrame
+# of one master file (or chunk) read with SOURCE_DTYPES and returns the rows
+# for one target table, with column names matching the table.
+
+
+# ---------- Sales_Master.csv ----------
+
+def store_frame(src):
+    return src.first(['store_id'], ['store_id', 'address', 'city', 'state', 'zipcode', 'operating_hours'])
+
+
+def category_frame(src):
+    return src.first(['category_id'], ['category_id', 'category_name'])
+
+
+def product_frame(src):
+    return src.first(['sku'], ['sku', 'product_name', 'brand', 'shelf_location', 'category_id'])
+
+
+def pricing_frame(src):
+    return src.first(['sku', 'price_date'], ['sku', 'price_date', 'regular_price', 'promo_price'])
+
+
+def inventory_frame(src):
+    columns = ['inventory_id', 'store_id', 'sku', 'quantity_on_hand', 'reorder_threshold']
+    return src.first(['store_id', 'sku'], columns, required=columns)
+
+
+def vendor_frame(src):
+    columns = ['primary_vendor_id', 'vendor_name', 'vendor_tier']
+    vendor_df = src.first(['primary_vendor_id'], columns, required=columns).sort_values(by='primary_vendor_id')
+    vendor_df.columns = ['vendor_id', 'vendor_name', 'vendor_tier']
+    return vendor_df
+
+
+def vendor_product_frame(src):
+    columns = ['primary_vendor_id', 'sku']
+    vendor_product_df = src.first(columns, columns, required=columns)
+    vendor_product_df.columns = ['vendor_id', 'sku']
+    return vendor_product_df
+
+
+def promotion_frame(src):
+    return src.first(['promo_id'], ['promo_id', 'sku', 'start_date', 'end_date', 'discount_amount'],
+                     required=['promo_id', 'sku'])
+
+
+def sale_frame(src):
+    return src.first(['sale_id'], ['sale_id', 'store_id', 'sale_datetime', 'payment_type'])
+
+
+def sale_item_frame(src, with_sale_datetime=False):
+    columns = ['sale_id', 'sku', 'quantity_sold', 'unit_price', 'promo_applied', 'promo_discount', 'promo_id']
+    if with_sale_datetime:
+        # The partitioned layout stores each line in the month of its sale
+        columns.append('sale_datetime')
+    sale_item_df = src.first(['sale_id', 'sku'], columns)
+    # A blank flag means no promotion, as the column default says
+    sale_item_df['promo_applied'] = sale_item_df['promo_applied'].fillna(False)
+    return sale_item_df
+
+
+def return_reason_frame(src):
+    columns = ['reason_code', 'description']
+    return src.first(['reason_code'], columns, required=columns)
+
+
+def product_return_frame(src):
+    columns = ['return_id', 'sale_id', 'sku', 'return_date', 'quantity_returned', 'reason_code']
+    returned = src.df['return_exists'].fillna(False).to_numpy(dtype=bool)
+    return src.first(['return_id'], columns, required=columns, where=returned)
+
+
+# ---------- Shift_Master.csv ----------
+
+def department_frame(src):
+    return src.first(['department_id'], ['department_id', 'department_name'])
+
+
+def employee_frame(src):
+    return src.first(['employee_id'], [
+        'employee_id', 'first_name', 'last_name', 'email', 'phone', 'role', 'store_id', 'department_id'
+    ])
+
+
+def shift_schedule_frame(src):
+    return src.first(['schedule_id'], ['schedule_id', 'employee_id', 'shift_date', 'start_time', 'end_time'])
+
+
+# ---------- Delivery_Master.csv ----------
+
+def delivery_frame(src):
+    return src.first(['delivery_id'], ['delivery_id', 'vendor_id', 'store_id', 'delivery_date', 'status'])
+
+
+def delivery_item_frame(src):
+    delivery_item_df = src.first(['delivery_id', 'sku'], ['delivery_id', 'sku', 'delivered_quantity'])
+    delivery_item_df.columns = ['delivery_id', 'sku', 'quantity']
+    return delivery_item_df
+
+
+# ---------- Expense_Master.csv ----------
+
+def expense_frame(src):
+    # Expense has no natural key, so every source row is kept
+    return src.first(None, ['store_id', 'expense_date', 'expense_category', 'amount'])
+
+
+# Load plan: master file -> ordered (table, projection, conflict key) entries.
+# Tables inside a group are in foreign-key order; the groups themselves are
+# loaded in this order so parents always land before their children.
+LOAD_PLAN = [
+    ('Sales_Master.csv', [
+        ('Store',          store_frame,          ('store_id',)),
+        ('Category',       category_frame,       ('category_id',)),
+        ('Product',        product_frame,        ('sku',)),
+        ('ProductPricing', pricing_frame,        ('sku', 'price_date')),
+        ('Inventory',      inventory_frame,      ('store_id', 'sku')),
+        ('Vendor',         vendor_frame,         ('vendor_id',)),
+        ('VendorProduct',  vendor_product_frame, ('vendor_id', 'sku')),
+        ('Promotion',      promotion_frame,      ('promo_id',)),
+        ('Sale',           sale_frame,           ('sale_id',)),
+        ('SaleItem',       sale_item_frame,      ('sale_id', 'sku')),
+        ('ReturnReason',   return_reason_frame,  ('reason_code',)),
+        ('ProductReturn',  product_return_frame, ('return_id',)),
+    ]),
+    ('Shift_Master.csv', [
+        ('Department',     department_frame,     ('department_id',)),
+        ('Employee',       employee_frame,       ('employee_id',)),
+        ('ShiftSchedule',  shift_schedule_frame, ('schedule_id',)),
+    ]),
+    ('Delivery_Master.csv', [
+        ('Delivery',       delivery_frame,       ('delivery_id',)),
+        ('DeliveryItem',   delivery_item_frame,  ('delivery_id', 'sku')),
+    ]),
+    ('Expense_Master.csv', [
+        ('Expense',        expense_frame,        None),
+    ]),
+]
+
+
+# Dimension tables whose keys are remembered across chunks. Their cardinality
+# is bounded by the catalogue, not by transaction volume, so the key sets stay
+# small; fact tables rely on ON CONFLICT instead.
+DIMENSION_TABLES = {
+    'Store', 'Category', 'Product', 'ProductPricing', 'Inventory', 'Vendor',
+    'VendorProduct', 'Promotion', 'ReturnReason', 'Department', 'Employee',
+}
+
+
+class DedupState:
+    """Keys of dimension rows already sent to the database in earlier chunks."""
+
+    def __init__(self):
+        self.seen = {}
+
+    def new_rows(self, table, df, key):
+        # Frames already hold one row per key; drop keys sent in earlier chunks
+        if table not in DIMENSION_TABLES or key is None or df.empty:
+            return df
+        seen = self.seen.setdefault(table, set())
+        keys = pd.Series(list(zip(*(df[c] for c in key))), index=df.index)
+        fresh = ~keys.isin(seen)
+        seen.update(keys[fresh])
+        return df[fresh]
+
+    def forget(self, table, df, key):
+        # Drop keys of rows that were rejected before loading
+        if table not in self.seen or key is None or df.empty:
+            return
+        self.seen[table].difference_update(zip(*(df[c] for c in key)))
@@ -0,0 +1,164 @@
+import json
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from scheduler import CREATE_TABLE_RE
+
+
+COLUMN_RE = re.compile(r"(\w+)\s+(\w+)(?:\s*\(\s*(\d+)(?:\s*,\s*(\d+))?\s*\))?(.*)", re.DOTALL)
+CHECK_IN_RE = re.compile(r"CHECK\s*\(\s*\w+\s+IN\s*\((.*?)\)\s*\)", re.IGNORECASE)
+REFERENCES_COL_RE = re.compile(r"REFERENCES\s+(\w+)\s*\(\s*(\w+)\s*\)", re.IGNORECASE)
+TABLE_PK_RE = re.compile(r"PRIMARY\s+KEY\s*\((.*?)\)", re.IGNORECASE)
+TABLE_FK_RE = re.compile(r"FOREIGN\s+KEY\s*\(\s*(\w+).*?REFERENCES\s+(\w+)\s*\(\s*(\w+)", re.IGNORECASE)
+
+QUARANTINE_COLUMNS = ['rejected_at', 'table_name', 'source_row', 'reasons', 'record']
+
+
+def column_rules(ddl):
+    """Per-table column rules read from the CREATE TABLE statements of ddl.
+
+    Returns {table: {column: rule}} with lower-cased names, where a rule holds
+    not_null, varchar (max length), numeric ((precision, scale)), allowed
+    (CHECK ... IN values) and references ((parent table, parent column)).
+    A table-level FOREIGN KEY is checked on its leading column alone.
+    """
+    rules = {}
+    for name, body in CREATE_TABLE_RE.findall(ddl):
+        table = {}
+        primary_key = []
+        foreign_keys = []
+        for line in body.split('\n'):
+            line = line.strip().rstrip(',')
+            if not line:
+                continue
+            head = line.split()[0].upper()
+            if head == 'PRIMARY':
+                primary_key = [c.strip().lower() for c in TABLE_PK_RE.search(line).group(1).split(',')]
+                continue
+            if head == 'FOREIGN':
+                foreign_keys.append(TABLE_FK_RE.search(line).groups())
+                continue
+            if head in ('UNIQUE', 'CHECK', 'CONSTRAINT'):
+                continue
+
+            column, sql_type, size, scale, rest = COLUMN_RE.match(line).groups()
+            sql_type, upper = sql_type.upper(), rest.upper()
+            rule = {'not_null': 'NOT NULL' in upper or 'PRIMARY KEY' in upper}
+            if sql_type == 'VARCHAR' and size:
+                rule['varchar'] = int(size)
+            if sql_type == 'NUMERIC' and size:
+                rule['numeric'] = (int(size), int(scale or 0))
+            check = CHECK_IN_RE.search(rest)
+            if check:
+                rule['allowed'] = [v.strip().strip("'") for v in check.group(1).split(',')]
+            ref = REFERENCES_COL_RE.search(rest)
+            if ref:
+                rule['references'] = (ref.group(1).lower(), ref.group(2).lower())
+            table[column.lower()] = rule
+
+        for column in primary_key:
+            table[column]['not_null'] = True
+        for column, parent, parent_column in foreign_keys:
+            table[column.lower()]['references'] = (parent.lower(), parent_column.lower())
+        rules[name.lower()] = table
+    return rules
+
+
+class Validator:
+    """Column-wise pre-load checks with a quarantine file for rejected rows.
+
+    Each frame is checked against the NOT NULL, CHECK ... IN, VARCHAR(n),
+    NUMERIC(p, s) and REFERENCES rules of its table before it reaches the
+    database. Foreign keys are resolved against the accepted rows of parent
+    frames in the same batch of loads, then against keys sent in earlier
+    chunks, and finally with one lookup per column against the database, so
+    a child whose parent row was rejected is rejected too. Rejected rows are
+    appended to the quarantine CSV with the reasons they failed.
+    """
+
+    def __init__(self, ddl, quarantine_path, seen=None, lookup=None):
+        self.rules = column_rules(ddl)
+        self.quarantine_path = quarantine_path
+        self.seen = seen
+        self.lookup = lookup
+        self.rejected = {}
+
+    def known_keys(self, parent, column, values, accepted):
+        keys = set()
+        if parent in accepted and column in accepted[parent]:
+            keys.update(accepted[parent][column].dropna().unique().tolist())
+        if self.seen is not None:
+            for table, seen in self.seen.seen.items():
+                if table.lower() == parent:
+                    keys.update(k[0] for k in seen if len(k) == 1)
+        missing = [v for v in pd.unique(values) if v not in keys]
+        if missing and self.lookup is not None:
+            keys.update(self.lookup(parent, column, missing))
+        return keys
+
+    def check(self, table, df, accepted):
+        # Return a Series of '; '-joined reasons, '' for clean rows
+        reasons = pd.Series('', index=df.index, dtype=object)
+
+        def flag(mask, reason):
+            mask = np.asarray(mask, dtype=bool)
+            if mask.any():
+                reasons[mask] = reasons[mask] + reason + '; '
+
+        for column, rule in self.rules.get(table.lower(), {}).items():
+            if column not in df:
+                continue
+            values = df[column]
+            present = values.notna().to_numpy()
+            if rule['not_null']:
+                flag(~present, f"{column} is NULL")
+            if 'allowed' in rule:
+                flag(present & ~values.isin(rule['allowed']).to_numpy(), f"{column} not in {rule['allowed']}")
+            if 'varchar' in rule:
+                too_long = values.astype(str).str.len().to_numpy() > rule['varchar']
+                flag(present & too_long, f"{column} longer than {rule['varchar']}")
+            if 'numeric' in rule:
+                precision, scale = rule['numeric']
+                numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+                with np.errstate(invalid='ignore'):
+                    overflow = np.abs(np.round(numbers, scale)) >= 10.0 ** (precision - scale)
+                flag(present & overflow, f"{column} exceeds NUMERIC({precision},{scale})")
+            if 'references' in rule:
+                parent, parent_column = rule['references']
+                candidates = values[present]
+                if len(candidates):
+                    known = self.known_keys(parent, parent_column, candidates, accepted)
+                    flag(present & ~values.isin(known).to_numpy(), f"{column} not found in {parent}")
+        return reasons
+
+    def validate(self, loads):
+        """Split (table, df, conflict) loads, in FK order, into clean loads; quarantine the rest."""
+        accepted = {}
+        clean_loads = []
+        for table, df, conflict in loads:
+            reasons = self.check(table, df, accepted)
+            bad = (reasons != '').to_numpy()
+            if bad.any():
+                self.quarantine(table, df[bad], reasons[bad])
+                self.rejected[table] = self.rejected.get(table, 0) + int(bad.sum())
+                if self.seen is not None:
+                    self.seen.forget(table, df[bad], conflict)
+                df = df[~bad]
+            accepted[table.lower()] = df
+            clean_loads.append((table, df, conflict))
+        return clean_loads
+
+    def quarantine(self, table, rows, reasons):
+        out = pd.DataFrame({
+            'rejected_at': datetime.now().isoformat(sep=' ', timespec='seconds'),
+            'table_name': table,
+            'source_row': rows.index,
+            'reasons': reasons.str.rstrip('; ').to_numpy(),
+            'record': [json.dumps(r, default=str) for r in rows.to_dict(orient='records')],
+        }, columns=QUARANTINE_COLUMNS)
+        new_file = not os.path.exists(self.quarantine_path)
+        out.to_csv(self.quarantine_path, mode='a', header=new_file, index=False)